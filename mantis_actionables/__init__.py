@@ -9,6 +9,43 @@ MANTIS_ACTIONABLES_STIX_REPORT_FAMILY_AND_TYPES = [{'iobject_type': 'STIX_Packag
 
 MANTIS_ACTIONABLES_ACTIVE_EXPORTERS = ['cybox_all']
 
+# Number of exporter results that are imported in one go
+
+MANTIS_ACTIONABLES_IMPORT_CHUNK_SIZE = 5000
+
+# Lookback (in seconds) when importing reports created since the import watermark
+# (see ``models.ImportWatermark``): reports whose Dingos import committed only after
+# a more recently created report had already advanced the watermark are thus
+# still picked up. Reports within the lookback window are imported again;
+# the import is idempotent, so this only costs time.
+
+MANTIS_ACTIONABLES_IMPORT_WATERMARK_LOOKBACK = 3600
+
+# Maximal number of results of an exporter run that are stored in the
+# ExportResultCache: the results are collected in memory for being stored,
+# so the results of larger reports are not cached.
+
+MANTIS_ACTIONABLES_EXPORT_CACHE_MAX_RESULTS = 20000
+
+# If set, changes of actionable tags are propagated to Dingos asynchronously
+# via a queue that is drained by a celery task (see ``models.TagPropagationItem``);
+# otherwise, they are propagated within the tagging operation. Asynchronous
+# propagation requires celery workers and the periodic task in
+# ``mantis_actionables.celery_schedule``.
+
+MANTIS_ACTIONABLES_ASYNC_TAG_PROPAGATION = False
+
+# If set, outdated sources found after an import (and by the periodic task
+# ``tasks.async_outdate_sources``) are marked as outdated and the tags that
+# were associated only via outdated sources are tagged as 'OUTDATED';
+# otherwise, the outdated sources are only reported in the log.
+
+MANTIS_ACTIONABLES_MARK_OUTDATED_SOURCES = False
+
+# Number of queued tag changes that are propagated to Dingos in one go
+
+MANTIS_ACTIONABLES_TAG_PROPAGATION_BATCH_SIZE = 5000
+
 MANTIS_ACTIONABLES_DASHBOARD_CONTENTS = {
 'email_addresses' : {
         'basis': 'SingletonObservable',
@@ -50,4 +87,9 @@ MANTIS_ACTIONABLES_STATUS_UPDATE_FUNCTION_PATH = ""
 
 MANTIS_ACTIONABLES_SRC_META_DATA_FUNCTION_PATH = ""
 
+# Maximal number of status objects that are kept in the in-process
+# cache used for looking up status objects (see ``status_management.intern_status``)
+
+MANTIS_ACTIONABLES_STATUS_INTERN_CACHE_SIZE = 10000
+
 
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) Siemens AG, 2015
+#
+# This file is part of MANTIS.  MANTIS is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation; either version 2
+# of the License, or(at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""
+Small helpers for carrying out database operations in bulk.
+"""
+
+from itertools import islice
+
+# Some database backends (most notably sqlite) limit the number of
+# parameters that can be passed in a single query. Queries of the
+# form ``pk__in=[...]`` are therefore split into chunks of the
+# size given below.
+
+BULK_QUERY_CHUNK_SIZE = 500
+
+
+def chunked(iterable, size=BULK_QUERY_CHUNK_SIZE):
+    """
+    Split an iterable into lists of at most ``size`` elements.
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def in_bulk_chunked(queryset, pks):
+    """
+    Like ``queryset.in_bulk(pks)``, but carries out the query in chunks.
+    """
+    result = {}
+    for pk_chunk in chunked(set(pks)):
+        result.update(queryset.in_bulk(pk_chunk))
+    return result
+
+
+def grouped_update(queryset, pk2values_map):
+    """
+    Write changed column values for many rows.
+
+    ``pk2values_map`` maps primary keys to dictionaries of the form
+    ``{column_name: new_value}``. Rows that are to receive identical
+    values are grouped, so that one ``UPDATE`` statement is issued per
+    distinct set of values (and chunk of primary keys) rather than
+    one per row.
+    """
+    values2pks_map = {}
+    for pk, values in pk2values_map.items():
+        values2pks_map.setdefault(tuple(sorted(values.items())), []).append(pk)
+
+    for values, pks in values2pks_map.items():
+        for pk_chunk in chunked(pks):
+            queryset.filter(pk__in=pk_chunk).update(**dict(values))
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) Siemens AG, 2015
+#
+# This file is part of MANTIS.  MANTIS is free software: you can
+# redistribute it and/or modify it under the terms of the GNU General Public
+# License as published by the Free Software Foundation; either version 2
+# of the License, or(at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful, but WITHOUT
+# ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program; if not, write to the Free Software Foundation, Inc., 51
+# Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""
+Periodic tasks of Mantis Actionables for celery beat.
+
+Include them into the schedule of your project, e.g., in the Django settings::
+
+    from mantis_actionables.celery_schedule import MANTIS_ACTIONABLES_CELERYBEAT_SCHEDULE
+
+    CELERYBEAT_SCHEDULE = {}
+    CELERYBEAT_SCHEDULE.update(MANTIS_ACTIONABLES_CELERYBEAT_SCHEDULE)
+
+This module must not import models or tasks, so that it can be imported
+from the settings.
+"""
+
+from datetime import timedelta
+
+MANTIS_ACTIONABLES_CELERYBEAT_SCHEDULE = {
+    # Drain the queue of tag changes to be propagated to Dingos (only
+    # required if ASYNC_TAG_PROPAGATION is set): changes whose task ran
+    # before the changes had been committed are picked up here.
+    'mantis_actionables-propagate-tag-changes': {
+        'task': 'mantis_actionables.tasks.async_propagate_tag_changes',
+        'schedule': timedelta(minutes=1),
+    },
+    # Examine all sources in the database for outdated sources (they are
+    # only marked as such if MARK_OUTDATED_SOURCES is set)
+    'mantis_actionables-outdate-sources': {
+        'task': 'mantis_actionables.tasks.async_outdate_sources',
+        'schedule': timedelta(days=1),
+    },
+}
@@ -27,9 +27,10 @@ import pytz
 from django.db.models import Q
 from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
-from mantis_actionables.status_management import updateStatus
+from mantis_actionables.status_management import updateStatus, intern_status
 
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 from django.utils.dateparse import parse_datetime
 
 
@@ -39,7 +40,9 @@ from mantis_actionables.models import Action, ImportInfo, SingletonObservable, S
 
 logger = logging.getLogger(__name__)
 
-CONTENT_TYPE_SINGLETON_OBSERVABLE = ContentType.objects.get_for_model(SingletonObservable)
+# Looked up on first use rather than upon import (see ``mantis_import``)
+
+CONTENT_TYPE_SINGLETON_OBSERVABLE = SimpleLazyObject(lambda: ContentType.objects.get_for_model(SingletonObservable))
 
 
 
@@ -104,10 +107,10 @@ def import_crowdstrike_csv(csv_file, printing=False):
         )
 
         # create singleton observable
-        singleton_observable, created = SingletonObservable.objects.get_or_create(
-            type=type,
-            subtype=subtype,
-            value=row['indicator']
+        singleton_observable, created = SingletonObservable.get_or_create_by_identity(
+            type,
+            subtype,
+            row['indicator']
         )
 
 
@@ -115,10 +118,7 @@ def import_crowdstrike_csv(csv_file, printing=False):
         if created:
             lines_added += 1
 
-            status = Status(
-                priority=Status.PRIORITY_UNCERTAIN
-            )
-            status.save()
+            status, _ = intern_status({'priority': Status.PRIORITY_UNCERTAIN})
 
             singleton_observable.status_thru.create(
                 action=action,
@@ -24,7 +24,10 @@ from mantis_actionables.core.crowdstrike import import_crowdstrike_csv
 
 from dingos.models import TaggingHistory
 from taggit.models import Tag
-from mantis_actionables.models import ActionableTag, ActionableTaggingHistory, Context, TagName
+from mantis_actionables.models import ActionableTag, ActionableTaggingHistory, Context, TagInfo, \
+    SingletonObservable, SingletonObservableTagMembership
+
+from mantis_actionables.bulk_utils import chunked
 
 class Command(BaseCommand):
     """
@@ -41,6 +44,26 @@ class Command(BaseCommand):
             #ActionableTaggingHistory.filter(tag__context__name=tag).delete()
             #TaggingHistory.filter(tag__name=tag).delete()
 
+            # Determine the singleton observables carrying an actionable tag of the
+            # context or the dingos tag, so that their tag caches and
+            # tag memberships can be brought in line after the deletion.
+
+            actionable_tag_pks = set(SingletonObservableTagMembership.objects.filter(kind=SingletonObservableTagMembership.KIND_ACTIONABLE_TAG,
+                                                                                     tag_name__startswith='%s:' % tag)\
+                                     .values_list('observable_id',flat=True))
+            dingos_tag_pks = set(SingletonObservableTagMembership.objects.filter(kind=SingletonObservableTagMembership.KIND_DINGOS_TAG,
+                                                                                 tag_name=tag)\
+                                 .values_list('observable_id',flat=True))
+
             Context.objects.filter(name=tag).delete()
             Tag.objects.filter(name=tag).delete()
-            TagName.objects.filter(name=tag).delete()
+            TagInfo.objects.filter(name=tag).delete()
+
+            SingletonObservable.refresh_actionable_tags_cache(actionable_tag_pks)
+
+            pk2mantis_tags_map = {}
+            for pk_chunk in chunked(dingos_tag_pks):
+                for (pk,mantis_tags) in SingletonObservable.objects.filter(pk__in=pk_chunk).values_list('pk','mantis_tags'):
+                    pk2mantis_tags_map[pk] = ",".join(sorted(set(filter(None,mantis_tags.split(','))) - set([tag])))
+
+            SingletonObservable.update_mantis_tags(pk2mantis_tags_map)
@@ -24,7 +24,8 @@ from mantis_actionables.core.crowdstrike import import_crowdstrike_csv
 
 from dingos.models import TaggingHistory
 from taggit.models import Tag
-from mantis_actionables.models import ActionableTag, ActionableTaggingHistory, Context, TagInfo, SingletonObservable
+from mantis_actionables.models import ActionableTag, ActionableTaggingHistory, Context, TagInfo, SingletonObservable, \
+    SingletonObservableTagMembership
 
 class Command(BaseCommand):
     """
@@ -40,19 +41,13 @@ class Command(BaseCommand):
 
         for tag_info in tags_to_delete:
             print "Treating %s" % tag_info
-            affected_sos = SingletonObservable.objects.filter(actionable_tags_cache__contains=':%s' % tag_info)
-            print "Found affected sos %s" % affected_sos
-            for affected_so in affected_sos:
-                at_cache = affected_so.actionable_tags_cache
-                print "Existing cache  %s" % at_cache
-                tags = at_cache.split(',')
-                new_cache = []
-                for tag in tags:
-                    if not (':%s' % tag_info) in tag:
-                        new_cache.append(tag)
-                new_cache = ','.join(new_cache)
-                print "New cache  %s" % new_cache
-                affected_so.actionable_tags_cache=new_cache
-                affected_so.save()
+            affected_so_pks = list(SingletonObservableTagMembership.objects.filter(kind=SingletonObservableTagMembership.KIND_TAG_INFO,
+                                                                                   tag_name=tag_info).values_list('observable_id',flat=True))
+            print "Found %s affected sos" % len(affected_so_pks)
 
             TagInfo.objects.filter(name=tag_info).delete()
+
+            # Deleting the tag info removes the related actionable tags along with
+            # their taggings; the caches of the affected sos are rebuilt accordingly.
+
+            SingletonObservable.refresh_actionable_tags_cache(affected_so_pks)
@@ -21,7 +21,9 @@ from datetime import datetime
 from optparse import make_option
 from django.core.management.base import BaseCommand, CommandError
 
-from ...mantis_import import process_STIX_Reports, import_singleton_observables_from_STIX_iobjects
+from ...mantis_import import process_STIX_Reports, import_singleton_observables_from_STIX_iobjects, \
+    import_STIX_reports_parallel
+from ...models import CachingManager
 
 class Command(BaseCommand):
     """
@@ -43,19 +45,38 @@ class Command(BaseCommand):
                     default=[],
                     help='List of pks of information objects representing Top-Level STIX reports from which'
                          ' actionables are to be extracted into mantis_actionables.'),
+
+                    make_option('--since-last',
+                    action='store_true',
+                    dest='since_last',
+                    default=False,
+                    help='Import all reports created since the last report that has been imported'
+                         ' (as recorded in the import watermark).'),
+
+                    make_option('--parallel',
+                    action='store_true',
+                    dest='parallel',
+                    default=False,
+                    help='Dispatch the import of each report as celery task of its own.'),
     )
 
     def handle(self, *args, **options):
         if len(args) != 0:
             raise CommandError("Wrong arguments.")
-        if not options.get('top_level_iobj_pks') and not options.get('timeframe'):
+        modes = filter(None,[options.get('top_level_iobj_pks'),options.get('timeframe'),options.get('since_last')])
+
+        if not modes:
             raise CommandError("Neither timeframe nor list of pks specified.")
 
-        if options.get('top_level_iobj_pks') and options.get('timeframe'):
-            raise CommandError("Specify either timeframe or list of pks")
+        if len(modes) > 1:
+            raise CommandError("Specify either timeframe, list of pks or --since-last")
+
+        CachingManager.prewarm()
 
+        if options.get('since_last'):
+            process_STIX_Reports(since_last=True,parallel=options.get('parallel'))
 
-        if options.get('timeframe'):
+        elif options.get('timeframe'):
             try:
                 from_time, to_time = options.get('timeframe')
                 from_time = datetime.strptime(from_time,"%Y-%m-%d %H:%M:%S").replace(tzinfo=pytz.timezone('Etc/GMT+0'))
@@ -66,10 +87,13 @@ class Command(BaseCommand):
                 raise CommandError("wrong from_timestamp format, use Y-M-D H:M:S")
 
 
-            process_STIX_Reports(from_time,to_time)
+            process_STIX_Reports(from_time,to_time,parallel=options.get('parallel'))
 
         elif options.get('top_level_iobj_pks'):
             top_level_iobj_pks = map(int,options.get('top_level_iobj_pks'))
-            import_singleton_observables_from_STIX_iobjects(top_level_iobj_pks)
+            if options.get('parallel'):
+                import_STIX_reports_parallel(top_level_iobj_pks)
+            else:
+                import_singleton_observables_from_STIX_iobjects(top_level_iobj_pks)
 
 
@@ -21,6 +21,7 @@ import os
 from django.core.management.base import BaseCommand, CommandError
 
 from mantis_actionables.core.crowdstrike import import_crowdstrike_csv
+from mantis_actionables.models import CachingManager
 
 
 class Command(BaseCommand):
@@ -48,6 +49,8 @@ class Command(BaseCommand):
         if not os.path.isfile(csv_file):
             raise CommandError('"%s" cannot be accessed!' % csv_file)
 
+        CachingManager.prewarm()
+
         ignored_lines = import_crowdstrike_csv(csv_file, printing=True)
         print ignored_lines
 
@@ -30,16 +30,27 @@ from mantis_actionables.mantis_import import outdate_sources
 
 class Command(BaseCommand):
     """
-    Delete dingos tags (and related actionables tags with respective context) that
-    are passed as arguments.
+    Find outdated sources (in the whole database or, with option ``--identifier``,
+    for a single report) and mark them as such. Only simulates unless called with
+    argument 'doit'.
     """
 
+    option_list = BaseCommand.option_list + ( make_option('--identifier',
+                    action='store',
+                    dest='top_level_iobject_identifier_pk',
+                    type='int',
+                    default=None,
+                    help='Pk of the identifier of a top-level STIX report: only sources of that report are examined.'),
+    )
+
     def handle(self, *args, **options):
 
+        top_level_iobject_identifier_pk = options.get('top_level_iobject_identifier_pk')
+
         if args and args[0] == 'doit':
-            outdate_sources(simulate=False)
+            outdate_sources(simulate=False,top_level_iobject_identifier_pk=top_level_iobject_identifier_pk)
         else:
             print "Simulating only"
-            outdate_sources()
+            outdate_sources(top_level_iobject_identifier_pk=top_level_iobject_identifier_pk)
 
 
@@ -19,6 +19,7 @@
 
 import re
 import logging
+import hashlib
 
 from json import dumps
 
@@ -29,17 +30,23 @@ from datetime import timedelta
 from itertools import chain
 
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
 from django.contrib.contenttypes.models import ContentType
+from django.contrib.auth.models import User
 
+from django.db import transaction, IntegrityError
 from django.db.models import Q,F
 
-from dingos.models import InfoObject,Fact,TaggingHistory
+from dingos.models import InfoObject,Fact,TaggingHistory,Identifier
 from dingos.view_classes import POSTPROCESSOR_REGISTRY
 from dingos.graph_traversal import follow_references, annotate_graph
 
-from . import MANTIS_ACTIONABLES_ACTIVE_EXPORTERS, MANTIS_ACTIONABLES_STIX_REPORT_FAMILY_AND_TYPES, MANTIS_ACTIONABLES_CONTEXT_TAG_REGEX
+from . import MANTIS_ACTIONABLES_ACTIVE_EXPORTERS, MANTIS_ACTIONABLES_STIX_REPORT_FAMILY_AND_TYPES, MANTIS_ACTIONABLES_CONTEXT_TAG_REGEX, \
+    MANTIS_ACTIONABLES_IMPORT_CHUNK_SIZE, MANTIS_ACTIONABLES_SRC_META_DATA_FUNCTION_PATH, \
+    MANTIS_ACTIONABLES_IMPORT_WATERMARK_LOOKBACK, MANTIS_ACTIONABLES_EXPORT_CACHE_MAX_RESULTS, \
+    MANTIS_ACTIONABLES_TAG_PROPAGATION_BATCH_SIZE, MANTIS_ACTIONABLES_MARK_OUTDATED_SOURCES
 from .models import SingletonObservable,\
     SingletonObservableType, \
     SingletonObservableSubtype, \
@@ -47,12 +54,21 @@ from .models import SingletonObservable,\
     Status2X, \
     Action, \
     ActionableTag, \
+    TaggedActionableItem, \
     STIX_Entity, \
-    EntityType
+    EntityType, \
+    ImportWatermark, \
+    ExportResultCache, \
+    InfoObjectTLP, \
+    TagPropagationItem
 
-from .status_management import updateStatus, createSourceMetaData
+from .status_management import updateStatus, createSourceMetaData, StatusUpdateAccumulator
 
-from tasks import async_export_to_actionables
+from .bulk_utils import chunked, in_bulk_chunked, grouped_update
+
+from celery import chord
+
+from tasks import async_export_to_actionables, async_import_STIX_report, async_post_process_import
 
 logger = logging.getLogger(__name__)
 
@@ -61,8 +77,11 @@ logger = logging.getLogger(__name__)
 # To learn about generic foreign keys, look at
 #   https://docs.djangoproject.com/en/1.8/ref/contrib/contenttypes/
 #
+# The content type is looked up on first use rather than upon import, so
+# that the module can be imported before the database has been set up
+# (e.g., by the test runner).
 
-CONTENT_TYPE_SINGLETON_OBSERVABLE = ContentType.objects.get_for_model(SingletonObservable)
+CONTENT_TYPE_SINGLETON_OBSERVABLE = SimpleLazyObject(lambda: ContentType.objects.get_for_model(SingletonObservable))
 
 def determine_matching_dingos_history_entry(action_flag,user,dingos_tag_name,fact_pks):
     """
@@ -135,31 +154,121 @@ def determine_matching_dingos_history_entry(action_flag,user,dingos_tag_name,fac
 
     if likely_dingos_tag_history_entries:
         likely_matching_entry = likely_dingos_tag_history_entries[0]
-        if user and likely_matching_entry.timestamp >= just_now:
-            # If we find a tag history item due to the current user and
-            # really really recent, we can be very sure that this is really
-            # the history item that caused the tag change
-            comment = likely_matching_entry.comment
-        else:
-            # Otherwise, we at least inform the reader that the comment
-            # was derived
-            if likely_matching_entry.comment:
+        (result_user,comment) = derive_user_and_comment_from_history_entry(user,
+                                                                           likely_matching_entry.user,
+                                                                           likely_matching_entry.comment,
+                                                                           likely_matching_entry.timestamp,
+                                                                           just_now)
 
-                comment = "%s (Comment and user derived automatically from DINGOS tag)" % likely_matching_entry.comment
-                result_user = likely_matching_entry.user
+    return (result_user,comment)
 
-            else:
-                comment = ""
-        if (not result_user) and likely_matching_entry.user and likely_matching_entry.user != user:
-            result_user = likely_matching_entry.user
-            comment = "(User derived automatically from DINGOS tag history)"
-        if user and not result_user:
-            result_user = user
 
+def derive_user_and_comment_from_history_entry(user,entry_user,entry_comment,entry_timestamp,just_now):
+    """
+    Derive user and comment for a tag action in Mantis Actionables from the likely matching entry
+    in the Dingos tag history (see ``determine_matching_dingos_history_entry``).
+
+    Returns a pair ``(user,comment)``.
+    """
+
+    result_user = None
+
+    if user and entry_timestamp >= just_now:
+        # If we find a tag history item due to the current user and
+        # really really recent, we can be very sure that this is really
+        # the history item that caused the tag change
+        comment = entry_comment
+    else:
+        # Otherwise, we at least inform the reader that the comment
+        # was derived
+        if entry_comment:
+
+            comment = "%s (Comment and user derived automatically from DINGOS tag)" % entry_comment
+            result_user = entry_user
+
+        else:
+            comment = ""
+    if (not result_user) and entry_user and entry_user != user:
+        result_user = entry_user
+        comment = "(User derived automatically from DINGOS tag history)"
+    if user and not result_user:
+        result_user = user
 
     return (result_user,comment)
 
 
+class DingosTagHistoryResolver(object):
+    """
+    Batched version of ``determine_matching_dingos_history_entry``.
+
+    Upon creation, the most recent entries of the Dingos tag history concerning
+    the given tags and facts (and, if provided, the given user) are retrieved
+    with one query (per chunk of facts). Calls of ``resolve`` are then answered
+    from memory and yield the same result as ``determine_matching_dingos_history_entry``
+    called with the same arguments.
+    """
+
+    def __init__(self,user,dingos_tag_names,fact_pks):
+
+        self.user = user
+
+        fact_content_type = ContentType.objects.get_for_model(Fact)
+
+        # Mapping from (action flag, tag name, fact pk) to the most recent history entry,
+        # given as tuple (timestamp, pk, user_id, comment)
+
+        self.entry_map = {}
+
+        dingos_tag_names = set(dingos_tag_names)
+
+        fact_pks = set(fact_pks) - set([None])
+
+        if not (dingos_tag_names and fact_pks):
+            return
+
+        for fact_pk_chunk in chunked(fact_pks):
+            history_q = TaggingHistory.objects.filter(action__in = [TaggingHistory.ADD,TaggingHistory.REMOVE],
+                                                      tag__name__in = dingos_tag_names,
+                                                      object_id__in = fact_pk_chunk,
+                                                      content_type = fact_content_type)
+            if user:
+                history_q = history_q.filter(user=user)
+
+            for (action_flag,tag_name,fact_pk,timestamp,pk,user_id,comment) in history_q.values_list('action',
+                                                                                                      'tag__name',
+                                                                                                      'object_id',
+                                                                                                      'timestamp',
+                                                                                                      'pk',
+                                                                                                      'user_id',
+                                                                                                      'comment'):
+                key = (action_flag,tag_name,fact_pk)
+                entry = (timestamp,pk,user_id,comment)
+                if key not in self.entry_map or entry > self.entry_map[key]:
+                    self.entry_map[key] = entry
+
+        self.user_map = User.objects.in_bulk(set(map(lambda x: x[2], self.entry_map.values())) - set([None]))
+
+    def resolve(self,action_flag,dingos_tag_name,fact_pks):
+        """
+        Return the pair ``(user,comment)`` for the given action flag, tag and facts.
+        """
+
+        entries = filter(None,map(lambda x: self.entry_map.get((action_flag,dingos_tag_name,x)),fact_pks))
+
+        if not entries:
+            return (None,'')
+
+        (timestamp,pk,user_id,comment) = max(entries)
+
+        just_now = timezone.now() - timedelta(milliseconds=2500)
+
+        return derive_user_and_comment_from_history_entry(self.user,
+                                                          self.user_map.get(user_id),
+                                                          comment,
+                                                          timestamp,
+                                                          just_now)
+
+
 def update_and_transfer_tag_action_to_dingos(action, context_name_set, affected_singleton_pks,user=None,comment=''):
     """
     Transfer additions/deletions of tags within Mantis Actionables into Dingos (i.e., the STIX/CybOX world)
@@ -191,49 +300,189 @@ def update_and_transfer_tag_action_to_dingos(action, context_name_set, affected_
 
     - comment (optional): will be used in tagging history in Dingos.
 
+    The links between facts and tags are created/deleted in bulk, tagging history is
+    written for the links that actually changed, and the ``mantis_tags`` of the
+    affected singleton observables are updated with one update per distinct value.
+
     """
 
     if not user:
         logger.critical("No user provided when trying to transfer tags %s from actionables to dingos" % context_name_set)
         return
 
-    affected_singletons = SingletonObservable.objects.filter(id__in=affected_singleton_pks)
+    affected_singleton_pks = set(map(int,affected_singleton_pks))
+
+    affected_fact_ids = set([])
 
-    affected_fact_ids = set(SingletonObservable.objects.filter(id__in=affected_singleton_pks).values_list('sources__iobject_fact',flat=True))
+    for singleton_pk_chunk in chunked(affected_singleton_pks):
+        affected_fact_ids.update(Source.objects.filter(content_type=CONTENT_TYPE_SINGLETON_OBSERVABLE,
+                                                       object_id__in=singleton_pk_chunk,
+                                                       iobject_fact__isnull=False).values_list('iobject_fact_id',flat=True))
+
+    # First, we fix the the tags in the Dingos world: the links between facts and tags
+    # are written/deleted in bulk via the through model of the tag manager of facts.
+
+    (through_model,fact_field,fact_lookup_kwargs) = get_fact_tag_through_info()
+
+    tag_model = through_model._meta.get_field('tag').rel.to
+
+    if action == 'add':
+        tag_name2pk_map = dict((tag_name,tag_model.objects.get_or_create(name=tag_name)[0].pk) for tag_name in context_name_set)
+    else:
+        tag_name2pk_map = dict(tag_model.objects.filter(name__in=context_name_set).values_list('name','pk'))
 
-    affected_facts = Fact.objects.filter(pk__in=affected_fact_ids)
+    tag_pk2name_map = dict((pk,name) for (name,pk) in tag_name2pk_map.items())
 
+    # Mapping from fact pks to the set of names of the tags that have actually been added/removed
+
+    fact2changed_tags_map = {}
+
+    if tag_pk2name_map:
+        existing_links = []
+
+        for fact_pk_chunk in chunked(affected_fact_ids):
+            link_q = through_model.objects.filter(tag_id__in=tag_pk2name_map.keys(),**fact_lookup_kwargs)\
+                                          .filter(**{"%s__in" % fact_field: fact_pk_chunk})
+            existing_links.extend(link_q.values_list('id',fact_field,'tag_id'))
 
-    # First, we fix the the tags in the Dingos world
-    for affected_fact in affected_facts:
-        existing_tags = set(affected_fact.tags.all())
         if action == 'add':
-            changed_tags = context_name_set.difference(existing_tags)
-            affected_fact.tags.add(*context_name_set)
+            existing_pairs = set(map(lambda x: (x[1],x[2]), existing_links))
+            new_pairs = [(fact_pk,tag_pk) for fact_pk in affected_fact_ids for tag_pk in tag_pk2name_map.keys()
+                         if not (fact_pk,tag_pk) in existing_pairs]
+
+            fact_attname = through_model._meta.get_field(fact_field).attname
+
+            new_links = []
+            for (fact_pk,tag_pk) in new_pairs:
+                link_kwargs = {'tag_id': tag_pk, fact_attname: fact_pk}
+                link_kwargs.update(fact_lookup_kwargs)
+                new_links.append(through_model(**link_kwargs))
+
+            through_model.objects.bulk_create(new_links)
+
+            changed_pairs = new_pairs
+
         elif action == 'remove':
-            changed_tags = existing_tags.difference(context_name_set)
-            affected_fact.tags.remove(*context_name_set)
+            for id_chunk in chunked(map(lambda x: x[0], existing_links)):
+                through_model.objects.filter(id__in=id_chunk).delete()
+            changed_pairs = map(lambda x: (x[1],x[2]), existing_links)
+
+        for (fact_pk,tag_pk) in changed_pairs:
+            fact2changed_tags_map.setdefault(fact_pk,set([])).add(tag_pk2name_map[tag_pk])
+
+    # Write the tagging history: facts with the same set of changed tags
+    # are treated with a single call.
+
+    changed_tags2fact_pks_map = {}
 
-        TaggingHistory.bulk_create_tagging_history(action,changed_tags,[affected_fact],user,comment)
+    for (fact_pk,changed_tags) in fact2changed_tags_map.items():
+        changed_tags2fact_pks_map.setdefault(frozenset(changed_tags),[]).append(fact_pk)
+
+    for (changed_tags,fact_pks) in changed_tags2fact_pks_map.items():
+        facts = in_bulk_chunked(Fact.objects,fact_pks).values()
+        TaggingHistory.bulk_create_tagging_history(action,changed_tags,facts,user,comment)
 
 
     # In order to support fast querying of all dingos tags associated with a SingletonObservable,
     # we maintain a list of these tags in the SingletonObservable -- that also has to be updated.
 
-    for singleton in affected_singletons:
-        if singleton.mantis_tags:
-            existing_tags = set(singleton.mantis_tags.split(','))
-        else:
-            existing_tags = set([])
-        if action == 'add':
-            existing_tags.update(context_name_set)
-        elif action == 'remove':
-            existing_tags.difference_update(context_name_set)
+    changed_mantis_tags_map = {}
+
+    for singleton_pk_chunk in chunked(affected_singleton_pks):
+        for (singleton_pk,mantis_tags) in SingletonObservable.objects.filter(pk__in=singleton_pk_chunk).values_list('pk','mantis_tags'):
+            if mantis_tags:
+                existing_tags = set(mantis_tags.split(','))
+            else:
+                existing_tags = set([])
+            if action == 'add':
+                updated_tags = existing_tags.union(context_name_set)
+            elif action == 'remove':
+                updated_tags = existing_tags.difference(context_name_set)
+
+            if updated_tags != existing_tags:
+                changed_mantis_tags_map[singleton_pk] = ",".join(sorted(updated_tags))
+
+    SingletonObservable.update_mantis_tags(changed_mantis_tags_map)
+
+
+def propagate_tag_changes(batch_size=None):
+    """
+    Drain the queue of tag changes (see ``models.TagPropagationItem``) and
+    transfer them into Dingos via ``update_and_transfer_tag_action_to_dingos``.
+
+    The queue is processed in batches of ``batch_size`` items (defaults to the setting
+    TAG_PROPAGATION_BATCH_SIZE specified in ``__init__.py``). Within a batch,
+    the changes are coalesced: for each pair of singleton observable and context,
+    only the most recent change is carried out. The remaining changes are grouped by
+    action, context, user and comment, so that one transfer is carried out per group.
+
+    Returns the number of processed queue items.
+    """
+
+    if not batch_size:
+        batch_size = MANTIS_ACTIONABLES_TAG_PROPAGATION_BATCH_SIZE
+
+    processed_count = 0
+
+    while True:
+        with transaction.atomic():
+            items = list(TagPropagationItem.objects.select_for_update().order_by('pk')[:batch_size])
+
+            if not items:
+                break
+
+            # Mapping from (object, context) to the most recent change
+
+            latest_item_map = {}
+
+            for item in items:
+                latest_item_map[(item.object_id,item.context_name)] = item
+
+            group2pks_map = {}
+
+            for item in latest_item_map.values():
+                group2pks_map.setdefault((item.action,item.context_name,item.user_id,item.comment),[]).append(item.object_id)
+
+            user_map = User.objects.in_bulk(set(map(lambda x: x[2], group2pks_map.keys())) - set([None]))
+
+            logger.debug("Propagating %s tag changes (coalesced from %s queued changes)" % (len(latest_item_map),
+                                                                                            len(items)))
+
+            for ((action,context_name,user_id,comment),singleton_pks) in group2pks_map.items():
+                update_and_transfer_tag_action_to_dingos(TagPropagationItem.ACTION_MAP[action],
+                                                         set([context_name]),
+                                                         singleton_pks,
+                                                         user=user_map.get(user_id),
+                                                         comment=comment)
+
+            for id_chunk in chunked(map(lambda x: x.pk, items)):
+                TagPropagationItem.objects.filter(id__in=id_chunk).delete()
+
+            processed_count += len(items)
+
+    return processed_count
+
+
+def get_fact_tag_through_info():
+    """
+    Determine how the through model of the tag manager of dingos facts refers to facts.
+
+    Returns a triple ``(through_model,fact_field,fact_lookup_kwargs)``, where ``fact_field``
+    is the name of the field holding the pk of the fact and ``fact_lookup_kwargs``
+    contains further lookup arguments required for restricting the through model
+    to facts (i.e., the content type in case of a generic through model).
+    """
+    through_model = Fact.tags.through
 
-        updated_tag_info = ",".join(existing_tags)
+    field_names = set(map(lambda x: x.name, through_model._meta.fields))
+
+    if 'object_id' in field_names:
+        # Generic through model (taggit's GenericTaggedItemBase)
+        return (through_model,'object_id',{'content_type':ContentType.objects.get_for_model(Fact)})
+    else:
+        # Through model with foreign key to facts (taggit's TaggedItemBase)
+        return (through_model,'content_object',{})
 
-        singleton.mantis_tags= updated_tag_info
-        singleton.save()
 
 def update_and_transfer_tags(fact_pks,user=None):
 
@@ -262,7 +511,8 @@ def update_and_transfer_tags(fact_pks,user=None):
       the import is linked with a source object that references the fact from
       which the singleton observable was derived)
 
-    - For each of the singleton observables thus found, it does the following:
+    - For the singleton observables thus found, it does the following
+      (carrying out the database operations in bulk rather than per singleton):
 
       - It calculates all dingos tags associated with each of the singleton objects
         by taking the union of all dingos tags associated with the facts referenced
@@ -280,9 +530,10 @@ def update_and_transfer_tags(fact_pks,user=None):
       - It examines each added or removed tag and sees whether that has the
         form of an actionable context (actionable tags comprise a context
         and a name). If that is the case, it calls the actionable tag management
-        function for the singleton observable with add/remove command and
-        thus transfers the addition/removal of a context in dingos into
-        mantis_actionables.
+        function with add/remove command and thus transfers the addition/removal
+        of a context in dingos into mantis_actionables; this is done with one
+        call per tag (and user/comment derived from the dingos tag history)
+        for all affected singleton observables.
 
     """
 
@@ -295,123 +546,165 @@ def update_and_transfer_tags(fact_pks,user=None):
 
     action = None
 
+    fact_pks = set(fact_pks)
+
     # Extract all tags associated with the facts and populate
     # a mapping from fact pks to dingos tags
 
     fact2tag_map = {}
 
     cols = ['id','tag_through__tag__name']
-    tag_fact_q = list(Fact.objects.filter(id__in = fact_pks).filter(tag_through__isnull=False).values(*cols))
 
-    for fact_tag_info in tag_fact_q:
-        tag_list = fact2tag_map.setdefault(fact_tag_info['id'],[])
-        tag_list.append(fact_tag_info['tag_through__tag__name'])
+    for fact_pk_chunk in chunked(fact_pks):
+        tag_fact_q = Fact.objects.filter(id__in = fact_pk_chunk).filter(tag_through__isnull=False).values_list(*cols)
+
+        for (fact_pk,tag_name) in tag_fact_q:
+            tag_list = fact2tag_map.setdefault(fact_pk,[])
+            tag_list.append(tag_name)
 
 
     logger.debug("Calculated fact2tag_map as %s" % fact2tag_map)
 
     # Find out all singleton observables in the mantis_actionables app that
-    # have a link to one of the facts via a source object
+    # have a link to one of the facts via a source object ...
 
-    affected_singletons = SingletonObservable.objects.filter(sources__iobject_fact__in=fact_pks).prefetch_related('sources')
+    affected_singleton_pks = set([])
 
-    # Update tag information in mantis_actionables for each of these
-    # singleton observables
+    for fact_pk_chunk in chunked(fact_pks):
+        affected_singleton_pks.update(Source.objects.filter(content_type=CONTENT_TYPE_SINGLETON_OBSERVABLE,
+                                                            iobject_fact_id__in=fact_pk_chunk).values_list('object_id',flat=True))
 
-    for singleton in affected_singletons:
-        logger.debug("Transfer of tags: treating singleton observable with pk %s" % singleton.pk)
-        # Determine the facts associated with this singleton
-        fact_ids = set(map(lambda x: x.iobject_fact_id, singleton.sources.all()))
+    # ... and determine all facts associated with these singletons
 
-        # Use the fact2tag_map to determine all mantis tags associated with the
-        # singleton
+    singleton2fact_ids_map = {}
 
-        logger.debug("Found the following fact ids associated with the singleton: %s" % fact_ids)
+    for singleton_pk_chunk in chunked(affected_singleton_pks):
+        source_q = Source.objects.filter(content_type=CONTENT_TYPE_SINGLETON_OBSERVABLE,
+                                         object_id__in=singleton_pk_chunk).values_list('object_id','iobject_fact_id')
+        for (singleton_pk,fact_id) in source_q:
+            singleton2fact_ids_map.setdefault(singleton_pk,set([])).add(fact_id)
 
-        found_tags = set(chain(*map(lambda x: fact2tag_map.get(x,[]),fact_ids)))
+    # Extract the mantis tags that have been stored in mantis_actionables
 
-        logger.debug("Found the following mantis tags: %s" % found_tags)
+    singleton2mantis_tags_map = {}
 
-        # Extract the mantis tags that have been stored in mantis_actionables
+    for singleton_pk_chunk in chunked(affected_singleton_pks):
+        singleton2mantis_tags_map.update(SingletonObservable.objects.filter(pk__in=singleton_pk_chunk).values_list('pk','mantis_tags'))
 
-        if singleton.mantis_tags:
-            existing_tags = set(singleton.mantis_tags.split(','))
-        else:
-            existing_tags = set([])
+    # Calculate added and removed tags for all singleton observables
 
-        logger.debug("Hitherto recorded dingos tags in mantis_actionables: %s" % existing_tags)
+    # Mapping from singleton pks to pairs (added_tags,removed_tags)
+    singleton2tag_changes_map = {}
 
-        # calculate added and removed tags
+    # Values of ``mantis_tags`` to be written
+    changed_mantis_tags_map = {}
 
-        added_tags = found_tags.difference(existing_tags)
+    for (singleton_pk,mantis_tags) in singleton2mantis_tags_map.items():
+        logger.debug("Transfer of tags: treating singleton observable with pk %s" % singleton_pk)
 
-        logger.debug("Added dingos tags: %s" % added_tags)
+        fact_ids = singleton2fact_ids_map.get(singleton_pk,set([]))
 
-        removed_tags = existing_tags.difference(found_tags)
+        # Use the fact2tag_map to determine all mantis tags associated with the
+        # singleton
 
-        logger.debug("Removed dingos tags: %s" % removed_tags)
+        found_tags = set(chain(*map(lambda x: fact2tag_map.get(x,[]),fact_ids)))
+
+        if mantis_tags:
+            existing_tags = set(mantis_tags.split(','))
+        else:
+            existing_tags = set([])
+
+        added_tags = found_tags.difference(existing_tags)
 
+        removed_tags = existing_tags.difference(found_tags)
 
         if added_tags or removed_tags:
 
+            logger.debug("Singleton %s: added dingos tags %s, removed dingos tags %s" % (singleton_pk,
+                                                                                        added_tags,
+                                                                                        removed_tags))
+
             # Tags have been added or removed: we store the current list
             # of dingos tags with the singleton observable.
 
             updated_tag_info = list(found_tags)
             updated_tag_info.sort()
 
-            updated_tag_info = ",".join(updated_tag_info)
+            changed_mantis_tags_map[singleton_pk] = ",".join(updated_tag_info)
+
+            singleton2tag_changes_map[singleton_pk] = (added_tags,removed_tags)
 
-            singleton.mantis_tags= updated_tag_info
-            singleton.save()
+    if not singleton2tag_changes_map:
+        return
 
-            # We may have to update the status
+    SingletonObservable.update_mantis_tags(changed_mantis_tags_map)
 
-            singleton.update_status(update_function=updateStatus,
-                                    action=action,
-                                    user=user,
-                                    added_tags=added_tags,
-                                    removed_tags=removed_tags)
+    # We may have to update the status
 
-        # Check if any of the added/removed dingos tag is matching the context pattern.
-        # If it is, transfer the change into the set of actionable tags associated with
-        # this singleton observable
+    changed_singletons = in_bulk_chunked(SingletonObservable.objects,singleton2tag_changes_map.keys())
 
-        if added_tags or removed_tags:
+    for (singleton_pk,(added_tags,removed_tags)) in singleton2tag_changes_map.items():
+        changed_singletons[singleton_pk].update_status(update_function=updateStatus,
+                                                       action=action,
+                                                       user=user,
+                                                       added_tags=added_tags,
+                                                       removed_tags=removed_tags)
+
+    # Check if any of the added/removed dingos tag is matching the context pattern.
+    # If it is, transfer the change into the set of actionable tags associated with
+    # the singleton observables. We collect the singletons per action, tag and the user/comment
+    # derived from the dingos tag history, so that one bulk action is carried out per tag
+    # rather than per singleton.
+
+    context_tags = set([])
+    context_tag_fact_ids = set([])
+
+    for (singleton_pk,(added_tags,removed_tags)) in singleton2tag_changes_map.items():
+        singleton_context_tags = set(filter(lambda tag: any(regex.match(tag) for regex in MANTIS_ACTIONABLES_CONTEXT_TAG_REGEX),
+                                            added_tags | removed_tags))
+        if singleton_context_tags:
+            context_tags.update(singleton_context_tags)
+            context_tag_fact_ids.update(singleton2fact_ids_map.get(singleton_pk,set([])))
+
+    if not context_tags:
+        return
+
+    # The user/comment for each context tag change is derived from the dingos
+    # tag history; the relevant history entries are retrieved in one go.
 
-            for tag in added_tags:
-                if any(regex.match(tag) for regex in MANTIS_ACTIONABLES_CONTEXT_TAG_REGEX):
-                    logger.debug("Found added special tag %s" % tag)
-                    (result_user,comment) = determine_matching_dingos_history_entry(TaggingHistory.ADD,
-                                                                                        user,
-                                                                                        tag,
-                                                                                        fact_ids)
-                    ActionableTag.bulk_action(action = 'add',
-                                              context_name_pairs=[(tag,tag)],
-                                              thing_to_tag_pks=[singleton.pk],
-                                              user=result_user,
-                                              comment=comment,
-                                              supress_transfer_to_dingos= True)
-            for tag in removed_tags:
-                if any(regex.match(tag) for regex in MANTIS_ACTIONABLES_CONTEXT_TAG_REGEX):
-                    logger.debug("Found context tag %s" % tag)
-                    (result_user,comment) = determine_matching_dingos_history_entry(TaggingHistory.REMOVE,
-                                                                                        user,
-                                                                                        tag,
-                                                                                        fact_ids)
-                    ActionableTag.bulk_action(action = 'remove',
-                                              context_name_pairs=[(tag,tag)],
-                                              thing_to_tag_pks=[singleton.pk],
-                                              user=result_user,
-                                              comment=comment,
-                                              supress_transfer_to_dingos= True)
+    history_resolver = DingosTagHistoryResolver(user,context_tags,context_tag_fact_ids)
+
+    bulk_action2singleton_pks_map = {}
+
+    for (singleton_pk,(added_tags,removed_tags)) in singleton2tag_changes_map.items():
+        fact_ids = singleton2fact_ids_map.get(singleton_pk,set([]))
+        for (bulk_action,action_flag,tags) in [('add',TaggingHistory.ADD,added_tags),
+                                               ('remove',TaggingHistory.REMOVE,removed_tags)]:
+            for tag in tags:
+                if tag in context_tags:
+                    logger.debug("Found context tag %s (%s)" % (tag,bulk_action))
+                    (result_user,comment) = history_resolver.resolve(action_flag,
+                                                                     tag,
+                                                                     fact_ids)
+                    bulk_action2singleton_pks_map.setdefault((bulk_action,tag,result_user,comment),[]).append(singleton_pk)
+
+    for ((bulk_action,tag,result_user,comment),singleton_pks) in bulk_action2singleton_pks_map.items():
+        ActionableTag.bulk_action(action = bulk_action,
+                                  context_name_pairs=[(tag,tag)],
+                                  thing_to_tag_pks=singleton_pks,
+                                  user=result_user,
+                                  comment=comment,
+                                  supress_transfer_to_dingos= True)
 
 
 
 def import_singleton_observables_from_STIX_iobjects(top_level_iobjs, user = None,
                                                     action_comment="Actionables Import",
                                                     tags_to_add = None,
-                                                    tagging_comment = ""):
+                                                    tagging_comment = "",
+                                                    post_process = True,
+                                                    chunk_size = None,
+                                                    use_export_cache = True):
     """
     Import basic indicators contained in STIX reports into Mantis Actionables
 
@@ -430,6 +723,23 @@ def import_singleton_observables_from_STIX_iobjects(top_level_iobjs, user = None
     - tagging_comment: Comment that should be used for tagging history (in case
       ``tags_to_add`` contains context names.)
 
+    - post_process: If set to ``False``, the post-processing steps (outdating of
+      sources and transfer of tags, see ``post_process_import``) are not carried
+      out; the caller is then responsible for calling ``post_process_import``
+      with the return value of this function.
+
+    - chunk_size: Number of export results that are imported in one go (defaults
+      to the setting IMPORT_CHUNK_SIZE specified in ``__init__.py``).
+
+    - use_export_cache: If set to ``False``, the exporters are run even if their
+      results for a report are available in the ExportResultCache (see
+      ``iter_export_results``).
+
+    The function returns a list with one dictionary per imported report::
+
+        {'top_level_iobj_identifier_pk': <pk of the identifier of the report>,
+         'fact_pks': [<pks of the facts from which singleton observables were imported>]}
+
     The function carries out the following actions:
 
     - For each object passed to the function, it determines the
@@ -446,7 +756,8 @@ def import_singleton_observables_from_STIX_iobjects(top_level_iobjs, user = None
       The  values in the list refer to the name specified in
       ``mantis_stix_importer.STIX_POSTPROCESSOR_REGISTRY``.
 
-    - The function concatenates the results of all exporter runs. In order to
+    - The function streams the results of all exporter runs (see ``iter_export_results``)
+      into the import in chunks of ``chunk_size`` results. In order to
       be imported into mantis_actionables, a single exporter result must
       yield the following keys::
 
@@ -486,6 +797,9 @@ def import_singleton_observables_from_STIX_iobjects(top_level_iobjs, user = None
     if not tags_to_add:
         tags_to_add=[]
 
+    if not chunk_size:
+        chunk_size = MANTIS_ACTIONABLES_IMPORT_CHUNK_SIZE
+
     # Retrieve the primary keys of the top-level objects
     if top_level_iobjs:
         if isinstance(top_level_iobjs[0],InfoObject):
@@ -501,88 +815,375 @@ def import_singleton_observables_from_STIX_iobjects(top_level_iobjs, user = None
 
     action, created_action = Action.objects.get_or_create(user=user,comment=action_comment)
 
-    # Variable for collecting results
-    results_per_top_level_obj = []
+    # Variable for collecting information about the imported reports
+    import_infos = []
+
+    # Extract pks of the identifiers of the top-level iobjects
+
+    iobj_pk2identifier_pk_map = {}
+
+    for iobj_pk_chunk in chunked(top_level_iobj_pks):
+        iobj_pk2identifier_pk_map.update(InfoObject.objects.filter(pk__in=iobj_pk_chunk).values_list('pk','identifier_id'))
 
     for top_level_iobj_pk in top_level_iobj_pks:
 
-        # Generate downwards reachability graph
-        graph= follow_references([top_level_iobj_pk],
-                                 skip_terms = [],
-                                 direction='down'
-                                 )
+        # Downwards reachability graph: it is only generated
+        # if an exporter actually has to be run.
+
+        graph = LazyGraph(top_level_iobj_pk)
+
+        top_level_iobj_identifier_pk = iobj_pk2identifier_pk_map[top_level_iobj_pk]
+
+
+        # The export results are consumed in chunks of bounded size rather
+        # than being collected for the whole report; information that is
+        # required across chunks (essence of related nodes, status information
+        # per singleton observable) is carried over between the chunks.
+
+        essence_cache = {}
+
+        status_accumulator = StatusUpdateAccumulator()
+
+        fact_pks = set([])
+
+        for results in chunked(iter_export_results(top_level_iobj_pk,
+                                                    graph,
+                                                    essence_cache,
+                                                    use_cache=use_export_cache),
+                               chunk_size):
+
+            logger.debug("Importing chunk of %s export results" % len(results))
+
+            # If tags_to_add is set, the user wants us to add dingos tags to both the SingletonObjects and
+            # the facts (in Dingos) from which they were derived.
+            #
+            # We achieve this by tagging the facts *now* -- the latter import steps will take care
+            # to transfer these tags also to the SingletonObjects.
+
+            if tags_to_add:
+
+                # Extract the primary keys of all facts from the export results
+
+                chunk_fact_pks = set(map(lambda x: x.get('_fact_pk'), results))
+
+                logger.debug("Found fact pks %s" % chunk_fact_pks)
+
+                facts_to_tag = Fact.objects.filter(pk__in=chunk_fact_pks)
+
+                for fact in facts_to_tag:
+                    logger.debug("Adding tags %s" % tags_to_add)
+                    fact.tags.add(*tags_to_add)
+                # Write the history.
+                TaggingHistory.bulk_create_tagging_history('add',
+                                                           tags_to_add,
+                                                           facts_to_tag,
+                                                           user,
+                                                           tagging_comment)
+
+            # Carry on with importing the SingletonObservables from the results
+            # for the given top level object.
+
+            fact_pks.update(import_singleton_observables_from_export_result(top_level_iobj_identifier_pk,
+                                                                            top_level_iobj_pk,
+                                                                            results,action=action,
+                                                                            user=user,
+                                                                            graph=graph,
+                                                                            essence_cache=essence_cache,
+                                                                            status_accumulator=status_accumulator,
+                                                                            post_process=False))
+
+        # Update the status of each imported singleton observable once,
+        # taking into account all of its sources in this report
+
+        status_accumulator.flush(action=action,
+                                 user=user,
+                                 graph=graph)
+
+        if post_process:
+            post_process_import([top_level_iobj_identifier_pk],fact_pks,user=user)
+
+        import_infos.append({'top_level_iobj_identifier_pk': top_level_iobj_identifier_pk,
+                             'fact_pks': list(fact_pks)})
+
+    return import_infos
+
+
+class LazyGraph(object):
+    """
+    Stand-in for the downward reachability graph of a top-level InfoObject.
+
+    ``follow_references`` is only called once the graph is actually accessed,
+    so that imports for which all export results can be taken from the
+    ``ExportResultCache`` never traverse the graph. If ``annotate`` is set,
+    ``annotate_graph`` is called on the generated graph (as required for
+    treating raw export results, see ``import_singleton_observables_from_export_result``).
+
+    Special methods are looked up on the class rather than via ``__getattr__``,
+    so those used on graphs (indexing, membership tests, iteration) are
+    delegated explicitly.
+    """
+
+    def __init__(self,top_level_iobj_pk,annotate=False):
+        self.top_level_iobj_pk = top_level_iobj_pk
+        self.annotate = annotate
+        self._graph = None
+
+    @property
+    def is_materialized(self):
+        return self._graph is not None
+
+    def materialize(self):
+        if self._graph is None:
+            logger.debug("Generating graph for top-level object %s" % self.top_level_iobj_pk)
+            graph = follow_references([self.top_level_iobj_pk],
+                                      skip_terms = [],
+                                      direction='down'
+                                      )
+            if self.annotate:
+                annotate_graph(graph)
+            self._graph = graph
+        return self._graph
+
+    def __getattr__(self,name):
+        if name.startswith('__') or name == '_graph':
+            raise AttributeError(name)
+        return getattr(self.materialize(),name)
+
+    def __getitem__(self,node):
+        return self.materialize()[node]
+
+    def __contains__(self,node):
+        return node in self.materialize()
+
+    def __iter__(self):
+        return iter(self.materialize())
+
+    def __len__(self):
+        return len(self.materialize())
+
+    def __nonzero__(self):
+        # Truth tests (``if graph: ...``) must not generate the graph.
+        return True
+
+    # The graph is never pickled along: it is regenerated where required.
+
+    def __getstate__(self):
+        return {'top_level_iobj_pk': self.top_level_iobj_pk,
+                'annotate': self.annotate}
 
-        # Extract pk of the identifier of the top-level iobject
+    def __setstate__(self,state):
+        self.top_level_iobj_pk = state['top_level_iobj_pk']
+        self.annotate = state.get('annotate',False)
+        self._graph = None
 
-        top_level_iobj_identifier_pk = graph.node[top_level_iobj_pk]['identifier_pk']
 
+# Version of the format produced by ``normalize_export_result``: increase
+# when changing the format in order to invalidate the ExportResultCache.
 
-        postprocessor=None
+EXPORT_RESULT_FORMAT_VERSION = 1
 
-        # variable for storing results for this top-level object
-        results = []
+# Keys of an export result that are carried over into the normalized result
 
+NORMALIZED_RESULT_KEYS = ('actionable_type',
+                          'actionable_subtype',
+                          'actionable_info',
+                          'actionable_ids_rule',
+                          '_fact_pk',
+                          '_value_pk',
+                          '_identifier_pk',
+                          '_iobject_pk')
 
-        # We reuse the postprocessor object; thus we
-        # have to do certain processing carried out
-        # in the object (e.g., enrichment of the graph) only once
 
-        postprocessor_obj = None
+def get_exporter_version(exporter):
+    """
+    Derive a version string for the given exporter from the postprocessor
+    classes registered for it (and their ``version`` attribute, if present).
+    """
+    version_info = [EXPORT_RESULT_FORMAT_VERSION]
+    for postprocessor_class in POSTPROCESSOR_REGISTRY[exporter]:
+        version_info.append("%s.%s:%s" % (postprocessor_class.__module__,
+                                          postprocessor_class.__name__,
+                                          getattr(postprocessor_class,'version','')))
+    return hashlib.sha1(repr(version_info)).hexdigest()
+
+
+def normalize_export_result(result,graph,essence_cache):
+    """
+    Reduce an export result to the information required by the import.
+
+    The normalized result contains the keys in ``NORMALIZED_RESULT_KEYS``; rather
+    than the graph nodes in ``_relationship_info``, it contains in ``_related_entities``
+    the information about related STIX entities as extracted by
+    ``extract_related_entity_info``. Normalized results contain only pks, types
+    and values, so they can be serialized as JSON.
+    """
+    normalized = dict((key,result[key]) for key in NORMALIZED_RESULT_KEYS if key in result)
+    normalized['_related_entities'] = map(list,extract_related_entity_info(result.get('_relationship_info',[]),
+                                                                          graph,
+                                                                          essence_cache))
+    return normalized
+
+
+# Version of the payload format produced by ``make_export_payload``
+
+EXPORT_PAYLOAD_VERSION = 1
+
+
+def make_export_payload(top_level_iobj_pk,export_results,graph=None,essence_cache=None):
+    """
+    Turn export results into a compact payload for ``tasks.async_export_to_actionables``.
+
+    Raw export results contain model instances (``_io2fv``) and graph nodes with fact
+    objects, all of which would have to be pickled through the broker. The payload
+    only contains the normalized results (see ``normalize_export_result``)::
+
+        {'payload_version': EXPORT_PAYLOAD_VERSION,
+         'results': [ <normalized export result>, ... ]}
+
+    If no graph is given, it is generated (and annotated) from ``top_level_iobj_pk``
+    where required for extracting the information about related STIX entities.
+    """
+    if graph is None:
+        graph = LazyGraph(top_level_iobj_pk,annotate=True)
+    if essence_cache is None:
+        essence_cache = {}
+
+    results = []
+    for result in export_results:
+        if '_related_entities' not in result:
+            # Raw results require the actual graph (see
+            # ``import_singleton_observables_from_export_result``).
+            if isinstance(graph,LazyGraph):
+                graph = graph.materialize()
+            result = normalize_export_result(result,graph,essence_cache)
+        results.append(result)
+
+    return {'payload_version': EXPORT_PAYLOAD_VERSION,
+            'results': results}
+
+
+def read_export_payload(payload):
+    """
+    Extract the export results from a payload produced by ``make_export_payload``;
+    for compatibility, a plain list of (raw) export results is passed through.
+    """
+    if isinstance(payload,dict):
+        if payload.get('payload_version') != EXPORT_PAYLOAD_VERSION:
+            raise ValueError("Unsupported export payload version %s" % payload.get('payload_version'))
+        return payload['results']
+    return payload
+
+
+def export_to_actionables_async(top_level_iobj_identifier_pk,top_level_iobj_pk,export_results,graph=None,user=None):
+    """
+    Import the given export results asynchronously via ``tasks.async_export_to_actionables``,
+    passing the results as compact payload (see ``make_export_payload``) rather
+    than passing results and graph as such.
+    """
+    return async_export_to_actionables.delay(top_level_iobj_identifier_pk,
+                                             top_level_iobj_pk,
+                                             make_export_payload(top_level_iobj_pk,export_results,graph=graph),
+                                             user=user)
+
+
+def get_graph_revisions(graph,top_level_iobj_pk):
+    """
+    Return the pairs (identifier pk, InfoObject pk) of all objects in the graph
+    apart from the top-level object: references in the graph are resolved to the
+    latest revision of the referenced objects, so results derived from the graph
+    are outdated once one of these objects is revised.
+    """
+    return [(graph.node[node]['identifier_pk'],node) for node in graph.nodes() if node != top_level_iobj_pk]
+
+
+def iter_export_results(top_level_iobj_pk,graph,essence_cache,use_cache=True):
+    """
+    Run the exporters specified in ACTIVE_MANTIS_EXPORTERS on the
+    given graph and yield the normalized export results one by one
+    (see ``normalize_export_result``).
+
+    Since InfoObject revisions never change, the normalized results of each exporter
+    are stored in the ExportResultCache; if ``use_cache`` is set and results for
+    the top-level object and the current version of an exporter exist that were
+    derived from the latest revisions of all referenced objects, these are
+    yielded instead and the exporter is not run. Results of exporter runs yielding
+    more than EXPORT_CACHE_MAX_RESULTS results are not cached. The graph is only accessed
+    for exporters that actually have to be run, so pass a ``LazyGraph`` to avoid
+    the graph traversal altogether.
+    """
+
+    # We reuse the postprocessor object; thus we
+    # have to do certain processing carried out
+    # in the object (e.g., enrichment of the graph) only once
+
+    postprocessor_obj = None
 
-        for exporter in MANTIS_ACTIONABLES_ACTIVE_EXPORTERS:
+    for exporter in MANTIS_ACTIONABLES_ACTIVE_EXPORTERS:
 
-            postprocessor_classes = POSTPROCESSOR_REGISTRY[exporter]
+        exporter_version = get_exporter_version(exporter)
 
-            for postprocessor_class in postprocessor_classes:
+        if use_cache:
+            cache_entry = ExportResultCache.objects.filter(iobject_id=top_level_iobj_pk,
+                                                           exporter=exporter,
+                                                           exporter_version=exporter_version).first()
+            if cache_entry and not cache_entry.is_current():
+                logger.debug("Cached results of exporter %s for top-level object %s are outdated" % (exporter,
+                                                                                                      top_level_iobj_pk))
+                cache_entry = None
+            if cache_entry:
+                logger.debug("Using cached results of exporter %s for top-level object %s" % (exporter,
+                                                                                               top_level_iobj_pk))
+                for result in cache_entry.get_results():
+                    yield result
+                continue
 
-                postprocessor = postprocessor_class(graph=graph,
-                                                    query_mode='vIO2FValue',
-                                                    # By feeding in the existing postprocessor,
-                                                    # we re-use the information that has
-                                                    # already been pulled from the database
-                                                    # rather than pulling it again for
-                                                    # each iteration.
-                                                    details_obj = postprocessor_obj
-                                                    )
+        if isinstance(graph,LazyGraph):
+            graph = graph.materialize()
 
-                postprocessor_obj = postprocessor
+        # The normalized results of the exporter are collected for
+        # writing them into the cache -- unless there are too many of them:
+        # the results are streamed into the import in order to bound the
+        # memory consumption, which collecting them all would defeat.
 
-                (content_type,part_results) = postprocessor.export(override_columns='EXPORTER', format='exporter')
+        exporter_results = [] if use_cache else None
 
-                results += part_results
+        postprocessor_classes = POSTPROCESSOR_REGISTRY[exporter]
 
-        # If tags_to_add is set, the user wants us to add dingos tags to both the SingletonObjects and
-        # the facts (in Dingos) from which they were derived.
-        #
-        # We achieve this by tagging the facts *now* -- the latter import steps will take care
-        # to transfer these tags also to the SingletonObjects.
+        for postprocessor_class in postprocessor_classes:
 
-        # Extract the primary keys of all facts from the export results
+            postprocessor = postprocessor_class(graph=graph,
+                                                query_mode='vIO2FValue',
+                                                # By feeding in the existing postprocessor,
+                                                # we re-use the information that has
+                                                # already been pulled from the database
+                                                # rather than pulling it again for
+                                                # each iteration.
+                                                details_obj = postprocessor_obj
+                                                )
 
-        fact_pks = set(map(lambda x: x.get('_fact_pk'), results))
+            postprocessor_obj = postprocessor
 
-        logger.debug("Found fact pks %s" % fact_pks)
+            (content_type,part_results) = postprocessor.export(override_columns='EXPORTER', format='exporter')
 
-        facts_to_tag = Fact.objects.filter(pk__in=fact_pks)
+            for result in part_results:
+                result = normalize_export_result(result,graph,essence_cache)
+                if exporter_results is not None:
+                    if len(exporter_results) < MANTIS_ACTIONABLES_EXPORT_CACHE_MAX_RESULTS:
+                        exporter_results.append(result)
+                    else:
+                        logger.info("Results of exporter %s for top-level object %s exceed %s results:"
+                                    " they are not cached" % (exporter,
+                                                              top_level_iobj_pk,
+                                                              MANTIS_ACTIONABLES_EXPORT_CACHE_MAX_RESULTS))
+                        exporter_results = None
+                yield result
 
-        for fact in facts_to_tag:
-            logger.debug("Adding tags %s" % tags_to_add)
-            fact.tags.add(*tags_to_add)
-        # Write the history.
-        TaggingHistory.bulk_create_tagging_history('add',
-                                                   tags_to_add,
-                                                   facts_to_tag,
-                                                   user,
-                                                   tagging_comment)
+            del part_results
 
-        # Carry on with importing the SingletonObservables from the results
-        # for the given top level object.
+        if exporter_results is not None:
+            ExportResultCache.store(top_level_iobj_pk,exporter,exporter_version,exporter_results,
+                                    get_graph_revisions(graph,top_level_iobj_pk))
 
-        import_singleton_observables_from_export_result(top_level_iobj_identifier_pk,
-                                                        top_level_iobj_pk,
-                                                        results,action=action,
-                                                        user=user,
-                                                        graph=graph)
 
 def import_singleton_observables_from_export_result(top_level_iobj_identifier_pk,
                                                     top_level_iobj_pk,
@@ -590,6 +1191,9 @@ def import_singleton_observables_from_export_result(top_level_iobj_identifier_pk
                                                     action=None,
                                                     user=None,
                                                     graph=None,
+                                                    essence_cache=None,
+                                                    status_accumulator=None,
+                                                    post_process=True,
                                                     ):
     """
     Import basic indicators found in a STIX-Report/Package into Mantis Actionables
@@ -629,10 +1233,27 @@ def import_singleton_observables_from_export_result(top_level_iobj_identifier_pk
               '_relationship_info': [ List of networkx-nodes]
           }
 
+      Normalized results (see ``normalize_export_result``) are accepted as
+      well: these carry the information about related STIX entities in
+      ``_related_entities`` rather than ``_relationship_info`` and do not
+      require the graph.
+
     - action: Action object with which this import is to be associated
     - user: User carrying out the import (can be None)
-    - graph: networkx-Graph from which the results were derived. If no
-      graph is supplied, then one is generated as downward reachability graph
+    - graph: networkx-Graph (or LazyGraph) from which the results were derived. If no
+      graph is supplied, then one is generated (where required) as annotated downward
+      reachability graph
+    - essence_cache: dictionary for memoizing the essence extracted from
+      graph nodes (see ``extract_related_entity_info``). Pass the same
+      dictionary when importing several result sets derived from the same graph.
+    - status_accumulator: StatusUpdateAccumulator for collecting the status information
+      of the imported singleton observables. If an accumulator is passed, the caller
+      is responsible for flushing it (i.e., for updating the status); otherwise,
+      the status is updated at the end of this function.
+    - post_process: If set to ``False``, the post-processing steps (see
+      ``post_process_import``) are left to the caller.
+
+    The function returns the set of pks of the facts referenced in the results.
 
 
     - The function extracts the set of all 'object.pk's. It then queries MANTIS for all
@@ -655,31 +1276,14 @@ def import_singleton_observables_from_export_result(top_level_iobj_identifier_pk
 
     """
 
-    if not graph:
-        graph = follow_references([top_level_iobj_pk],
-                                  skip_terms = [],
-                                  direction='down'
-                                  )
-
-        annotate_graph(graph)
+    if graph is None:
+        graph = LazyGraph(top_level_iobj_pk,annotate=True)
 
     # There is information which we can most efficiently retrieve
     # by bulk queries to the database rather than item by item.
     # We write the results of these queries into maps.
 
-    # Mapping information objects to TLP information
-
-    iobj2tlp_map = {}
-
-    # Mapping from identifier_pks to related_entities
-
-    identifier_pk_2_related_entity_map = {}
-
-    # access graph node for top-level object
-
-    top_level_node = graph.node[top_level_iobj_pk]
-
-    logger.info("Treating %s:%s" % (top_level_node['identifier_ns'],top_level_node['identifier_uid']))
+    logger.info("Treating top-level object %s (identifier %s)" % (top_level_iobj_pk,top_level_iobj_identifier_pk))
 
     # If no action object was provided, create one
     if not action:
@@ -690,29 +1294,30 @@ def import_singleton_observables_from_export_result(top_level_iobj_identifier_pk
     # Here we extract the pks of all information objects containing one of the basic indicators
     # to be imported
 
-    containing_iobj_pks = set(map(lambda x: x.get('_iobject_pk'), results))
+    containing_iobj_pks = set(map(lambda x: int(x.get('_iobject_pk')), results))
+
+    # Mapping information objects to TLP information; we also record the
+    # TLP information of the top-level object, which is displayed in the dashboard.
+    # The report has been imported into Dingos completely, so objects without TLP
+    # marking are recorded as such.
 
-    # The TLP information is stored in markings
-    select_columns = ['identifier_id','marking_thru__marking__fact_thru__fact__fact_values__value']
-    color_qs = InfoObject.objects.filter(id__in=containing_iobj_pks)\
-        .filter(marking_thru__marking__fact_thru__fact__fact_term__term='Marking_Structure',
-                marking_thru__marking__fact_thru__fact__fact_term__attribute='color')\
-        .values_list(*select_columns)
+    iobj2tlp_map = dict((iobject_pk,color.lower())
+                        for (iobject_pk,color)
+                        in InfoObjectTLP.get_tlp_map(containing_iobj_pks | set([top_level_iobj_pk]),
+                                                     record_missing=True).items())
 
-    for iobject_tlp_info in color_qs:
-        iobj2tlp_map[iobject_tlp_info[0]] = iobject_tlp_info[1].lower()
+    # Extract the information from the export results and weed out
+    # incomplete results
+
+    import_entries = []
 
     for result in results:
 
         # extract information from export result
 
-        identifier_pk = int(result['_identifier_pk'])
         iobject_pk = int(result['_iobject_pk'])
-        fact_pk = int(result['_fact_pk'])
-        fact_value_pk = int(result['_value_pk'])
         type = result.get('actionable_type','')
         subtype = result.get('actionable_subtype','')
-        ids_rule = result.get('actionable_ids_rule','')
 
         if not subtype:
             # If by mistake, subtype has been set to None,
@@ -729,116 +1334,429 @@ def import_singleton_observables_from_export_result(top_level_iobj_identifier_pk
                                                              iobject_pk))
             continue
 
+        import_entries.append(((type,subtype,value),result))
+
+    # Get or create all singleton observables in one go rather than
+    # one by one.
+
+    triple2pk_map, created_triples = SingletonObservable.bulk_get_or_create(map(lambda x: x[0], import_entries))
+
+    logger.info("Found %s singleton observables, %s of which have been newly created" % (len(triple2pk_map),
+                                                                                         len(created_triples)))
+
+    pk2observable_map = in_bulk_chunked(SingletonObservable.objects,triple2pk_map.values())
+
+    # The source meta data only depends on the top-level object; the default
+    # meta data does not require the graph node, so we only access
+    # the graph (which may be a LazyGraph) if a custom function is configured.
+
+    if MANTIS_ACTIONABLES_SRC_META_DATA_FUNCTION_PATH:
         src_meta_data = createSourceMetaData(top_level_node=graph.node[top_level_iobj_pk])
-        if not src_meta_data:
-            src_meta_data = {}
+    else:
+        src_meta_data = createSourceMetaData()
+    if not src_meta_data:
+        src_meta_data = {}
 
-        origin_info = src_meta_data.get('origin',Source.ORIGIN_UNKNOWN)
-        processing_info = src_meta_data.get('processing',Source.PROCESSING_UNKNOWN)
+    origin_info = src_meta_data.get('origin',Source.ORIGIN_UNKNOWN)
+    processing_info = src_meta_data.get('processing',Source.PROCESSING_UNKNOWN)
 
-        singleton_type_obj = SingletonObservableType.cached_objects.get_or_create(name=type)[0]
-        singleton_subtype_obj = SingletonObservableSubtype.cached_objects.get_or_create(name=subtype)[0]
+    # Determine the source objects required for the import results and
+    # reconcile them with the source objects that already exist in the
+    # database for the top-level object
 
-        observable, observable_created = SingletonObservable.objects.get_or_create(type=singleton_type_obj,
-                                                                                   subtype=singleton_subtype_obj,
-                                                                        value=value)
-        if ids_rule:
-            observable.add_ids_signature(signature_text=ids_rule)
-
-        source, source_created = Source.objects.get_or_create(iobject_identifier_id=identifier_pk,
-
-                                                       iobject_fact_id=fact_pk,
-                                                       iobject_factvalue_id=fact_value_pk,
-                                                       top_level_iobject_identifier_id=top_level_iobj_identifier_pk,
-                                                       object_id=observable.id,
-                                                       content_type=CONTENT_TYPE_SINGLETON_OBSERVABLE,
-                                                       defaults = {
-                                                          'iobject_id': iobject_pk,
-                                                          'top_level_iobject_id' : top_level_iobj_pk,
-                                                          'processing': processing_info,
-                                                          'origin': origin_info
-                                                       }
-
-                                                    )
-        if not source_created:
-            logger.debug("Found existing source object, updating")
-            source.iobject_id = iobject_pk
-            source.top_level_iobject_id = top_level_iobj_pk
-            source.processing = processing_info
-            source.origin = origin_info
-            source.save()
-        else:
-            logger.debug("Created new source object")
+    source_key2values_map = {}
+
+    for ((type,subtype,value),result) in import_entries:
+        identifier_pk = int(result['_identifier_pk'])
 
+        source_key = (identifier_pk,
+                      int(result['_fact_pk']),
+                      int(result['_value_pk']),
+                      top_level_iobj_identifier_pk,
+                      None,
+                      CONTENT_TYPE_SINGLETON_OBSERVABLE.id,
+                      triple2pk_map[(type,subtype,value)])
 
-        entities=[]
+        source_key2values_map[source_key] = {'iobject_id': int(result['_iobject_pk']),
+                                             'top_level_iobject_id': top_level_iobj_pk,
+                                             'processing': processing_info,
+                                             'origin': origin_info,
+                                             'tlp': Source.TLP_RMAP.get(iobj2tlp_map.get(int(result['_iobject_pk']),None),
+                                                                        Source.TLP_UNKOWN)}
 
+    source_key2source_map = reconcile_sources(top_level_iobj_identifier_pk,source_key2values_map)
 
-        for node in result['_relationship_info']:
-            essence_info = extract_essence(node, graph)
+    # Determine the related STIX entities (indicators, campaigns, threat actors)
+    # of each result: the essence of each related node is extracted only once.
 
-            if not essence_info:
-                essence_info = None
-            else:
-                essence_info = dumps(essence_info)
+    if essence_cache is None:
+        essence_cache = {}
 
-            if essence_info:
-                node_identifier_pk = node['identifier_pk']
+    result_related_entity_infos = []
+    identifier_pk2entity_info_map = {}
 
+    for ((type,subtype,value),result) in import_entries:
+        if '_related_entities' in result:
+            # Normalized result (see ``normalize_export_result``)
+            related_entity_infos = map(tuple,result['_related_entities'])
+        else:
+            # Raw results require the actual graph (the traversals in ``extract_essence``
+            # are not restricted to the interface delegated by LazyGraph).
+            if isinstance(graph,LazyGraph):
+                graph = graph.materialize()
+            related_entity_infos = extract_related_entity_info(result['_relationship_info'],graph,essence_cache)
+        for (node_identifier_pk,iobject_type,essence_info) in related_entity_infos:
+            identifier_pk2entity_info_map.setdefault(node_identifier_pk,(iobject_type,essence_info))
+        result_related_entity_infos.append(related_entity_infos)
+
+    identifier_pk2entity_map = reconcile_stix_entities(identifier_pk2entity_info_map)
 
-                entity = identifier_pk_2_related_entity_map.get(node_identifier_pk)
+    # Mapping from source pks to the pks of the STIX entities that are to be linked
+    # to the source
 
-                if not entity:
-                    entity_type, created = EntityType.cached_objects.get_or_create(name=node['iobject_type'])
-                    entity, created = STIX_Entity.objects.get_or_create(iobject_identifier_id=node_identifier_pk,
-                                                                        non_iobject_identifier='',
-                                                                        defaults={'essence': essence_info,
-                                                                                  'entity_type':entity_type})
-                    if not created:
-                        entity.essence = essence_info
-                        entity.entity_type = entity_type
-                        entity.save()
+    source_pk2entity_pks_map = {}
 
-                    identifier_pk_2_related_entity_map[node_identifier_pk] = entity
+    # Mapping from pks of singleton observables to the IDS signatures
+    # found for them in the results
 
+    observable_pk2ids_rule_map = {}
 
-                entities.append(entity)
+    # Collects status information per singleton observable
 
+    if status_accumulator is None:
+        status_accumulator = StatusUpdateAccumulator()
+        flush_status = True
+    else:
+        flush_status = False
 
-        source.related_stix_entities.clear()
+    for (((type,subtype,value),result),related_entity_infos) in zip(import_entries,result_related_entity_infos):
 
-        source.related_stix_entities.add(*entities)
+        identifier_pk = int(result['_identifier_pk'])
+        ids_rule = result.get('actionable_ids_rule','')
 
-        tlp_color = Source.TLP_RMAP.get(iobj2tlp_map.get(identifier_pk,None),Source.TLP_UNKOWN)
-        if not source.tlp == tlp_color:
-            source.tlp = tlp_color
-            source.save()
+        observable = pk2observable_map[triple2pk_map[(type,subtype,value)]]
+        observable_created = (type,subtype,value) in created_triples
+
+        if ids_rule:
+            observable_pk2ids_rule_map[observable.pk] = ids_rule
+
+        source = source_key2source_map[(identifier_pk,
+                                        int(result['_fact_pk']),
+                                        int(result['_value_pk']),
+                                        top_level_iobj_identifier_pk,
+                                        None,
+                                        CONTENT_TYPE_SINGLETON_OBSERVABLE.id,
+                                        observable.id)]
+
+        entities = map(lambda x: identifier_pk2entity_map[x[0]], related_entity_infos)
+
+        source_pk2entity_pks_map[source.pk] = set(map(lambda x: x.pk, entities))
 
         if observable_created:
             logger.info("Singleton Observable created (%s,%s,%s)" % (type,subtype,value))
 
         else:
             logger.info("Existing Singleton Observable (%s,%s,%s) found" % (type,subtype,value))
-        observable.update_status(update_function=updateStatus,
-                                 action=action,
+        status_accumulator.add(observable,
+                               source_obj = source,
+                               related_entities = entities)
+
+    reconcile_source_entity_links(source_pk2entity_pks_map)
+
+    # Assign the IDS signatures in one go
+
+    if observable_pk2ids_rule_map:
+        changed_signature_map = SingletonObservable.bulk_add_ids_signatures(observable_pk2ids_rule_map)
+
+        logger.debug("Changed IDS signature of %s singleton observables" % len(changed_signature_map))
+
+        for (observable_pk,signature_pk) in changed_signature_map.items():
+            pk2observable_map[observable_pk].ids_signature_id = signature_pk
+
+    # Update the status of each imported singleton observable once,
+    # taking into account all of its sources in this import
+
+    if flush_status:
+        logger.debug("Updating status of %s singleton observables" % len(status_accumulator))
+
+        status_accumulator.flush(action=action,
                                  user=user,
-                                 source_obj = source,
-                                 related_entities = entities,
                                  graph=graph)
 
-    # An import may lead to outdated sources: picture the situation where
-    # a certain observable was referenced by a given report, but is not
-    # referenced anymore in the updated version of the report that was
-    # just imported. The function ``outdate_sources`` catches such
-    # outdated sources and treats them accordingly.
+    fact_pks = set(map(lambda x: x.get('_fact_pk'), results))
 
-    outdate_sources()
+    if post_process:
+        post_process_import([top_level_iobj_identifier_pk],fact_pks,user=user)
+
+    return fact_pks
+
+
+def post_process_import(top_level_iobj_identifier_pks,fact_pks,user=None):
+    """
+    Carry out the steps required after importing one or more STIX reports.
+
+    - An import may lead to outdated sources: picture the situation where
+      a certain observable was referenced by a given report, but is not
+      referenced anymore in the updated version of the report that was
+      just imported. The function ``outdate_sources`` catches such
+      outdated sources and treats them accordingly; only the sources
+      of the reports that have just been imported need to be examined.
+      Outdated sources are only marked as such if the setting
+      ``MARK_OUTDATED_SOURCES`` is switched on; otherwise, they are
+      only reported in the log.
+
+    - The dingos tags of all facts from which singleton observables were
+      imported are transferred into Mantis Actionables.
+
+    The function takes the pks of the identifiers of the imported reports
+    and the pks of the facts referenced in the imported results.
+    """
+
+    for top_level_iobj_identifier_pk in set(top_level_iobj_identifier_pks):
+        outdate_sources(simulate=not MANTIS_ACTIONABLES_MARK_OUTDATED_SOURCES,
+                        top_level_iobject_identifier_pk=top_level_iobj_identifier_pk)
 
-    fact_pks = set(map(lambda x: x.get('_fact_pk'), results))
     update_and_transfer_tags(fact_pks,user=user)
 
 
-def process_STIX_Reports(imported_since, imported_until=None):
+# Columns making up the unique key of a source object (in the order
+# of ``Source.Meta.unique_together``) ...
+
+SOURCE_KEY_COLUMNS = ('iobject_identifier_id',
+                      'iobject_fact_id',
+                      'iobject_factvalue_id',
+                      'top_level_iobject_identifier_id',
+                      'import_info_id',
+                      'content_type_id',
+                      'object_id')
+
+# ... and the columns that are updated upon re-import
+
+SOURCE_UPDATE_COLUMNS = ('iobject_id',
+                         'top_level_iobject_id',
+                         'processing',
+                         'origin',
+                         'tlp')
+
+def reconcile_sources(top_level_iobj_identifier_pk,source_key2values_map):
+    """
+    Bring the source objects associated with a STIX report in line with the results of an import.
+
+    The function takes the following arguments:
+
+    - top_level_iobj_identifier_pk: Primary key of the identifier of the STIX report object
+
+    - source_key2values_map: a dictionary mapping the unique key of each source
+      object required by the import (a tuple of the values of the columns in
+      ``SOURCE_KEY_COLUMNS``) to a dictionary with the values of the columns in
+      ``SOURCE_UPDATE_COLUMNS``.
+
+    Only the existing source objects of the report that belong to the singleton
+    observables referenced in ``source_key2values_map`` are loaded, so that
+    importing a report chunk by chunk does not reload all sources of the report
+    for each chunk.
+    Missing source objects are created with ``bulk_create``; existing source objects
+    are only written if one of the values in ``SOURCE_UPDATE_COLUMNS`` actually changed.
+
+    The function returns a dictionary mapping the keys of ``source_key2values_map``
+    to the (up-to-date) source objects.
+    """
+
+    object_id_position = SOURCE_KEY_COLUMNS.index('object_id')
+
+    object_ids = set(map(lambda x: x[object_id_position], source_key2values_map.keys()))
+
+    def load_sources():
+        result = {}
+        for object_id_chunk in chunked(object_ids):
+            sources = Source.objects.filter(top_level_iobject_identifier_id=top_level_iobj_identifier_pk,
+                                            content_type=CONTENT_TYPE_SINGLETON_OBSERVABLE,
+                                            import_info__isnull=True,
+                                            object_id__in=object_id_chunk)
+            for source in sources:
+                source_key = tuple(map(lambda x: getattr(source,x), SOURCE_KEY_COLUMNS))
+                result[source_key] = source
+        return result
+
+    existing_sources = load_sources()
+
+    sources_to_create = []
+
+    changed_values_map = {}
+
+    for (source_key,values) in source_key2values_map.items():
+        source = existing_sources.get(source_key)
+        if source is None:
+            creation_kwargs = dict(zip(SOURCE_KEY_COLUMNS,source_key))
+            creation_kwargs.update(values)
+            sources_to_create.append(Source(**creation_kwargs))
+        elif any(getattr(source,column) != value for (column,value) in values.items()):
+            for (column,value) in values.items():
+                setattr(source,column,value)
+            changed_values_map[source.pk] = values
+
+    logger.debug("Creating %s source objects, updating %s source objects" % (len(sources_to_create),
+                                                                              len(changed_values_map)))
+
+    if changed_values_map:
+        grouped_update(Source.objects,changed_values_map)
+
+    if sources_to_create:
+        Source.objects.bulk_create(sources_to_create)
+        # ``bulk_create`` does not return primary keys on all backends,
+        # so we reload the sources.
+        existing_sources = load_sources()
+
+    return dict((source_key,existing_sources[source_key]) for source_key in source_key2values_map.keys())
+
+
+def extract_related_entity_info(nodes,graph,essence_cache):
+    """
+    Extract information about related STIX entities from graph nodes.
+
+    Takes a list of networkx-nodes (as found in the ``_relationship_info``
+    of an export result) and returns a list of triples
+    ``(identifier_pk,iobject_type,essence)``, where ``essence`` is the
+    JSON-serialized result of ``extract_essence``; nodes without an essence are skipped.
+
+    The result of the essence extraction is memoized per identifier
+    in the dictionary ``essence_cache``, so that the (costly) traversal
+    of the graph is carried out only once per node.
+    """
+    result = []
+    for node in nodes:
+        node_identifier_pk = node['identifier_pk']
+        if node_identifier_pk in essence_cache:
+            essence_info = essence_cache[node_identifier_pk]
+        else:
+            essence_info = extract_essence(node, graph)
+
+            if not essence_info:
+                essence_info = None
+            else:
+                essence_info = dumps(essence_info)
+
+            essence_cache[node_identifier_pk] = essence_info
+
+        if essence_info:
+            result.append((node_identifier_pk,node['iobject_type'],essence_info))
+    return result
+
+
+def reconcile_stix_entities(identifier_pk2entity_info_map):
+    """
+    Get or create STIX entities in bulk.
+
+    Takes a dictionary mapping identifier pks to pairs ``(iobject_type,essence)``
+    and returns a dictionary mapping the identifier pks to the associated
+    STIX_Entity objects. Existing entities are loaded with one query (per chunk of
+    identifiers) and only written if essence or entity type changed; missing
+    entities are created with ``bulk_create`` (falling back to creating them one
+    by one if some of them have been created concurrently).
+    """
+
+    entity_type_map = {}
+    for (iobject_type,essence_info) in identifier_pk2entity_info_map.values():
+        if not iobject_type in entity_type_map:
+            entity_type_map[iobject_type] = EntityType.cached_objects.get_or_create(name=iobject_type)[0]
+
+    def load_entities():
+        result = {}
+        for identifier_pk_chunk in chunked(identifier_pk2entity_info_map.keys()):
+            entities = STIX_Entity.objects.filter(iobject_identifier_id__in=identifier_pk_chunk,
+                                                  non_iobject_identifier='').select_related('entity_type')
+            for entity in entities:
+                result[entity.iobject_identifier_id] = entity
+        return result
+
+    existing_entities = load_entities()
+
+    entities_to_create = []
+
+    changed_values_map = {}
+
+    for (identifier_pk,(iobject_type,essence_info)) in identifier_pk2entity_info_map.items():
+        entity_type = entity_type_map[iobject_type]
+        entity = existing_entities.get(identifier_pk)
+        if entity is None:
+            entities_to_create.append(STIX_Entity(iobject_identifier_id=identifier_pk,
+                                                  non_iobject_identifier='',
+                                                  essence=essence_info,
+                                                  entity_type=entity_type))
+        elif entity.essence != essence_info or entity.entity_type_id != entity_type.id:
+            entity.essence = essence_info
+            entity.entity_type = entity_type
+            changed_values_map[entity.pk] = {'essence': essence_info,
+                                             'entity_type_id': entity_type.id}
+
+    if changed_values_map:
+        grouped_update(STIX_Entity.objects,changed_values_map)
+
+    if entities_to_create:
+        try:
+            with transaction.atomic():
+                STIX_Entity.objects.bulk_create(entities_to_create)
+        except IntegrityError:
+            # Some of the entities have been created in the meantime (e.g., by
+            # a concurrently running import of a report referencing the same
+            # objects): we fall back to creating the missing entities one by one.
+            logger.warning("Bulk creation of STIX entities failed, creating them one by one.")
+            for new_entity in entities_to_create:
+                entity, created = STIX_Entity.objects.get_or_create(iobject_identifier_id=new_entity.iobject_identifier_id,
+                                                                    non_iobject_identifier='',
+                                                                    defaults={'essence': new_entity.essence,
+                                                                              'entity_type': new_entity.entity_type})
+                if not created and (entity.essence != new_entity.essence or entity.entity_type_id != new_entity.entity_type_id):
+                    STIX_Entity.objects.filter(pk=entity.pk).update(essence=new_entity.essence,
+                                                                    entity_type=new_entity.entity_type)
+        # ``bulk_create`` does not return primary keys on all backends,
+        # so we reload the entities.
+        existing_entities = load_entities()
+
+    return existing_entities
+
+
+def reconcile_source_entity_links(source_pk2entity_pks_map):
+    """
+    Synchronize the links between source objects and related STIX entities.
+
+    Takes a dictionary mapping source pks to the set of pks of the STIX entities
+    that should be linked to the source. The existing links of all these sources are
+    loaded with one query (per chunk of sources); only links that are no longer
+    required are deleted and only missing links are created.
+    """
+
+    through_model = Source.related_stix_entities.through
+
+    required_links = set([])
+    for (source_pk,entity_pks) in source_pk2entity_pks_map.items():
+        required_links.update(map(lambda x: (source_pk,x), entity_pks))
+
+    existing_links = set([])
+    link_pks_to_delete = []
+
+    for source_pk_chunk in chunked(source_pk2entity_pks_map.keys()):
+        links = through_model.objects.filter(source_id__in=source_pk_chunk).values_list('id','source_id','stix_entity_id')
+        for (link_pk,source_pk,entity_pk) in links:
+            if (source_pk,entity_pk) in required_links:
+                existing_links.add((source_pk,entity_pk))
+            else:
+                link_pks_to_delete.append(link_pk)
+
+    links_to_create = required_links.difference(existing_links)
+
+    logger.debug("Deleting %s links between sources and STIX entities, creating %s links" % (len(link_pks_to_delete),
+                                                                                             len(links_to_create)))
+
+    for link_pk_chunk in chunked(link_pks_to_delete):
+        through_model.objects.filter(id__in=link_pk_chunk).delete()
+
+    if links_to_create:
+        through_model.objects.bulk_create([through_model(source_id=source_pk,stix_entity_id=entity_pk)
+                                           for (source_pk,entity_pk) in links_to_create])
+
+
+def process_STIX_Reports(imported_since=None, imported_until=None, parallel=False, since_last=False):
     """
     Process all STIX reports that have been imported into MANTIS in a certain time slice:
 
@@ -860,27 +1778,89 @@ def process_STIX_Reports(imported_since, imported_until=None):
 
     - Call the import function on the determined STIX reports
 
+    If ``since_last`` is set, ``imported_since`` is ignored: instead, all reports
+    that come after the import watermark (see ``models.ImportWatermark``) of their
+    report family/type are processed in the order of their creation. Each report
+    is imported in a transaction of its own, after which the watermark
+    is advanced -- an interrupted run can thus simply be restarted. Reports
+    created within IMPORT_WATERMARK_LOOKBACK seconds before the watermark
+    are processed again, so that reports whose Dingos import committed late
+    are not skipped.
+
+    If ``parallel`` is set, each report is imported by a celery task of its own;
+    the post-processing (see ``post_process_import``) is carried out once for all
+    reports by a chord callback after all imports have finished (in ``since_last``
+    mode, the callback also advances the watermarks). This requires
+    a celery result backend. In this case, the function returns the celery
+    ``AsyncResult`` of the chord.
+
     """
     start_time = timezone.now()
     if not imported_until:
         imported_until = timezone.now()
-    report_filters = []
-    for report_filter in MANTIS_ACTIONABLES_STIX_REPORT_FAMILY_AND_TYPES:
-        report_filters.append({
-            'iobject_type__name' : report_filter['iobject_type'],
-            'iobject_family__name' : report_filter['iobject_type_family']
-        })
-    queries = [Q(**filter) for filter in report_filters]
-    query = queries.pop()
-
-    # Or the Q object with the ones remaining in the list
-    for item in queries:
-        query |= item
-    top_level_iobjs = InfoObject.objects.filter(create_timestamp__gte=imported_since,
-                                                create_timestamp__lte=imported_until).exclude(identifier__namespace__uri__icontains='test').exclude(latest_of__isnull=True)
-    top_level_iobjs = list(top_level_iobjs.filter(query))
-    logger.info("Importing timespan %s to %s" % (imported_since,imported_until))
-    result = import_singleton_observables_from_STIX_iobjects(top_level_iobjs)
+    if not (since_last or imported_since):
+        raise ValueError("Either provide 'imported_since' or set 'since_last'.")
+
+    # Collect pairs (watermark, queryset of reports to be imported); if
+    # we do not work with watermarks, there is only a single pair with
+    # watermark 'None'.
+
+    report_querysets = []
+
+    base_qs = InfoObject.objects.filter(create_timestamp__lte=imported_until)\
+        .exclude(identifier__namespace__uri__icontains='test').exclude(latest_of__isnull=True)
+
+    if since_last:
+        for report_filter in MANTIS_ACTIONABLES_STIX_REPORT_FAMILY_AND_TYPES:
+            watermark, created = ImportWatermark.objects.get_or_create(report_family=report_filter['iobject_type_family'],
+                                                                       report_type=report_filter['iobject_type'])
+            logger.info("Importing reports after watermark %s (lookback %s seconds)" % (watermark,
+                                                                                       MANTIS_ACTIONABLES_IMPORT_WATERMARK_LOOKBACK))
+            # Reports are only visible once their Dingos import has committed, which may
+            # happen after a more recently created report has advanced the watermark:
+            # we therefore also take into account the reports created shortly before
+            # the watermark.
+            report_qs = base_qs.filter(iobject_type__name=report_filter['iobject_type'],
+                                       iobject_family__name=report_filter['iobject_type_family'])\
+                .filter(Q(create_timestamp__gt=watermark.get_lookback_timestamp(MANTIS_ACTIONABLES_IMPORT_WATERMARK_LOOKBACK)) |
+                        Q(create_timestamp=watermark.last_create_timestamp,pk__gt=watermark.last_iobject_pk))
+            report_querysets.append((watermark,report_qs.order_by('create_timestamp','pk')))
+    else:
+        report_filters = []
+        for report_filter in MANTIS_ACTIONABLES_STIX_REPORT_FAMILY_AND_TYPES:
+            report_filters.append({
+                'iobject_type__name' : report_filter['iobject_type'],
+                'iobject_family__name' : report_filter['iobject_type_family']
+            })
+        queries = [Q(**filter) for filter in report_filters]
+        query = queries.pop()
+
+        # Or the Q object with the ones remaining in the list
+        for item in queries:
+            query |= item
+        report_querysets.append((None,base_qs.filter(create_timestamp__gte=imported_since).filter(query)))
+        logger.info("Importing timespan %s to %s" % (imported_since,imported_until))
+
+    if parallel:
+        top_level_iobj_pks = []
+        watermark_updates = []
+        for (watermark,report_qs) in report_querysets:
+            report_pks = list(report_qs.values_list('pk',flat=True))
+            top_level_iobj_pks.extend(report_pks)
+            if watermark and report_pks:
+                watermark_updates.append((watermark.pk,report_pks[-1]))
+        return import_STIX_reports_parallel(top_level_iobj_pks,watermark_updates=watermark_updates)
+
+    result = []
+
+    for (watermark,report_qs) in report_querysets:
+        if not watermark:
+            result.extend(import_singleton_observables_from_STIX_iobjects(list(report_qs)))
+        else:
+            for top_level_iobj in list(report_qs):
+                with transaction.atomic():
+                    result.extend(import_singleton_observables_from_STIX_iobjects([top_level_iobj]))
+                    watermark.advance(top_level_iobj)
 
     end_time = timezone.now()
 
@@ -888,6 +1868,49 @@ def process_STIX_Reports(imported_since, imported_until=None):
 
     return result
 
+def import_STIX_reports_parallel(top_level_iobj_pks,user=None,watermark_updates=None):
+    """
+    Dispatch the import of each of the given STIX reports as celery task of its own
+    (see ``tasks.async_import_STIX_report``); the post-processing is carried out once
+    for all reports by the chord callback ``tasks.async_post_process_import``, which
+    also advances the given watermarks (a list of pairs (pk of ImportWatermark, pk of
+    the last imported InfoObject)).
+
+    Returns the celery ``AsyncResult`` of the chord, or ``None`` if there are
+    no reports to be imported.
+    """
+    if not top_level_iobj_pks:
+        logger.info("No reports to be imported")
+        return None
+
+    logger.info("Dispatching import of %s reports" % len(top_level_iobj_pks))
+
+    return chord(async_import_STIX_report.s(top_level_iobj_pk,user=user)
+                 for top_level_iobj_pk in top_level_iobj_pks)(async_post_process_import.s(user=user,
+                                                                                          watermark_updates=watermark_updates))
+
+
+def post_process_imported_reports(top_level_iobj_pks,user=None):
+    """
+    Carry out the post-processing (see ``post_process_import``) for the given
+    imported STIX reports.
+
+    Rather than being passed around, the pks of the identifiers of the reports and
+    the pks of the facts from which singleton observables were imported are
+    determined from the reports and their source objects.
+    """
+    top_level_iobj_identifier_pks = set([])
+    fact_pks = set([])
+
+    for iobj_pk_chunk in chunked(set(top_level_iobj_pks)):
+        top_level_iobj_identifier_pks.update(InfoObject.objects.filter(pk__in=iobj_pk_chunk).values_list('identifier_id',flat=True))
+        fact_pks.update(Source.objects.filter(content_type=CONTENT_TYPE_SINGLETON_OBSERVABLE,
+                                              top_level_iobject_id__in=iobj_pk_chunk,
+                                              iobject_fact__isnull=False).values_list('iobject_fact_id',flat=True))
+
+    post_process_import(top_level_iobj_identifier_pks,fact_pks,user=user)
+
+
 def extract_essence(node_info, graph):
     result = {}
     if node_info['iobject_type'] == 'Indicator':
@@ -950,7 +1973,7 @@ def extract_essence(node_info, graph):
 
 
 
-def outdate_sources(simulate=True):
+def outdate_sources(simulate=True,top_level_iobject_identifier_pk=None):
     """
     Find outdated sources and mark them as such; also write 'OUTDATE' tags where required.
 
@@ -960,75 +1983,105 @@ def outdate_sources(simulate=True):
     just imported. The function ``outdate_sources`` catches such
     outdated sources and treats them accordingly.
 
+    If ``top_level_iobject_identifier_pk`` is given, only sources associated
+    with the report of that identifier are examined: this is what the import
+    uses after having imported a report. Without it, all sources in the
+    database are examined, which is expensive and should be carried out
+    only periodically (see the command ``test_outdate_sources`` and the task
+    ``tasks.async_outdate_sources``).
+
+    The function works set-based: outdated sources are marked with a single
+    update; the tags to be marked as outdated are computed for all affected
+    singleton observables with a few grouped queries, and the tagging is carried
+    out with one bulk action per (context, report).
+
     """
 
     # Find sources of STIX imports that are outdated, i.e.,
     # the pointer to the top-level infoobject does not point to the most
     # recent infoobject of the same identifier.
 
-    outdated_sources = Source.objects.filter(outdated=False).exclude(top_level_iobject_identifier__isnull=True).exclude(top_level_iobject_identifier__latest=F('top_level_iobject'))
-
-    outdated_sources_pks = map(lambda x: x.pk,outdated_sources)
-
-    print "Starting"
+    outdated_sources = Source.objects.filter(outdated=False,
+                                             content_type=CONTENT_TYPE_SINGLETON_OBSERVABLE)
 
+    if top_level_iobject_identifier_pk:
+        outdated_sources = outdated_sources.filter(top_level_iobject_identifier_id=top_level_iobject_identifier_pk)
 
-    for outdated_source in outdated_sources:
-        # Set the outdate flag -- this is used in searches to distinguish
-        # outdated sources.
+    outdated_sources = outdated_sources.exclude(top_level_iobject_identifier__isnull=True).exclude(top_level_iobject_identifier__latest=F('top_level_iobject'))
 
-        singleton_observable = outdated_source.yielded
+    outdated_source_infos = list(outdated_sources.values_list('pk','object_id','top_level_iobject_identifier_id'))
 
-        if not simulate:
-            outdated_source.outdated=True
-            outdated_source.save()
+    if not outdated_source_infos:
+        return
 
-        else:
+    outdated_source_pks = set(map(lambda x: x[0], outdated_source_infos))
+    affected_singleton_pks = set(map(lambda x: x[1], outdated_source_infos))
+    affected_identifier_pks = set(map(lambda x: x[2], outdated_source_infos))
 
-            logger.info("Found outdated source for %s" % singleton_observable)
+    # Set the outdate flag -- this is used in searches to distinguish
+    # outdated sources.
 
-        # Get the dingos tags associated with this source via the link to
-        # the dingos fact in the source
+    if not simulate:
+        for source_pk_chunk in chunked(outdated_source_pks):
+            Source.objects.filter(pk__in=source_pk_chunk).update(outdated=True)
+    else:
+        logger.info("Found %s outdated sources for %s singleton observables" % (len(outdated_source_pks),
+                                                                                len(affected_singleton_pks)))
 
-        dingos_tags_for_this_top_level_report = outdated_source.top_level_iobject_identifier.tags.all().values_list('name',flat=True)
+    # Get the dingos tags associated with the reports of the outdated sources
 
-        contexts_attached_to_yieldable = set(map(lambda x: x.context.name, outdated_source.yielded.actionable_tags.all()))
+    identifier_pk2tags_map = {}
 
+    for identifier_pk_chunk in chunked(affected_identifier_pks):
+        for (identifier_pk,tag_name) in Identifier.objects.filter(id__in=identifier_pk_chunk).values_list('id','tags__name'):
+            if tag_name:
+                identifier_pk2tags_map.setdefault(identifier_pk,set([])).add(tag_name)
 
-        # Reduce the list to tags that denote an Actionable Context
-        for regular_expr in MANTIS_ACTIONABLES_CONTEXT_TAG_REGEX:
-            dingos_tags_for_this_top_level_report.filter(name__regex=regular_expr)
+    # Get the contexts attached to the affected singleton observables and the
+    # dingos tags associated with the singleton observables via
+    # all *other* non-outdated sources
 
-        # Get the tags associated with the associated singleton observable via
-        # all *other* non-outdated sources
+    singleton_pk2contexts_map = {}
+    singleton_pk2other_tags_map = {}
 
-        dingos_tags_for_all_other_top_level_reports = Source.objects.filter(object_id=outdated_source.yielded.pk,content_type=CONTENT_TYPE_SINGLETON_OBSERVABLE).\
-            filter(outdated=False).exclude(pk__in=outdated_sources_pks).values_list('top_level_iobject_identifier__tags__name',flat=True)
+    for singleton_pk_chunk in chunked(affected_singleton_pks):
+        contexts = TaggedActionableItem.objects.filter(content_type=CONTENT_TYPE_SINGLETON_OBSERVABLE,
+                                                       object_id__in=singleton_pk_chunk).values_list('object_id','tag__context__name')
+        for (singleton_pk,context_name) in contexts:
+            singleton_pk2contexts_map.setdefault(singleton_pk,set([])).add(context_name)
 
-        #if simulate:
-        #    # We have not marked this source as outdated
-        #    dingos_tags_for_all_other_top_level_reports = Source.objects.filter(object_id=outdated_source.yielded.pk,content_type=CONTENT_TYPE_SINGLETON_OBSERVABLE).\
-        #        filter(outdated=False).exclude(id__in=).values_list('top_level_iobject_identifier__tags__name',flat=True)
+        other_tags = Source.objects.filter(content_type=CONTENT_TYPE_SINGLETON_OBSERVABLE,
+                                           object_id__in=singleton_pk_chunk,
+                                           outdated=False).values_list('pk','object_id','top_level_iobject_identifier__tags__name')
+        for (source_pk,singleton_pk,tag_name) in other_tags:
+            if tag_name and not source_pk in outdated_source_pks:
+                singleton_pk2other_tags_map.setdefault(singleton_pk,set([])).add(tag_name)
 
-        # Find out whether there are tags that were associated with singleton observable
-        # yielded by the present source exclusively via this source -- those are
-        # the tags that should be marked as possibly OUTDATED.
+    # Find out whether there are tags that were associated with singleton observable
+    # yielded by an outdated source exclusively via this source -- those are
+    # the tags that should be marked as possibly OUTDATED. We collect the
+    # affected singleton observables per tag and report.
 
-        tags_to_mark_as_outdated = set()
+    tag_and_identifier_pk2singleton_pks_map = {}
 
-        for tag in dingos_tags_for_this_top_level_report:
-            if (not tag in dingos_tags_for_all_other_top_level_reports) and (tag in contexts_attached_to_yieldable):
-                tags_to_mark_as_outdated.add(tag)
+    for (source_pk,singleton_pk,identifier_pk) in outdated_source_infos:
+        tags_to_mark_as_outdated = identifier_pk2tags_map.get(identifier_pk,set([]))\
+            .intersection(singleton_pk2contexts_map.get(singleton_pk,set([])))\
+            .difference(singleton_pk2other_tags_map.get(singleton_pk,set([])))
 
-        if tags_to_mark_as_outdated:
+        for tag in tags_to_mark_as_outdated:
+            tag_and_identifier_pk2singleton_pks_map.setdefault((tag,identifier_pk),set([])).add(singleton_pk)
 
-            context_name_pairs = map(lambda x : (x,'OUTDATED'), tags_to_mark_as_outdated )
-            if not simulate:
-                ActionableTag.bulk_action(action='add',
-                                          context_name_pairs=context_name_pairs,
-                                          thing_to_tag_pks=[outdated_source.yielded.pk],
-                                          comment="Indicator no longer in latest revision of report %s" % outdated_source.top_level_iobject_identifier,
-                                          supress_transfer_to_dingos=True)
-            else:
-                logger.info("SIMULATE. Would have tagged %s for %s" % (context_name_pairs,outdated_source.yielded))
+    identifiers = Identifier.objects.in_bulk(set(map(lambda x: x[1], tag_and_identifier_pk2singleton_pks_map.keys())))
 
+    for ((tag,identifier_pk),singleton_pks) in tag_and_identifier_pk2singleton_pks_map.items():
+        context_name_pairs = [(tag,'OUTDATED')]
+        if not simulate:
+            ActionableTag.bulk_action(action='add',
+                                      context_name_pairs=context_name_pairs,
+                                      thing_to_tag_pks=singleton_pks,
+                                      comment="Indicator no longer in latest revision of report %s" % identifiers[identifier_pk],
+                                      supress_transfer_to_dingos=True)
+        else:
+            logger.info("SIMULATE. Would have tagged %s for singleton observables %s" % (context_name_pairs,
+                                                                                       list(singleton_pks)))
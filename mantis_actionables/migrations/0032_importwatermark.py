@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+import mantis_actionables.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mantis_actionables', '0031_auto_20150513_1203'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportWatermark',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('report_family', models.CharField(max_length=255)),
+                ('report_type', models.CharField(max_length=255)),
+                ('last_create_timestamp', models.DateTimeField(default=mantis_actionables.models.get_null_time)),
+                ('last_iobject_pk', models.IntegerField(default=0)),
+                ('timestamp', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='importwatermark',
+            unique_together=set([('report_family', 'report_type')]),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dingos', '0005_AddTaggingHistory'),
+        ('mantis_actionables', '0032_importwatermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportResultCache',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('exporter', models.CharField(max_length=255)),
+                ('exporter_version', models.CharField(max_length=40)),
+                ('results', models.TextField()),
+                ('timestamp', models.DateTimeField(auto_now=True)),
+                ('iobject', models.ForeignKey(related_name='+', to='dingos.InfoObject')),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='exportresultcache',
+            unique_together=set([('iobject', 'exporter', 'exporter_version')]),
+        ),
+    ]
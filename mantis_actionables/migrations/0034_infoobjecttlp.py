@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dingos', '0005_AddTaggingHistory'),
+        ('mantis_actionables', '0033_exportresultcache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InfoObjectTLP',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('color', models.CharField(default='', max_length=40, blank=True)),
+                ('iobject', models.ForeignKey(related_name='+', unique=True, to='dingos.InfoObject')),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+
+from django.db import models, migrations
+
+
+def compute_content_hash(content):
+    if isinstance(content,unicode):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content).hexdigest()
+
+
+def fill_content_hash(apps, schema_editor):
+    IDSSignature = apps.get_model("mantis_actionables","IDSSignature")
+    IDSSignatureRevision = apps.get_model("mantis_actionables","IDSSignatureRevision")
+    SingletonObservable = apps.get_model("mantis_actionables","SingletonObservable")
+
+    # Signatures with identical content are merged into the signature with the
+    # lowest pk: otherwise, the unique index on the content hash could not be created.
+
+    hash2pk_map = {}
+
+    for (signature_pk,content) in list(IDSSignature.objects.order_by('pk').values_list('pk','content')):
+        content_hash = compute_content_hash(content)
+        if content_hash in hash2pk_map:
+            SingletonObservable.objects.filter(ids_signature_id=signature_pk).update(ids_signature_id=hash2pk_map[content_hash])
+            IDSSignatureRevision.objects.filter(ids_signature_id=signature_pk).update(ids_signature_id=hash2pk_map[content_hash])
+            IDSSignature.objects.filter(pk=signature_pk).delete()
+        else:
+            hash2pk_map[content_hash] = signature_pk
+            IDSSignature.objects.filter(pk=signature_pk).update(content_hash=content_hash)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mantis_actionables', '0034_infoobjecttlp'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='idssignature',
+            name='content_hash',
+            field=models.CharField(max_length=64, null=True, editable=False),
+            preserve_default=True,
+        ),
+        migrations.RunPython(
+            fill_content_hash,
+            lambda x,y : None
+        ),
+        migrations.AlterField(
+            model_name='idssignature',
+            name='content_hash',
+            field=models.CharField(max_length=64, unique=True, null=True, editable=False),
+            preserve_default=True,
+        ),
+    ]
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+
+from django.db import models, migrations
+
+
+# Must yield the same result as ``SingletonObservable.compute_identity_hash``
+
+def compute_identity_hash(type_id,subtype_id,value):
+    if isinstance(value,str):
+        value = value.decode('utf-8')
+    return hashlib.sha256((u"%s:%s:%s" % (type_id,subtype_id,value)).encode('utf-8')).hexdigest()
+
+
+def fill_identity_hash(apps, schema_editor):
+    SingletonObservable = apps.get_model("mantis_actionables","SingletonObservable")
+
+    # (type, subtype, value) is unique, so there are no collisions to take care of.
+
+    for (pk,type_id,subtype_id,value) in list(SingletonObservable.objects.values_list('pk','type_id','subtype_id','value')):
+        SingletonObservable.objects.filter(pk=pk).update(identity_hash=compute_identity_hash(type_id,subtype_id,value))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mantis_actionables', '0035_idssignature_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='singletonobservable',
+            name='identity_hash',
+            field=models.CharField(max_length=64, null=True, editable=False),
+            preserve_default=True,
+        ),
+        migrations.RunPython(
+            fill_identity_hash,
+            lambda x,y : None
+        ),
+        migrations.AlterField(
+            model_name='singletonobservable',
+            name='identity_hash',
+            field=models.CharField(max_length=64, unique=True, null=True, editable=False),
+            preserve_default=True,
+        ),
+    ]
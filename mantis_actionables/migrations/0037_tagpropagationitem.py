@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('mantis_actionables', '0036_singletonobservable_identity_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagPropagationItem',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('object_id', models.IntegerField()),
+                ('context_name', models.CharField(max_length=255)),
+                ('action', models.SmallIntegerField(choices=[(0, b'add'), (1, b'remove')])),
+                ('comment', models.TextField(blank=True)),
+                ('timestamp', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(related_name='+', to=settings.AUTH_USER_MODEL, null=True)),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+    ]
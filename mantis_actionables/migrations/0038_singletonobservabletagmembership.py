@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+KIND_ACTIONABLE_TAG = 0
+KIND_TAG_INFO = 1
+KIND_DINGOS_TAG = 2
+
+CHUNK_SIZE = 500
+
+
+def fill_tag_memberships(apps, schema_editor):
+    ContentType = apps.get_model("contenttypes","ContentType")
+    SingletonObservable = apps.get_model("mantis_actionables","SingletonObservable")
+    TaggedActionableItem = apps.get_model("mantis_actionables","TaggedActionableItem")
+    SingletonObservableTagMembership = apps.get_model("mantis_actionables","SingletonObservableTagMembership")
+
+    try:
+        content_type = ContentType.objects.get(app_label='mantis_actionables',model='singletonobservable')
+    except ContentType.DoesNotExist:
+        content_type = None
+
+    pks = list(SingletonObservable.objects.values_list('pk',flat=True))
+
+    for i in range(0,len(pks),CHUNK_SIZE):
+        pk_chunk = pks[i:i+CHUNK_SIZE]
+
+        memberships = set([])
+
+        if content_type:
+            for (pk,tag_name,tag_info_name) in TaggedActionableItem.objects.filter(content_type=content_type,
+                                                                                   object_id__in=pk_chunk).values_list('object_id',
+                                                                                                                       'tag__name',
+                                                                                                                       'tag__info__name'):
+                memberships.add((pk,KIND_ACTIONABLE_TAG,tag_name))
+                memberships.add((pk,KIND_TAG_INFO,tag_info_name))
+
+        for (pk,mantis_tags) in SingletonObservable.objects.filter(pk__in=pk_chunk).values_list('pk','mantis_tags'):
+            for tag_name in filter(None,(mantis_tags or '').split(',')):
+                memberships.add((pk,KIND_DINGOS_TAG,tag_name))
+
+        SingletonObservableTagMembership.objects.bulk_create([SingletonObservableTagMembership(observable_id=pk,
+                                                                                               kind=kind,
+                                                                                               tag_name=tag_name)
+                                                              for (pk,kind,tag_name) in memberships])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0001_initial'),
+        ('mantis_actionables', '0037_tagpropagationitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SingletonObservableTagMembership',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('tag_name', models.CharField(max_length=255)),
+                ('kind', models.SmallIntegerField(choices=[(0, b'Actionable tag'), (1, b'Tag info'), (2, b'Dingos tag')])),
+                ('observable', models.ForeignKey(related_name='tag_memberships', to='mantis_actionables.SingletonObservable')),
+            ],
+            options={
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterUniqueTogether(
+            name='singletonobservabletagmembership',
+            unique_together=set([('observable', 'kind', 'tag_name')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='singletonobservabletagmembership',
+            index_together=set([('kind', 'tag_name')]),
+        ),
+        migrations.RunPython(
+            fill_tag_memberships,
+            lambda x,y : None
+        ),
+    ]
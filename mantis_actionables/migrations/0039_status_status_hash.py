@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import hashlib
+import json
+
+from datetime import datetime
+
+from django.db import models, migrations
+from django.utils import timezone
+
+
+INTERNED_FIELDS = ('false_positive',
+                   'active',
+                   'active_from',
+                   'active_to',
+                   'tags',
+                   'priority',
+                   'most_permissive_tlp',
+                   'most_restrictive_tlp',
+                   'max_confidence',
+                   'kill_chain_phases',
+                   'best_processing')
+
+
+def normalize_kill_chain_phases(kill_chain_phases):
+    return ';'.join(sorted(set(filter(None,(kill_chain_phases or '').split(';')))))
+
+
+def compute_status_hash(normalized_values):
+    def serialize(value):
+        if isinstance(value,datetime):
+            if timezone.is_aware(value):
+                value = value.astimezone(timezone.utc)
+            return value.isoformat()
+        raise TypeError("%r cannot be serialized" % value)
+    return hashlib.sha256(json.dumps(normalized_values,default=serialize)).hexdigest()
+
+
+def fill_status_hash(apps, schema_editor):
+    Status = apps.get_model("mantis_actionables","Status")
+    Status2X = apps.get_model("mantis_actionables","Status2X")
+
+    # Statuses that are identical after normalization of the kill chain phases
+    # are merged into the status with the lowest pk: otherwise, the unique index on
+    # the status hash could not be created.
+
+    hash2pk_map = {}
+
+    for values in list(Status.objects.order_by('pk').values_list('pk',*INTERNED_FIELDS)):
+        status_pk = values[0]
+        normalized_values = list(values[1:])
+        kill_chain_phases_index = INTERNED_FIELDS.index('kill_chain_phases')
+        normalized_values[kill_chain_phases_index] = normalize_kill_chain_phases(normalized_values[kill_chain_phases_index])
+        status_hash = compute_status_hash(normalized_values)
+
+        if status_hash in hash2pk_map:
+            Status2X.objects.filter(status_id=status_pk).update(status_id=hash2pk_map[status_hash])
+            Status.objects.filter(pk=status_pk).delete()
+        else:
+            hash2pk_map[status_hash] = status_pk
+            Status.objects.filter(pk=status_pk).update(status_hash=status_hash,
+                                                       kill_chain_phases=normalized_values[kill_chain_phases_index])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mantis_actionables', '0038_singletonobservabletagmembership'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='status',
+            name='status_hash',
+            field=models.CharField(max_length=64, null=True, editable=False),
+            preserve_default=True,
+        ),
+        migrations.RunPython(
+            fill_status_hash,
+            lambda x,y : None
+        ),
+        migrations.AlterField(
+            model_name='status',
+            name='status_hash',
+            field=models.CharField(max_length=64, unique=True, null=True, editable=False),
+            preserve_default=True,
+        ),
+    ]
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mantis_actionables', '0039_status_status_hash'),
+    ]
+
+    # Existing entries do not record the revisions of the objects in their
+    # graph and are thus regarded as outdated (see ``ExportResultCache.is_current``).
+
+    operations = [
+        migrations.AddField(
+            model_name='exportresultcache',
+            name='graph_revisions',
+            field=models.TextField(null=True),
+            preserve_default=True,
+        ),
+    ]
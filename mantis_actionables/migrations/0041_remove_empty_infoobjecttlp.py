@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def remove_empty_entries(apps, schema_editor):
+    InfoObjectTLP = apps.get_model("mantis_actionables","InfoObjectTLP")
+
+    # Entries without color may have been recorded before the markings of the
+    # object were written; they are determined again on the next lookup.
+
+    InfoObjectTLP.objects.filter(color='').delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mantis_actionables', '0040_exportresultcache_graph_revisions'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_empty_entries,
+            lambda x,y : None
+        ),
+    ]
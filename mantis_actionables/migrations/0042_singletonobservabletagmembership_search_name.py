@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+def fill_search_name(apps, schema_editor):
+    SingletonObservableTagMembership = apps.get_model("mantis_actionables","SingletonObservableTagMembership")
+
+    for tag_name in list(SingletonObservableTagMembership.objects.values_list('tag_name',flat=True).distinct()):
+        SingletonObservableTagMembership.objects.filter(tag_name=tag_name).update(search_name=tag_name.lower())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mantis_actionables', '0041_remove_empty_infoobjecttlp'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='singletonobservabletagmembership',
+            name='search_name',
+            field=models.CharField(default='', max_length=255, editable=False),
+            preserve_default=False,
+        ),
+        migrations.RunPython(
+            fill_search_name,
+            lambda x,y : None
+        ),
+        migrations.AlterIndexTogether(
+            name='singletonobservabletagmembership',
+            index_together=set([('kind', 'tag_name'), ('kind', 'search_name')]),
+        ),
+    ]
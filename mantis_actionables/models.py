@@ -19,15 +19,19 @@
 
 import logging
 import json
+import hashlib
+import time
 
-from django.db import models
+from django.apps import apps
+from django.db import models, transaction, IntegrityError
+from django.db.models import Q
 from django.contrib.auth.models import User, Group
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes import generic
 from django.core.cache import caches
 from django.core.exceptions import ObjectDoesNotExist, MultipleObjectsReturned
 
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from django.utils import timezone
 
@@ -42,6 +46,10 @@ logger = logging.getLogger(__name__)
 
 import read_settings
 
+from . import MANTIS_ACTIONABLES_ASYNC_TAG_PROPAGATION
+
+from .bulk_utils import chunked, grouped_update
+
 class CachingManager(models.Manager):
     """
     For models that have a moderate amount of entries and are always queried
@@ -69,6 +77,10 @@ class CachingManager(models.Manager):
 
       and use ``ActionableTag.cached_objects.get_or_create(...)`` for the query.
 
+    The cache of a model is filled on first use; call ``CachingManager.prewarm()``
+    to fill the caches of all models in 'cachable_queries' up front (this
+    is done at the start of each celery worker process, see ``tasks.py``).
+
     """
 
     TIME_TO_LIVE = None
@@ -85,35 +97,53 @@ class CachingManager(models.Manager):
         "ActionableTag" : ["context_id","info_id"]
     }
 
+    def fill_cache(self):
+        """
+        Load all objects of the model into the cache; returns the cached
+        dictionary.
+        """
+        sorted_keys = sorted(CachingManager.cachable_queries[self.model.__name__])
+        value_dic = {}
+        for object in super(CachingManager, self).all():
+            sorted_values = tuple(sorted([getattr(object, attr) for attr in sorted_keys]))
+            value_dic[sorted_values] = object
+        CachingManager.cache.set(self.model.__name__, value_dic, CachingManager.TIME_TO_LIVE)
+        return value_dic
+
+    @classmethod
+    def prewarm(cls):
+        """
+        Fill the caches of all models in 'cachable_queries'; returns the time
+        (in seconds) this took.
+        """
+        start_time = time.time()
+        for model_name in cls.cachable_queries.keys():
+            apps.get_model('mantis_actionables',model_name).cached_objects.fill_cache()
+        elapsed_time = time.time() - start_time
+        logger.info("Prewarmed caches for %s in %.2f seconds" % (", ".join(sorted(cls.cachable_queries.keys())),
+                                                                 elapsed_time))
+        return elapsed_time
+
     def get_or_create(self, defaults=None, **kwargs):
         sorted_keys = sorted(kwargs.keys())
         sorted_arguments = tuple(sorted(kwargs.values()))
         if sorted_keys == sorted(CachingManager.cachable_queries[self.model.__name__]):
-            if not CachingManager.cache.get(self.model.__name__):
-                all_objects = list(super(CachingManager, self).all())
-                value_dic = {}
-                for object in all_objects:
-                    # TODO: When the cache is filled for the first time, the line below
-                    # leads to a query for each single object. I thought that the
-                    # wrapping 'list(...)' above when getting all objects would take care of
-                    # this, but it does not... Can this be changed? otherwise, initializing
-                    # the cache is really expensive...
-                    sorted_values = tuple(sorted([getattr(object, attr) for attr in sorted_keys]))
-                    value_dic[sorted_values] = object
-                CachingManager.cache.set(self.model.__name__, value_dic, CachingManager.TIME_TO_LIVE)
-
+            value_dic = CachingManager.cache.get(self.model.__name__)
+            if not value_dic:
+                value_dic = self.fill_cache()
 
-            inCache = CachingManager.cache.get(self.model.__name__).get(sorted_arguments)
+            inCache = value_dic.get(sorted_arguments)
 
             if inCache:
                 return inCache, False
 
             else:
                 (object, created)  = super(CachingManager, self).get_or_create(defaults=defaults, **kwargs)
-                CachingManager.cache.get(self.model.__name__)[sorted_arguments] = object
+                value_dic[sorted_arguments] = object
+                CachingManager.cache.set(self.model.__name__, value_dic, CachingManager.TIME_TO_LIVE)
                 return object, created
         else:
-            (object, created)  = super(CachingManager, self).get_or_create(defaults=defaults, **kwargs)
+            return super(CachingManager, self).get_or_create(defaults=defaults, **kwargs)
 
 
 class ActionableTaggableManager(_TaggableManager):
@@ -211,6 +241,9 @@ class ActionableTag(TagBase):
         else:
             CONTENT_TYPE_OF_THINGS_TO_TAG = ContentType.objects.get_for_model(thing_to_tag_model)
 
+        # Pks are compared with pks read from the database below
+        thing_to_tag_pks = map(int,thing_to_tag_pks)
+
         # Create the list of actionable tags for this bulk action
         actionable_tag_list = []
 
@@ -237,69 +270,94 @@ class ActionableTag(TagBase):
         elif action == 'remove':
             action_flag = ActionableTaggingHistory.REMOVE
 
-        for pk in thing_to_tag_pks:
-            for actionable_tag in actionable_tag_list:
-                affected_tags = set([])
-                if action_flag == ActionableTaggingHistory.ADD:
+        if action_flag == ActionableTaggingHistory.ADD:
 
-                    tagged_actionable_item, created = TaggedActionableItem.objects.get_or_create(tag_id=actionable_tag.id,
-                                                               object_id=pk,
-                                                               content_type=CONTENT_TYPE_OF_THINGS_TO_TAG)
+            # Determine the existing links between the things to tag and the
+            # actionable tags with one query (per chunk of pks) and create the missing
+            # links in one go.
 
-                    if created:
-                        affected_tags.add(actionable_tag)
+            tag_ids = set(map(lambda x: x.id, actionable_tag_list))
 
-                    logger.debug("tagged_actionable_item %s, created: %s" % (tagged_actionable_item.pk,created))
+            existing_pairs = set([])
 
-                elif action_flag == ActionableTaggingHistory.REMOVE:
-                    tagged_actionable_item = TaggedActionableItem.objects.filter(tag_id=actionable_tag.id,
-                                                                              object_id=pk,
-                                                                              content_type=CONTENT_TYPE_OF_THINGS_TO_TAG)
+            for pk_chunk in chunked(set(thing_to_tag_pks)):
+                existing_pairs.update(TaggedActionableItem.objects.filter(content_type=CONTENT_TYPE_OF_THINGS_TO_TAG,
+                                                                          object_id__in=pk_chunk,
+                                                                          tag_id__in=tag_ids).values_list('object_id','tag_id'))
 
-                    if tagged_actionable_item:
-                        tagged_actionable_item.delete()
-                        affected_tags.add(actionable_tag)
+            new_pairs = [(pk,tag_id) for pk in set(thing_to_tag_pks) for tag_id in tag_ids
+                         if not (pk,tag_id) in existing_pairs]
 
-                    if actionable_tag.name == actionable_tag.context.name:
-                        # This tag marks an context and the whole context is deleted:
-                        # We therefore need to remove all tags in the context
-                        tagged_actionable_items = TaggedActionableItem.objects.filter(tag__context=actionable_tag.context,
-                                                                                     object_id=pk,
-                                                                                     content_type=CONTENT_TYPE_OF_THINGS_TO_TAG)
+            logger.debug("Creating %s tagged actionable items" % len(new_pairs))
 
-                        for tagged_actionable_item in tagged_actionable_items:
-                            affected_tags.add(tagged_actionable_item.tag)
-                            tagged_actionable_item.delete()
+            TaggedActionableItem.objects.bulk_create(map(lambda x: TaggedActionableItem(object_id=x[0],
+                                                                                        tag_id=x[1],
+                                                                                        content_type=CONTENT_TYPE_OF_THINGS_TO_TAG),
+                                                         new_pairs))
 
             logger.debug("Updating history")
-            ActionableTaggingHistory.bulk_create_tagging_history(action_flag,
-                                                                 affected_tags,
-                                                                 [pk],
-                                                                 thing_to_tag_model,
-                                                                 user,
-                                                                 comment)
+            ActionableTaggingHistory.bulk_create_tagging_history_for_pairs(action_flag,
+                                                                           new_pairs,
+                                                                           thing_to_tag_model,
+                                                                           user,
+                                                                           comment)
             logger.debug("History updated")
-        if not supress_transfer_to_dingos and CONTENT_TYPE_OF_THINGS_TO_TAG == ContentType.objects.get_for_model(SingletonObservable):
-            update_and_transfer_tag_action_to_dingos(action,
-                                                     context_name_set,
-                                                     thing_to_tag_pks,
-                                                     user=user,
-                                                     comment=comment)
 
-        if CONTENT_TYPE_OF_THINGS_TO_TAG == ContentType.objects.get_for_model(SingletonObservable):
-            singletons = SingletonObservable.objects.filter(pk__in=thing_to_tag_pks)
+        elif action_flag == ActionableTaggingHistory.REMOVE:
+
+            # Determine all links to be removed: the links to the given actionable
+            # tags and, for tags that mark a context, all links to tags of that context
+            # (in that case, the whole context is deleted).
 
-            for singleton in singletons:
-                actionable_tag_list_repr = list(singleton.actionable_tags.names())
-                actionable_tag_list_repr.sort()
+            tag_ids = set(map(lambda x: x.id, actionable_tag_list))
 
-                updated_tag_info = ",".join(actionable_tag_list_repr)
+            removed_context_ids = set(map(lambda x: x.context_id,
+                                          filter(lambda x: x.name == x.context.name, actionable_tag_list)))
 
-                singleton.actionable_tags_cache = updated_tag_info
+            tag_q = Q(tag_id__in=tag_ids)
+            if removed_context_ids:
+                tag_q = tag_q | Q(tag__context_id__in=removed_context_ids)
 
-                logger.debug("For singleton with pk %s found tags %s" % (singleton.pk,updated_tag_info))
+            removed_items = []
 
-                singleton.save()
+            for pk_chunk in chunked(set(thing_to_tag_pks)):
+                removed_items.extend(TaggedActionableItem.objects.filter(content_type=CONTENT_TYPE_OF_THINGS_TO_TAG,
+                                                                         object_id__in=pk_chunk)\
+                                                                 .filter(tag_q).values_list('id','object_id','tag_id'))
+
+            logger.debug("Removing %s tagged actionable items" % len(removed_items))
+
+            for id_chunk in chunked(map(lambda x: x[0], removed_items)):
+                TaggedActionableItem.objects.filter(id__in=id_chunk).delete()
+
+            logger.debug("Updating history")
+            ActionableTaggingHistory.bulk_create_tagging_history_for_pairs(action_flag,
+                                                                           set(map(lambda x: (x[1],x[2]), removed_items)),
+                                                                           thing_to_tag_model,
+                                                                           user,
+                                                                           comment)
+            logger.debug("History updated")
+
+        if not supress_transfer_to_dingos and CONTENT_TYPE_OF_THINGS_TO_TAG == ContentType.objects.get_for_model(SingletonObservable):
+            if MANTIS_ACTIONABLES_ASYNC_TAG_PROPAGATION:
+                # The change is recorded in the propagation queue and transferred
+                # into Dingos by a celery task.
+                from .tasks import async_propagate_tag_changes, delay_after_commit
+                TagPropagationItem.enqueue(action_flag,
+                                           context_name_set,
+                                           thing_to_tag_pks,
+                                           user=user,
+                                           comment=comment)
+                delay_after_commit(async_propagate_tag_changes)
+            else:
+                update_and_transfer_tag_action_to_dingos(action,
+                                                         context_name_set,
+                                                         thing_to_tag_pks,
+                                                         user=user,
+                                                         comment=comment)
+
+        if CONTENT_TYPE_OF_THINGS_TO_TAG == ContentType.objects.get_for_model(SingletonObservable):
+            SingletonObservable.refresh_actionable_tags_cache(thing_to_tag_pks)
 
 
 class TaggedActionableItem(GenericTaggedItemBase):
@@ -585,7 +643,73 @@ class Status(models.Model):
 
     best_processing = models.SmallIntegerField(choices=PROCESSING_KIND,default=PROCESSING_UNKNOWN)
 
+    # Status objects are shared between all objects with identical status
+    # (see ``status_management.intern_status``). They are looked up via
+    # a digest over the normalized values of the fields below rather than
+    # via a query over all these columns.
+
+    INTERNED_FIELDS = ('false_positive',
+                       'active',
+                       'active_from',
+                       'active_to',
+                       'tags',
+                       'priority',
+                       'most_permissive_tlp',
+                       'most_restrictive_tlp',
+                       'max_confidence',
+                       'kill_chain_phases',
+                       'best_processing')
+
+    status_hash = models.CharField(max_length=64,unique=True,null=True,editable=False)
+
+    @staticmethod
+    def normalize_kill_chain_phases(kill_chain_phases):
+        """
+        Return the canonical representation of kill chain phases: the distinct,
+        non-empty phases in sorted order, separated by ';'. Kill chain phases
+        can be given as string or as iterable of phases.
+        """
+        if isinstance(kill_chain_phases,basestring):
+            kill_chain_phases = kill_chain_phases.split(';')
+        return ';'.join(sorted(set(filter(None,kill_chain_phases or []))))
 
+    @classmethod
+    def normalize_values(cls,values):
+        """
+        Given a dictionary of (some of the) interned field values, return
+        the tuple of normalized values of all interned fields (in the order of
+        ``INTERNED_FIELDS``); fields that are not given receive their default value.
+        """
+        result = []
+        for field_name in cls.INTERNED_FIELDS:
+            field = cls._meta.get_field(field_name)
+            if field_name in values:
+                value = field.to_python(values[field_name])
+            else:
+                value = field.get_default()
+            if field_name == 'kill_chain_phases':
+                value = cls.normalize_kill_chain_phases(value)
+            elif field_name == 'tags':
+                value = value or ''
+            result.append(value)
+        return tuple(result)
+
+    @staticmethod
+    def compute_status_hash(normalized_values):
+        def serialize(value):
+            if isinstance(value,datetime):
+                if timezone.is_aware(value):
+                    value = value.astimezone(timezone.utc)
+                return value.isoformat()
+            raise TypeError("%r cannot be serialized" % value)
+        return hashlib.sha256(json.dumps(normalized_values,default=serialize)).hexdigest()
+
+    def save(self,*args,**kwargs):
+        self.kill_chain_phases = Status.normalize_kill_chain_phases(self.kill_chain_phases)
+        normalized_values = Status.normalize_values(dict((field_name,getattr(self,field_name))
+                                                         for field_name in Status.INTERNED_FIELDS))
+        self.status_hash = Status.compute_status_hash(normalized_values)
+        super(Status,self).save(*args,**kwargs)
 
 
 class Status2X(models.Model):
@@ -659,25 +783,215 @@ class SingletonObservable(models.Model):
     ids_signature = models.ForeignKey("IDSSignature",
                                       null=True)
 
+    # Digest over (type, subtype, value): singleton observables are looked
+    # up via this column rather than via the (potentially long) value.
+
+    identity_hash = models.CharField(max_length=64,unique=True,null=True,editable=False)
+
     class Meta:
         unique_together = ('type', 'subtype', 'value')
 
     def __unicode__(self):
         return "(%s/%s):%s" % (self.type.name,self.subtype.name,self.value)
 
+    @staticmethod
+    def compute_identity_hash(type_id,subtype_id,value):
+        # The string is built as unicode and encoded once (see also
+        # migration 0036, which computes the hash in the same way)
+        if isinstance(value,str):
+            value = value.decode('utf-8')
+        return hashlib.sha256((u"%s:%s:%s" % (type_id,subtype_id,value)).encode('utf-8')).hexdigest()
+
+    def save(self,*args,**kwargs):
+        self.identity_hash = SingletonObservable.compute_identity_hash(self.type_id,self.subtype_id,self.value)
+        super(SingletonObservable,self).save(*args,**kwargs)
+
+    @classmethod
+    def get_or_create_by_identity(cls,type,subtype,value):
+        """
+        Like ``get_or_create``, but looks up the singleton observable via its identity hash.
+        """
+        return cls.objects.get_or_create(identity_hash=cls.compute_identity_hash(type.id,subtype.id,value),
+                                         defaults={'type':type,
+                                                   'subtype':subtype,
+                                                   'value':value})
+
+    @classmethod
+    def bulk_get_or_create(cls,triples):
+        """
+        Bulk version of ``get_or_create`` for singleton observables.
+
+        Input:
+        - triples: iterable of triples ``(type_name,subtype_name,value)``
+
+        Existing singleton observables are looked up via their identity hash
+        (one query per chunk of triples); the missing ones are
+        created with a single ``bulk_create``.
+
+        The function returns a pair ``(triple2pk_map,created_triples)``, where
+        ``triple2pk_map`` maps each triple to the primary key of the associated
+        singleton observable and ``created_triples`` is the set of triples for
+        which a new singleton observable has been created.
+        """
+
+        # Map the identity hash of each triple to the creation information
+        # (type_id,subtype_id,value) and the triple itself.
+
+        hash2info_map = {}
+
+        for triple in set(triples):
+            (type_name,subtype_name,value) = triple
+            type_obj = SingletonObservableType.cached_objects.get_or_create(name=type_name)[0]
+            subtype_obj = SingletonObservableSubtype.cached_objects.get_or_create(name=subtype_name)[0]
+            identity_hash = cls.compute_identity_hash(type_obj.id,subtype_obj.id,value)
+            hash2info_map[identity_hash] = ((type_obj.id,subtype_obj.id,value),triple)
+
+        def lookup(identity_hashes):
+            found = {}
+            for hash_chunk in chunked(identity_hashes):
+                existing = cls.objects.filter(identity_hash__in=hash_chunk).values_list('identity_hash','id')
+                for (identity_hash,pk) in existing:
+                    found[hash2info_map[identity_hash][1]] = pk
+            return found
+
+        triple2pk_map = lookup(hash2info_map.keys())
+
+        missing_hashes = [identity_hash for (identity_hash,(creation_info,triple)) in hash2info_map.items()
+                          if not triple in triple2pk_map]
+
+        created_triples = set([])
+
+        if missing_hashes:
+            to_create = []
+            for identity_hash in missing_hashes:
+                ((type_id,subtype_id,value),triple) = hash2info_map[identity_hash]
+                # ``bulk_create`` does not call ``save``, so we set the identity hash here
+                to_create.append(cls(type_id=type_id,subtype_id=subtype_id,value=value,identity_hash=identity_hash))
+                created_triples.add(triple)
+            try:
+                with transaction.atomic():
+                    cls.objects.bulk_create(to_create)
+            except IntegrityError:
+                # Some of the singleton observables have been created in the meantime
+                # (e.g., by a concurrently running import): we fall back to
+                # creating the missing observables one by one.
+                logger.warning("Bulk creation of singleton observables failed, creating them one by one.")
+                created_triples = set([])
+                for identity_hash in missing_hashes:
+                    ((type_id,subtype_id,value),triple) = hash2info_map[identity_hash]
+                    observable, created = cls.objects.get_or_create(identity_hash=identity_hash,
+                                                                    defaults={'type_id':type_id,
+                                                                              'subtype_id':subtype_id,
+                                                                              'value':value})
+                    if created:
+                        created_triples.add(triple)
+
+            # ``bulk_create`` does not return primary keys on all backends,
+            # so we query them.
+
+            triple2pk_map.update(lookup(missing_hashes))
+
+        return (triple2pk_map,created_triples)
+
+
+    @classmethod
+    def refresh_actionable_tags_cache(cls,pks):
+        """
+        Recalculate the field ``actionable_tags_cache`` (the sorted, comma-separated
+        names of the actionable tags of a singleton observable) for the singleton
+        observables with the given pks.
+
+        The tag names are retrieved with one query over TaggedActionableItem (per chunk of
+        pks); only changed caches are written, using one update per distinct value.
+        The tag memberships (see ``SingletonObservableTagMembership``) of kinds
+        ACTIONABLE_TAG and TAG_INFO are brought in line as well.
+        """
+
+        CONTENT_TYPE_SINGLETON_OBSERVABLE = ContentType.objects.get_for_model(SingletonObservable)
+
+        changed_cache_map = {}
+
+        for pk_chunk in chunked(set(map(int,pks))):
+            pk2tag_names_map = dict((pk,set([])) for pk in pk_chunk)
+            pk2tag_info_names_map = dict((pk,set([])) for pk in pk_chunk)
+
+            for (pk,tag_name,tag_info_name) in TaggedActionableItem.objects.filter(content_type=CONTENT_TYPE_SINGLETON_OBSERVABLE,
+                                                                                   object_id__in=pk_chunk).values_list('object_id',
+                                                                                                                       'tag__name',
+                                                                                                                       'tag__info__name'):
+                pk2tag_names_map[pk].add(tag_name)
+                pk2tag_info_names_map[pk].add(tag_info_name)
+
+            SingletonObservableTagMembership.sync(SingletonObservableTagMembership.KIND_ACTIONABLE_TAG,pk2tag_names_map)
+            SingletonObservableTagMembership.sync(SingletonObservableTagMembership.KIND_TAG_INFO,pk2tag_info_names_map)
+
+            for (pk,actionable_tags_cache) in cls.objects.filter(pk__in=pk_chunk).values_list('pk','actionable_tags_cache'):
+                updated_tag_info = ",".join(sorted(pk2tag_names_map[pk]))
+                if updated_tag_info != actionable_tags_cache:
+                    logger.debug("For singleton with pk %s found tags %s" % (pk,updated_tag_info))
+                    changed_cache_map[pk] = {'actionable_tags_cache': updated_tag_info}
+
+        grouped_update(cls.objects,changed_cache_map)
+
+    @classmethod
+    def update_mantis_tags(cls,pk2mantis_tags_map):
+        """
+        Write the given values of ``mantis_tags`` (the comma-separated names of the
+        dingos tags associated with a singleton observable) for the singleton observables
+        with the given pks, using one update per distinct value, and bring the tag
+        memberships of kind DINGOS_TAG in line.
+        """
+
+        grouped_update(cls.objects,
+                       dict((pk,{'mantis_tags':mantis_tags}) for (pk,mantis_tags) in pk2mantis_tags_map.items()))
+
+        for pk_chunk in chunked(pk2mantis_tags_map.keys()):
+            SingletonObservableTagMembership.sync(SingletonObservableTagMembership.KIND_DINGOS_TAG,
+                                                  dict((pk,set(filter(None,pk2mantis_tags_map[pk].split(','))))
+                                                       for pk in pk_chunk))
 
     def add_ids_signature(self,signature_text):
-        signature_object, created = IDSSignature.objects.get_or_create(content=signature_text)
-        print "Sig obj %s" % signature_object.pk
-        print "IDS Sig id %s" % self.ids_signature_id
-        if (not (signature_object.pk == self.ids_signature_id)):
-            print "Creating history"
+        signature_object, created = IDSSignature.get_or_create_by_content(signature_text)
+        if signature_object.pk != self.ids_signature_id:
             IDSSignatureRevision.objects.create(
                                                singleton = self,
                                                ids_signature = signature_object)
 
-        self.ids_signature = signature_object
-        self.save()
+            self.ids_signature = signature_object
+            self.save()
+
+    @classmethod
+    def bulk_add_ids_signatures(cls,pk2signature_text_map):
+        """
+        Bulk version of ``add_ids_signature``.
+
+        Takes a dictionary mapping pks of singleton observables to signature texts.
+        Signatures are looked up (and, where required, created) in bulk; only singleton
+        observables whose signature actually changes are updated, and the
+        associated IDSSignatureRevision objects are created with a single ``bulk_create``.
+
+        Returns a dictionary mapping the pks of the updated singleton observables
+        to the pks of their new signatures.
+        """
+
+        content2pk_map = IDSSignature.bulk_get_or_create(pk2signature_text_map.values())
+
+        changed_map = {}
+
+        for pk_chunk in chunked(pk2signature_text_map.keys()):
+            for (pk,ids_signature_id) in cls.objects.filter(pk__in=pk_chunk).values_list('pk','ids_signature_id'):
+                signature_pk = content2pk_map[pk2signature_text_map[pk]]
+                if signature_pk != ids_signature_id:
+                    changed_map[pk] = signature_pk
+
+        if changed_map:
+            grouped_update(cls.objects,
+                           dict((pk,{'ids_signature_id':signature_pk}) for (pk,signature_pk) in changed_map.items()))
+            IDSSignatureRevision.objects.bulk_create(map(lambda x: IDSSignatureRevision(singleton_id=x[0],
+                                                                                         ids_signature_id=x[1]),
+                                                         changed_map.items()))
+
+        return changed_map
 
 
 
@@ -749,16 +1063,168 @@ class SingletonObservable(models.Model):
 
 
 
+class SingletonObservableTagMembership(models.Model):
+    """
+    Indexed denormalization of the tags associated with singleton observables.
+
+    The fields ``actionable_tags_cache`` and ``mantis_tags`` of singleton observables
+    hold the names of the associated tags as comma-separated text, which is fine for
+    display, but can only be searched by scanning the whole table. This table holds one
+    row per singleton observable and tag name for the following kinds of tags:
+
+    - ACTIONABLE_TAG: name of an actionable tag (of form 'context:tag_info')
+    - TAG_INFO: name of the tag info of an actionable tag
+    - DINGOS_TAG: name of a dingos tag (as stored in ``mantis_tags``)
+
+    The rows are maintained by ``SingletonObservable.refresh_actionable_tags_cache`` and
+    ``SingletonObservable.update_mantis_tags``.
+    """
+
+    KIND_ACTIONABLE_TAG = 0
+    KIND_TAG_INFO = 1
+    KIND_DINGOS_TAG = 2
+
+    KIND_CHOICES = [
+        (KIND_ACTIONABLE_TAG,'Actionable tag'),
+        (KIND_TAG_INFO,'Tag info'),
+        (KIND_DINGOS_TAG,'Dingos tag'),
+    ]
+
+    observable = models.ForeignKey(SingletonObservable,related_name='tag_memberships')
+    tag_name = models.CharField(max_length=255)
+    kind = models.SmallIntegerField(choices=KIND_CHOICES)
+
+    # Lower-case version of the tag name for case-insensitive searches
+    # that can still use an index.
+
+    search_name = models.CharField(max_length=255,editable=False)
+
+    class Meta:
+        unique_together = ('observable','kind','tag_name')
+        index_together = [('kind','tag_name'),('kind','search_name')]
+
+    def __unicode__(self):
+        return "%s: %s (%s)" % (self.observable_id,self.tag_name,dict(self.KIND_CHOICES).get(self.kind))
+
+    def save(self,*args,**kwargs):
+        self.search_name = self.tag_name.lower()
+        super(SingletonObservableTagMembership,self).save(*args,**kwargs)
+
+    @classmethod
+    def sync(cls,kind,pk2tag_names_map):
+        """
+        Bring the rows of the given kind for the singleton observables whose pks are the keys
+        of ``pk2tag_names_map`` in line with the sets of tag names given as values.
+        """
+
+        existing_rows = []
+
+        for pk_chunk in chunked(pk2tag_names_map.keys()):
+            existing_rows.extend(cls.objects.filter(kind=kind,
+                                                    observable_id__in=pk_chunk).values_list('id','observable_id','tag_name'))
+
+        obsolete_ids = [row_id for (row_id,pk,tag_name) in existing_rows if not tag_name in pk2tag_names_map[pk]]
+
+        existing_pairs = set(map(lambda x: (x[1],x[2]), existing_rows))
+
+        # ``bulk_create`` does not call ``save``, so we set the search name here
+        new_rows = [cls(observable_id=pk,tag_name=tag_name,search_name=tag_name.lower(),kind=kind)
+                    for (pk,tag_names) in pk2tag_names_map.items() for tag_name in tag_names
+                    if not (pk,tag_name) in existing_pairs]
+
+        for id_chunk in chunked(obsolete_ids):
+            cls.objects.filter(id__in=id_chunk).delete()
+
+        try:
+            with transaction.atomic():
+                cls.objects.bulk_create(new_rows)
+        except IntegrityError:
+            # Some of the rows have been created in the meantime (e.g., by a
+            # concurrently running tag propagation): we fall back to creating
+            # the missing rows one by one.
+            logger.warning("Bulk creation of tag memberships failed, creating them one by one.")
+            for row in new_rows:
+                cls.objects.get_or_create(observable_id=row.observable_id,
+                                          kind=kind,
+                                          tag_name=row.tag_name,
+                                          defaults={'search_name':row.search_name})
+
+    @classmethod
+    def observable_query(cls,kinds,tag_name_prefix):
+        """
+        Return a Q object selecting the singleton observables that have a tag of one
+        of the given kinds whose name starts with the given prefix (ignoring case).
+        """
+        return Q(pk__in=cls.objects.filter(kind__in=kinds,
+                                           search_name__startswith=tag_name_prefix.lower()).values('observable_id'))
+
+
 class SignatureType(models.Model):
     name = models.CharField(max_length=255,unique=True)
 
 class IDSSignature(models.Model):
     content = models.TextField(blank=True)
 
+    # Signatures are looked up via the hash of their content rather than
+    # via the (unindexed) content itself.
+
+    content_hash = models.CharField(max_length=64,unique=True,null=True,editable=False)
+
     import_list = models.ManyToManyField(SingletonObservable,
                                        through="IDSSignatureRevision",
                                        )
 
+    @staticmethod
+    def compute_content_hash(content):
+        if isinstance(content,unicode):
+            content = content.encode('utf-8')
+        return hashlib.sha256(content).hexdigest()
+
+    def save(self,*args,**kwargs):
+        self.content_hash = IDSSignature.compute_content_hash(self.content)
+        super(IDSSignature,self).save(*args,**kwargs)
+
+    @classmethod
+    def get_or_create_by_content(cls,content):
+        return cls.objects.get_or_create(content_hash=cls.compute_content_hash(content),
+                                         defaults={'content':content})
+
+    @classmethod
+    def bulk_get_or_create(cls,contents):
+        """
+        Look up the signatures with the given contents and create the missing ones in bulk.
+
+        Returns a dictionary mapping each content to the pk of the associated signature.
+        """
+        hash2content_map = dict((cls.compute_content_hash(content),content) for content in set(contents))
+
+        def lookup():
+            found = {}
+            for hash_chunk in chunked(hash2content_map.keys()):
+                found.update(cls.objects.filter(content_hash__in=hash_chunk).values_list('content_hash','pk'))
+            return found
+
+        hash2pk_map = lookup()
+
+        missing_hashes = set(hash2content_map.keys()) - set(hash2pk_map.keys())
+
+        if missing_hashes:
+            try:
+                with transaction.atomic():
+                    cls.objects.bulk_create(map(lambda x: cls(content=hash2content_map[x],content_hash=x),
+                                                missing_hashes))
+            except IntegrityError:
+                # Some of the signatures have been created in the meantime:
+                # we fall back to creating them one by one.
+                for content_hash in missing_hashes:
+                    cls.get_or_create_by_content(hash2content_map[content_hash])
+
+            # ``bulk_create`` does not return primary keys on all backends,
+            # so we query them.
+            hash2pk_map = lookup()
+
+        return dict((content,hash2pk_map[content_hash]) for (content_hash,content) in hash2content_map.items())
+
 class IDSSignatureRevision(models.Model):
     """
 
@@ -819,6 +1285,243 @@ class ImportInfo(models.Model):
         unique_together = ('uid', 'namespace')
 
 
+class TagPropagationItem(models.Model):
+    """
+    Queue of changes of actionable tags that are yet to be propagated into
+    Dingos (see ``ActionableTag.bulk_action`` and ``mantis_import.propagate_tag_changes``).
+
+    Each item records that a context has been added to/removed from a singleton
+    observable.
+    """
+
+    ADD = 0
+    REMOVE = 1
+    ACTIONS = [
+        (ADD,'add'),
+        (REMOVE,'remove')
+    ]
+
+    ACTION_MAP = dict(ACTIONS)
+
+    object_id = models.IntegerField()
+    context_name = models.CharField(max_length=255)
+    action = models.SmallIntegerField(choices=ACTIONS)
+
+    user = models.ForeignKey(User,null=True,related_name='+')
+    comment = models.TextField(blank=True)
+
+    timestamp = models.DateTimeField(auto_now_add=True)
+
+    def __unicode__(self):
+        return "%s %s on %s" % (self.ACTION_MAP.get(self.action),self.context_name,self.object_id)
+
+    @classmethod
+    def enqueue(cls,action_flag,context_names,thing_to_tag_pks,user=None,comment=''):
+        """
+        Record the addition (``action_flag`` is ``ActionableTaggingHistory.ADD``) or removal
+        of the given contexts on the singleton observables with the given pks.
+        """
+        if action_flag == ActionableTaggingHistory.ADD:
+            action = cls.ADD
+        else:
+            action = cls.REMOVE
+        cls.objects.bulk_create([cls(object_id=pk,
+                                     context_name=context_name,
+                                     action=action,
+                                     user=user,
+                                     comment=comment)
+                                 for pk in set(thing_to_tag_pks) for context_name in context_names])
+
+
+class ImportWatermark(models.Model):
+    """
+    Records up to which InfoObject the STIX reports of a given
+    report family/type have been imported into Mantis Actionables.
+
+    Reports are imported in the order of (create_timestamp, pk); the
+    watermark holds create_timestamp and pk of the last report that
+    has been imported (see ``mantis_import.process_STIX_Reports``).
+    """
+
+    report_family = models.CharField(max_length=255)
+    report_type = models.CharField(max_length=255)
+
+    last_create_timestamp = models.DateTimeField(default=get_null_time)
+    last_iobject_pk = models.IntegerField(default=0)
+
+    timestamp = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('report_family','report_type')
+
+    def __unicode__(self):
+        return "%s/%s: %s (pk %s)" % (self.report_family,self.report_type,self.last_create_timestamp,self.last_iobject_pk)
+
+    def get_lookback_timestamp(self,lookback):
+        """
+        Return the create_timestamp of the watermark minus ``lookback`` seconds.
+        """
+        try:
+            return self.last_create_timestamp - timedelta(seconds=lookback)
+        except OverflowError:
+            # The watermark has not been advanced yet
+            return NULL_TIME
+
+    def advance(self,iobject):
+        if (iobject.create_timestamp,iobject.pk) > (self.last_create_timestamp,self.last_iobject_pk):
+            self.last_create_timestamp = iobject.create_timestamp
+            self.last_iobject_pk = iobject.pk
+            self.save()
+
+
+class ExportResultCache(models.Model):
+    """
+    Caches the normalized results of running an exporter on a top-level InfoObject.
+
+    Revisions of InfoObjects never change once they have been written, but
+    the graph on which the exporter runs resolves references to the *latest*
+    revision of the referenced objects. The results of running a given exporter
+    (in a given version) on a given revision can therefore be reused for further
+    imports of that revision as long as none of the objects in the graph has been
+    revised: the entry records the revisions of all objects in the graph as JSON
+    list of pairs (identifier pk, InfoObject pk), which are checked by ``is_current``
+    (see ``mantis_import.iter_export_results``). The normalized results only contain
+    pks, types and values (see ``mantis_import.normalize_export_result``) and
+    are stored as JSON.
+    """
+
+    iobject = models.ForeignKey(InfoObject,related_name='+')
+    exporter = models.CharField(max_length=255)
+    exporter_version = models.CharField(max_length=40)
+
+    results = models.TextField()
+
+    graph_revisions = models.TextField(null=True)
+
+    timestamp = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('iobject','exporter','exporter_version')
+
+    def __unicode__(self):
+        return "%s (%s) on %s" % (self.exporter,self.exporter_version,self.iobject_id)
+
+    def get_results(self):
+        return json.loads(self.results)
+
+    def is_current(self):
+        """
+        Check whether the objects in the graph from which the results were derived
+        are still the latest revisions of their identifiers.
+        """
+        if self.graph_revisions is None:
+            return False
+
+        identifier_pk2iobject_pk_map = dict(json.loads(self.graph_revisions))
+
+        for identifier_pk_chunk in chunked(identifier_pk2iobject_pk_map.keys()):
+            for (identifier_pk,latest_pk) in Identifier.objects.filter(pk__in=identifier_pk_chunk).values_list('pk','latest_id'):
+                if latest_pk != identifier_pk2iobject_pk_map[identifier_pk]:
+                    return False
+        return True
+
+    @classmethod
+    def store(cls,iobject_pk,exporter,exporter_version,results,graph_revisions):
+        """
+        Store the normalized results along with the revisions of the objects in the
+        graph (an iterable of pairs (identifier pk, InfoObject pk)); an existing entry
+        (e.g., written by a concurrent import of the same revision or derived from
+        outdated revisions of referenced objects) is overwritten.
+        """
+        cls.objects.update_or_create(iobject_id=iobject_pk,
+                                     exporter=exporter,
+                                     exporter_version=exporter_version,
+                                     defaults={'results': json.dumps(results),
+                                               'graph_revisions': json.dumps(sorted(map(list,graph_revisions)))})
+
+
+class InfoObjectTLP(models.Model):
+    """
+    Lookup table mapping InfoObjects to the TLP color found in their markings.
+
+    Determining the TLP color of an InfoObject requires a join across marking, fact
+    and fact value; since InfoObject revisions never change, the result is recorded
+    here the first time it is required (see ``get_tlp_map``). Objects without TLP
+    marking are recorded with an empty color, but only when they are looked up by
+    the import: by then, the markings of the objects have certainly been written.
+    """
+
+    iobject = models.ForeignKey(InfoObject,related_name='+',unique=True)
+
+    color = models.CharField(max_length=40,blank=True,default='')
+
+    def __unicode__(self):
+        return "%s: %s" % (self.iobject_id,self.color)
+
+    @classmethod
+    def get_tlp_map(cls,iobject_pks,record_missing=False):
+        """
+        Return a dictionary mapping the pks of all given InfoObjects that carry a TLP
+        marking to the TLP color (as found in the marking).
+
+        Entries missing from the lookup table are determined from the markings;
+        those for which a color has been found are written into the table. If
+        ``record_missing`` is set, objects without TLP marking are written into the
+        table with an empty color, so that they are not looked up in the markings
+        again; only set it if the markings of the objects have been written
+        completely (as is the case for the objects of an imported report).
+        """
+        iobject_pks = set(int(x) for x in iobject_pks if x is not None)
+
+        result = {}
+        known_pks = set([])
+
+        for pk_chunk in chunked(iobject_pks):
+            for (iobject_pk,color) in cls.objects.filter(iobject_id__in=pk_chunk).values_list('iobject_id','color'):
+                known_pks.add(iobject_pk)
+                if color:
+                    result[iobject_pk] = color
+
+        missing_pks = iobject_pks - known_pks
+
+        if not missing_pks:
+            return result
+
+        # The TLP information is stored in markings
+
+        missing_map = {}
+
+        for pk_chunk in chunked(missing_pks):
+            color_qs = InfoObject.objects.filter(id__in=pk_chunk)\
+                .filter(marking_thru__marking__fact_thru__fact__fact_term__term='Marking_Structure',
+                        marking_thru__marking__fact_thru__fact__fact_term__attribute='color')\
+                .values_list('id','marking_thru__marking__fact_thru__fact__fact_values__value')
+            missing_map.update(color_qs)
+
+        missing_map = dict((iobject_pk,color) for (iobject_pk,color) in missing_map.items() if color)
+
+        if record_missing:
+            entries = dict((iobject_pk,'') for iobject_pk in missing_pks)
+            entries.update(missing_map)
+        else:
+            # Objects without color are not recorded, so that they are looked up
+            # again once their markings have been written.
+            entries = missing_map
+
+        try:
+            with transaction.atomic():
+                cls.objects.bulk_create(map(lambda x: cls(iobject_id=x[0],color=x[1]),
+                                            entries.items()))
+        except IntegrityError:
+            # Entries have been written concurrently; since InfoObjects
+            # are immutable, these carry the same information.
+            pass
+
+        result.update(missing_map)
+
+        return result
+
+
 class Context(models.Model):
     name = models.CharField(max_length=40,unique=True)
     title = models.CharField(max_length=256,blank=True,default='')
@@ -908,6 +1611,28 @@ class ActionableTaggingHistory(models.Model):
                                                             tag=x) for x in tags])
         ActionableTaggingHistory.objects.bulk_create(entry_list)
 
+    @classmethod
+    def bulk_create_tagging_history_for_pairs(cls,action_flag,
+                                              pk_tag_id_pairs,
+                                              thing_to_tag_model=None,
+                                              user=None,comment=''):
+        """
+        Like ``bulk_create_tagging_history``, but rather than writing history entries for
+        each combination of tag and thing to tag, history entries are written for exactly
+        the given pairs ``(pk of thing to tag, pk of actionable tag)``.
+        """
+
+        if not thing_to_tag_model:
+            CONTENT_TYPE_OF_THINGS_TO_TAG = ContentType.objects.get_for_model(SingletonObservable)
+        else:
+            CONTENT_TYPE_OF_THINGS_TO_TAG = ContentType.objects.get_for_model(thing_to_tag_model)
+
+        ActionableTaggingHistory.objects.bulk_create([ActionableTaggingHistory(action=action_flag,user=user,comment=comment,
+                                                                               object_id=pk,
+                                                                               content_type=CONTENT_TYPE_OF_THINGS_TO_TAG,
+                                                                               tag_id=tag_id)
+                                                      for (pk,tag_id) in pk_tag_id_pairs])
+
 
 
 
@@ -32,10 +32,17 @@ def read_from_conf(name):
         setattr(mantis_actionables,"MANTIS_ACTIONABLES_%s" % name, final_value)
 read_from_conf('STIX_REPORT_FAMILY_AND_TYPES')
 read_from_conf('ACTIVE_EXPORTERS')
+read_from_conf('IMPORT_CHUNK_SIZE')
+read_from_conf('IMPORT_WATERMARK_LOOKBACK')
+read_from_conf('EXPORT_CACHE_MAX_RESULTS')
+read_from_conf('ASYNC_TAG_PROPAGATION')
+read_from_conf('MARK_OUTDATED_SOURCES')
+read_from_conf('TAG_PROPAGATION_BATCH_SIZE')
 read_from_conf('DASHBOARD_CONTENTS')
 read_from_conf('CONTEXT_TAG_REGEX')
 read_from_conf('STATUS_UPDATE_FUNCTION_PATH')
 read_from_conf('SRC_META_DATA_FUNCTION_PATH')
+read_from_conf('STATUS_INTERN_CACHE_SIZE')
 
 
 
@@ -20,29 +20,132 @@
 import json
 import importlib
 
-from mantis_actionables import MANTIS_ACTIONABLES_STATUS_UPDATE_FUNCTION_PATH, \
-                               MANTIS_ACTIONABLES_SRC_META_DATA_FUNCTION_PATH
+from collections import OrderedDict
 
+from django.db import transaction
 
 from mantis_actionables.models import Status, Source
 
+from mantis_actionables import MANTIS_ACTIONABLES_STATUS_UPDATE_FUNCTION_PATH, \
+                               MANTIS_ACTIONABLES_SRC_META_DATA_FUNCTION_PATH, \
+                               MANTIS_ACTIONABLES_STATUS_INTERN_CACHE_SIZE
+
 
+# In-process LRU cache mapping tuples of normalized status values
+# (see ``Status.normalize_values``) to the pks of the respective status objects.
 
+_status_intern_cache = OrderedDict()
+
+# Pks of the status objects that have been created by this process in a transaction
+# that may not have been committed yet (only used if ``transaction.on_commit`` is not
+# available, see ``cache_status_pk``)
+
+_uncommitted_status_pks = set()
+
+
+def add_to_status_intern_cache(normalized_values,status_pk):
+    _status_intern_cache[normalized_values] = status_pk
+
+    while len(_status_intern_cache) > MANTIS_ACTIONABLES_STATUS_INTERN_CACHE_SIZE:
+        _status_intern_cache.popitem(last=False)
+
+
+def cache_status_pk(normalized_values,status_pk,created):
+    """
+    Enter the pk of a status object that has just been retrieved from the database
+    (or created) into the intern cache, but only once the status object is known to
+    have been committed: if the transaction that created the status object is rolled
+    back, the cache would otherwise keep a pk that does not exist anymore.
+
+    Where ``transaction.on_commit`` is available, the pk is entered after the current
+    transaction has been committed. Otherwise, the pks of status objects that are
+    created within a transaction are remembered and not entered into the cache until
+    the process is found outside of any transaction.
+    """
+    if hasattr(transaction,'on_commit'):
+        # The function is carried out right away in autocommit mode
+        # and dropped if the transaction is rolled back.
+        transaction.on_commit(lambda: add_to_status_intern_cache(normalized_values,status_pk))
+        return
+
+    if not transaction.get_connection().in_atomic_block:
+        # All transactions carried out by this process so far have
+        # been committed or rolled back, so status objects found in the
+        # database are committed.
+        _uncommitted_status_pks.clear()
+        add_to_status_intern_cache(normalized_values,status_pk)
+    elif created:
+        _uncommitted_status_pks.add(status_pk)
+    elif status_pk not in _uncommitted_status_pks:
+        add_to_status_intern_cache(normalized_values,status_pk)
 
-def updateStatus(status,*args,**kwargs):
-    source_obj = None
 
+def intern_status(creation_kwargs):
+    """
+    Return the (unique) status object with the given field values, creating it if necessary.
 
-    if 'source_obj' in kwargs:
-        source_obj = kwargs['source_obj']
+    The values are normalized (defaults filled in, kill chain phases sorted) and
+    looked up in an in-process LRU cache; on a cache miss, the status object is
+    retrieved via its status hash. Statuses are never modified once created, so
+    on a cache hit, the status object is instantiated from the cached pk without
+    querying the database. Status objects are only entered into the cache once
+    they are known to have been committed (see ``cache_status_pk``).
+
+    Returns a tuple ``(status, created)``.
+    """
+
+    normalized_values = Status.normalize_values(creation_kwargs)
+
+    status_pk = _status_intern_cache.pop(normalized_values,None)
+
+    if status_pk is not None:
+        status = Status(pk=status_pk,**dict(zip(Status.INTERNED_FIELDS,normalized_values)))
+        status.status_hash = Status.compute_status_hash(normalized_values)
+        status._state.adding = False
+        # Put the status back at the end of the LRU order
+        add_to_status_intern_cache(normalized_values,status_pk)
+        return (status,False)
+
+    status, created = Status.objects.get_or_create(status_hash=Status.compute_status_hash(normalized_values),
+                                                   defaults=dict(zip(Status.INTERNED_FIELDS,normalized_values)))
+
+    cache_status_pk(normalized_values,status.pk,created)
+
+    return (status,created)
+
+
+def updateStatus(status,*args,**kwargs):
+    """
+    Derive the new status of an object (usually a singleton observable) from its current status.
+
+    Information about sources can be provided either via a single source object
+    (keyword ``source_obj``) or via a list of source objects (keyword ``source_objs``);
+    in the latter case, the information of all sources is folded into the status.
+    Related STIX entities can be provided via the keyword ``related_entities``;
+    otherwise, the entities related to the source object(s) are used.
+
+    All arguments are passed on to the custom status update function configured
+    via STATUS_UPDATE_FUNCTION_PATH. When called via ``StatusUpdateAccumulator.flush``,
+    ``source_objs`` is always given; ``source_obj`` is given in addition if there
+    is exactly one source object, so that custom functions reading ``source_obj``
+    keep working for observables with a single source. Custom functions should read
+    ``source_objs`` in order to take all sources into account.
+    """
+
+    if kwargs.get('source_objs'):
+        source_objs = kwargs['source_objs']
+    elif kwargs.get('source_obj'):
+        source_objs = [kwargs['source_obj']]
     else:
-        source_obj = None
+        source_objs = []
 
     if 'related_entities' in kwargs:
         related_entities = kwargs['related_entities']
 
-    elif  source_obj:
-        related_entities = source_obj.related_stix_entities.all()
+    elif  source_objs:
+        related_entities = []
+        for source_obj in source_objs:
+            related_entities.extend(source_obj.related_stix_entities.all())
     else:
         related_entities = []
 
@@ -50,7 +153,7 @@ def updateStatus(status,*args,**kwargs):
     if status:
         most_permissive_tlp = status.most_permissive_tlp
         most_restrictive_tlp = status.most_restrictive_tlp
-        kill_chain_phases = set(status.kill_chain_phases.split(';'))
+        kill_chain_phases = set(filter(None,status.kill_chain_phases.split(';')))
         max_confidence = status.max_confidence
         active = status.active
         priority = status.priority
@@ -66,7 +169,7 @@ def updateStatus(status,*args,**kwargs):
         false_positive = False
         best_processing = Status.PROCESSING_UNKNOWN
 
-    if source_obj:
+    for source_obj in source_objs:
         most_permissive_tlp = max(source_obj.tlp,most_permissive_tlp)
         if source_obj.tlp != Source.TLP_UNKOWN and most_restrictive_tlp != Source.TLP_UNKOWN:
             most_restrictive_tlp = min(source_obj.tlp,most_restrictive_tlp)
@@ -97,7 +200,7 @@ def updateStatus(status,*args,**kwargs):
 
 
 
-    kill_chain_phases = ';'.join(kill_chain_phases)
+    kill_chain_phases = Status.normalize_kill_chain_phases(kill_chain_phases)
 
     creation_kwargs = {'most_permissive_tlp' : most_permissive_tlp,
                        'most_restrictive_tlp' : most_restrictive_tlp,
@@ -119,11 +222,56 @@ def updateStatus(status,*args,**kwargs):
 
 
 
-    new_status, created = Status.objects.get_or_create(**creation_kwargs)
+    new_status, created = intern_status(creation_kwargs)
 
     return (new_status,created)
 
 
+class StatusUpdateAccumulator(object):
+    """
+    Collect status-relevant information during an import and update the status once per object.
+
+    During an import, a singleton observable may occur in many export results.
+    Rather than updating the status of the observable for each of these results,
+    the import registers the source object and related STIX entities of each result with
+    the accumulator via ``add``. Calling ``flush`` at the end of the import
+    folds all collected information into a single status update per observable,
+    so that at most one status transition is written per observable.
+    """
+
+    def __init__(self):
+        # Mapping from pks of observables to triples
+        # (observable, source pk -> source object, entity pk -> entity)
+        self.observable_map = {}
+
+    def __len__(self):
+        return len(self.observable_map)
+
+    def add(self,observable,source_obj=None,related_entities=None):
+        (observable,source_map,entity_map) = self.observable_map.setdefault(observable.pk,(observable,{},{}))
+        if source_obj:
+            source_map[source_obj.pk] = source_obj
+        for related_entity in (related_entities or []):
+            entity_map[related_entity.pk] = related_entity
+
+    def flush(self,update_function=updateStatus,action=None,user=None,**kwargs):
+        for (observable,source_map,entity_map) in self.observable_map.values():
+            source_objs = source_map.values()
+            source_kwargs = {'source_objs': source_objs}
+            if len(source_objs) == 1:
+                # Custom status update functions (see STATUS_UPDATE_FUNCTION_PATH)
+                # written before the introduction of ``source_objs`` read the
+                # source from ``source_obj``.
+                source_kwargs['source_obj'] = source_objs[0]
+            source_kwargs.update(kwargs)
+            observable.update_status(update_function=update_function,
+                                     action=action,
+                                     user=user,
+                                     related_entities=entity_map.values(),
+                                     **source_kwargs)
+        self.observable_map = {}
+
+
 def createSourceMetaData(*args,**kwargs):
 
     if MANTIS_ACTIONABLES_SRC_META_DATA_FUNCTION_PATH:
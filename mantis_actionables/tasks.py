@@ -21,30 +21,125 @@ from __future__ import absolute_import
 import logging
 
 from celery import shared_task
+from celery.signals import worker_process_init
+
+from django.db import transaction
 
 from mantis_actionables.core import crowdstrike
 
-from .models import ActionableTag
+from . import MANTIS_ACTIONABLES_MARK_OUTDATED_SOURCES
+
+from .models import ActionableTag, ImportWatermark, CachingManager
 
 
 logger = logging.getLogger(__name__)
 
 
+@worker_process_init.connect
+def prewarm_caches(**kwargs):
+    """
+    Fill the caches of the CachingManager when a worker process starts rather
+    than during the first task carried out by the process.
+    """
+    try:
+        CachingManager.prewarm()
+    except Exception:
+        # A failure here must not keep the worker from starting: the caches
+        # are then filled on first use.
+        logger.exception("Prewarming of caches failed")
+
+
+# Countdown (in seconds) used by ``delay_after_commit`` if the
+# transaction cannot be hooked into
+
+DELAY_AFTER_COMMIT_COUNTDOWN = 10
+
+
+def delay_after_commit(task,*args,**kwargs):
+    """
+    Dispatch the given task once the current transaction has been committed, so
+    that the task sees the data written in the transaction.
+
+    Django versions without ``transaction.on_commit`` (< 1.9) offer no hook for this:
+    within a transaction, the task is then dispatched with a countdown, which
+    usually suffices; tasks that have to see the data (such as
+    ``async_propagate_tag_changes``) should be scheduled periodically in addition
+    (see ``mantis_actionables.celery_schedule``).
+    """
+    if hasattr(transaction,'on_commit'):
+        transaction.on_commit(lambda: task.delay(*args,**kwargs))
+    elif transaction.get_connection().in_atomic_block:
+        task.apply_async(args=args,kwargs=kwargs,countdown=DELAY_AFTER_COMMIT_COUNTDOWN)
+    else:
+        # Autocommit: the data has already been committed
+        task.delay(*args,**kwargs)
+
+
 @shared_task
 def async_export_to_actionables(top_level_iobj_identifier_pk,
                                 top_level_iobj_pk,
                                 export_results,
                                 graph=None,
                                 user=None):
-    from mantis_actionables.mantis_import import import_singleton_observables_from_export_result
+    """
+    Import export results into Mantis Actionables.
+
+    ``export_results`` should be a payload as produced by ``mantis_import.make_export_payload``
+    (use ``mantis_import.export_to_actionables_async`` to call this task); a list of raw
+    export results is still accepted. If no graph is passed, the graph is only
+    generated in case it is actually required.
+    """
+    from mantis_actionables.mantis_import import import_singleton_observables_from_export_result, \
+        read_export_payload, LazyGraph
+
+    if graph is None:
+        graph = LazyGraph(top_level_iobj_pk,annotate=True)
 
     import_singleton_observables_from_export_result(top_level_iobj_identifier_pk,
                                                     top_level_iobj_pk,
-                                                    export_results,
+                                                    read_export_payload(export_results),
                                                     graph=graph,
                                                     user=user)
 
 
+@shared_task
+def async_import_STIX_report(top_level_iobj_pk,user=None,**kwargs):
+    """
+    Import a single STIX report; the post-processing is left to
+    ``async_post_process_import`` (see ``mantis_import.import_STIX_reports_parallel``).
+
+    Returns the pk of the report: the information required for post-processing
+    is determined by the callback from the database rather than passed through
+    the result backend.
+    """
+    from mantis_actionables.mantis_import import import_singleton_observables_from_STIX_iobjects
+
+    import_singleton_observables_from_STIX_iobjects([top_level_iobj_pk],
+                                                    user=user,
+                                                    post_process=False,
+                                                    **kwargs)
+    return top_level_iobj_pk
+
+
+@shared_task
+def async_post_process_import(top_level_iobj_pks,user=None,watermark_updates=None):
+    """
+    Chord callback: carry out the post-processing for all reports imported
+    by ``async_import_STIX_report`` tasks, whose results are the pks of the
+    imported reports.
+
+    ``watermark_updates`` is a list of pairs (pk of ImportWatermark, pk of
+    the last imported InfoObject) of watermarks to be advanced.
+    """
+    from dingos.models import InfoObject
+    from mantis_actionables.mantis_import import post_process_imported_reports
+
+    post_process_imported_reports(top_level_iobj_pks,user=user)
+
+    for (watermark_pk,iobject_pk) in (watermark_updates or []):
+        ImportWatermark.objects.get(pk=watermark_pk).advance(InfoObject.objects.get(pk=iobject_pk))
+
+
 @shared_task
 def async_tag_transfer_into_actionables(*args,**kwargs):
     from mantis_actionables.mantis_import import update_and_transfer_tags
@@ -52,6 +147,38 @@ def async_tag_transfer_into_actionables(*args,**kwargs):
     update_and_transfer_tags(*args,**kwargs)
 
 
+@shared_task
+def async_propagate_tag_changes(*args,**kwargs):
+    """
+    Transfer queued changes of actionable tags into Dingos (see ``mantis_import.propagate_tag_changes``).
+
+    The task is triggered by ``ActionableTag.bulk_action`` after the transaction that
+    queued the changes has been committed (see ``delay_after_commit``); it should also be
+    scheduled periodically (see ``mantis_actionables.celery_schedule``).
+    """
+    from mantis_actionables.mantis_import import propagate_tag_changes
+
+    propagate_tag_changes(*args,**kwargs)
+
+
+@shared_task
+def async_outdate_sources(simulate=None,top_level_iobject_identifier_pk=None):
+    """
+    Examine all sources in the database for outdated sources and mark them
+    as such; meant to be scheduled periodically (e.g., via celery beat).
+
+    Unless ``simulate`` is given explicitly, outdated sources are only marked
+    if the setting ``MARK_OUTDATED_SOURCES`` is switched on.
+    """
+    from mantis_actionables.mantis_import import outdate_sources
+
+    if simulate is None:
+        simulate = not MANTIS_ACTIONABLES_MARK_OUTDATED_SOURCES
+
+    outdate_sources(simulate=simulate,
+                    top_level_iobject_identifier_pk=top_level_iobject_identifier_pk)
+
+
 @shared_task
 def import_crowdstrike_csv(csv_file):
     crowdstrike.import_crowdstrike_csv(csv_file)
@@ -50,7 +50,8 @@ from dingos.core.utilities import listify, set_dict
 from dingos.templatetags.dingos_tags import show_TagDisplay
 
 
-from .models import SingletonObservable,SingletonObservableType,Source,ActionableTag,ActionableTaggingHistory,Context,Status,ImportInfo,Status2X, TagInfo
+from .models import SingletonObservable,SingletonObservableType,Source,ActionableTag,ActionableTaggingHistory,Context,Status,ImportInfo,Status2X, TagInfo, InfoObjectTLP, \
+    SingletonObservableTagMembership
 from .filter import ActionablesContextFilter, SingletonObservablesFilter, ImportInfoFilter, BulkInvestigationFilter, ExtendedSingletonObservablesFilter
 
 from .forms import ContextEditForm, BulkTaggingForm
@@ -170,8 +171,8 @@ def datatable_query(post, **kwargs):
 
     if filter_q:
         query = filter_q.pop()
-        for q in filter_q:
-            query &= q
+        for item in filter_q:
+            query &= item
 
         q = q.filter(query)
 
@@ -183,12 +184,15 @@ def datatable_query(post, **kwargs):
         for n,c in display_cols.iteritems():
 
             if post_dict['columns'][n]['searchable'] == "true":
-                col_search.append({
-                    c + '__icontains' : sv
-                })
+                if callable(c):
+                    col_search.append(c(sv))
+                else:
+                    col_search.append(Q(**{
+                        c + '__icontains' : sv
+                    }))
 
     if col_search:
-        queries = [Q(**filter) for filter in col_search]
+        queries = col_search
         query = queries.pop()
 
         # Or the Q object with the ones remaining in the list
@@ -680,11 +684,7 @@ class DashboardDataProvider(BasicTableDataProvider):
             iobject_ids.add(row[row_col])
 
         # fetch all id -> TLP color mappings
-        select_columns = ['id', 'marking_thru__marking__fact_thru__fact__fact_values__value']
-        id2colors = dict(InfoObject.objects.filter(id__in=iobject_ids)
-                         .filter(marking_thru__marking__fact_thru__fact__fact_term__term='Marking_Structure',
-                                 marking_thru__marking__fact_thru__fact__fact_term__attribute='color')
-                         .values_list(*select_columns))
+        id2colors = InfoObjectTLP.get_tlp_map(iobject_ids)
         # end TLP
         return id2colors
 
@@ -971,12 +971,17 @@ class SingletonObservablesWithStatusOneTableDataProvider(BasicTableDataProvider)
                 ('type__name','Type','1'), #6
                 ('subtype__name','Subtype','1'), #7
                 ('value','Value','1'), #8
-                ('actionable_tags_cache','Tags','1'), #9
-
-
             ],
-        'QUERY_ONLY' : [('id','XXX',0)],
-        'DISPLAY_ONLY' :  []
+        'QUERY_ONLY' : [('actionable_tags_cache','Tags','1'), #0
+                        ('id','XXX',0)], #1
+        # Searching the comma-separated tag cache would require a scan of the whole
+        # table; instead, the indexed tag memberships are searched for tags (or tag infos)
+        # starting with the search value (ignoring case).
+        'DISPLAY_ONLY' :  [(lambda filter_wert : SingletonObservableTagMembership.observable_query([SingletonObservableTagMembership.KIND_ACTIONABLE_TAG,
+                                                                                                    SingletonObservableTagMembership.KIND_TAG_INFO],
+                                                                                                   filter_wert),
+                            'Tags','1'), #9
+                           ]
 
     }
 
@@ -995,7 +1000,7 @@ class SingletonObservablesWithStatusOneTableDataProvider(BasicTableDataProvider)
             row[3] = Status.CONFIDENCE_MAP[int(row[3])]
             row[4] = Status.PROCESSING_MAP[int(row[4])]
 
-            row[8] = "<a href='%s'>%s</a>" % (reverse('actionables_singleton_observables_details',kwargs={'pk':int(row[offset+0])}),
+            row[8] = "<a href='%s'>%s</a>" % (reverse('actionables_singleton_observables_details',kwargs={'pk':int(row[offset+1])}),
                                                                  row[8])
 
             row = row[:-1]
@@ -16,8 +16,19 @@ try:
             "django.contrib.auth",
             "django.contrib.contenttypes",
             "django.contrib.sites",
+            "taggit",
+            "dingos",
             "mantis_actionables",
         ],
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            },
+            "caching_manager": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "caching_manager",
+            },
+        },
         SITE_ID=1,
         NOSE_ARGS=['-s'],
     )
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+"""
+Helpers for setting up the objects required by the tests of `django-mantis-actionables`.
+"""
+
+import itertools
+
+from mock import patch
+
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from django.utils import timezone
+
+from dingos.models import DataTypeNameSpace, Fact, FactDataType, FactTerm, FactValue, Identifier, \
+    IdentifierNameSpace, InfoObject, InfoObjectFamily, InfoObjectType, Revision
+
+from mantis_actionables.models import CachingManager, SingletonObservable, SingletonObservableSubtype, \
+    SingletonObservableType, Source
+
+_uid_counter = itertools.count()
+
+
+class ActionablesTestCase(TestCase):
+    """
+    Test case that empties the caches of the CachingManager before each test: the
+    caches survive the rollback of the database changes carried out by a test.
+    """
+
+    def setUp(self):
+        super(ActionablesTestCase, self).setUp()
+        CachingManager.cache.clear()
+
+
+def create_identifier(uid=None, namespace_uri='http://example.com'):
+    namespace, _ = IdentifierNameSpace.objects.get_or_create(uri=namespace_uri)
+    if uid is None:
+        uid = 'object-%s' % next(_uid_counter)
+    return Identifier.objects.get_or_create(uid=uid, namespace=namespace)[0]
+
+
+def create_iobject(identifier=None, iobject_type='STIX_Package', iobject_family='stix.mitre.org',
+                   timestamp=None, create_timestamp=None, latest=True):
+    """
+    Create an InfoObject (by default, a new STIX package); if ``latest`` is set,
+    the object becomes the latest revision of its identifier.
+    """
+    family, _ = InfoObjectFamily.objects.get_or_create(name=iobject_family)
+    namespace, _ = DataTypeNameSpace.objects.get_or_create(uri='http://%s' % iobject_family)
+    type_obj, _ = InfoObjectType.objects.get_or_create(name=iobject_type,
+                                                       iobject_family=family,
+                                                       namespace=namespace)
+    revision, _ = Revision.objects.get_or_create(name='')
+
+    if identifier is None:
+        identifier = create_identifier()
+    if timestamp is None:
+        timestamp = timezone.now()
+
+    iobject = InfoObject.objects.create(identifier=identifier,
+                                        timestamp=timestamp,
+                                        create_timestamp=create_timestamp or timestamp,
+                                        iobject_type=type_obj,
+                                        iobject_type_revision=revision,
+                                        iobject_family=family,
+                                        iobject_family_revision=revision)
+    if latest:
+        identifier.latest = iobject
+        identifier.save()
+    return iobject
+
+
+def create_fact(term, value, attribute=''):
+    """
+    Create a fact with the given fact term and a single value; returns the
+    pair ``(fact, fact_value)``.
+    """
+    namespace, _ = DataTypeNameSpace.objects.get_or_create(uri='http://example.com/datatypes')
+    data_type, _ = FactDataType.objects.get_or_create(name='', namespace=namespace)
+    fact_term, _ = FactTerm.objects.get_or_create(term=term, attribute=attribute)
+    fact_value, _ = FactValue.objects.get_or_create(value=value, fact_data_type=data_type)
+
+    fact = Fact.objects.create(fact_term=fact_term)
+    fact.fact_values.add(fact_value)
+    return (fact, fact_value)
+
+
+def create_singleton_observable(value, type_name='IP', subtype_name='v4'):
+    type_obj, _ = SingletonObservableType.objects.get_or_create(name=type_name)
+    subtype_obj, _ = SingletonObservableSubtype.objects.get_or_create(name=subtype_name)
+    return SingletonObservable.objects.create(type=type_obj, subtype=subtype_obj, value=value)
+
+
+def create_source(observable, top_level_iobject=None, **kwargs):
+    """
+    Create a source yielding the given singleton observable; if a top-level
+    InfoObject is given, the source belongs to the import of that report.
+    """
+    if top_level_iobject is not None:
+        kwargs.setdefault('top_level_iobject', top_level_iobject)
+        kwargs.setdefault('top_level_iobject_identifier', top_level_iobject.identifier)
+    kwargs.setdefault('origin', Source.ORIGIN_UNKNOWN)
+    return Source.objects.create(content_type=ContentType.objects.get_for_model(SingletonObservable),
+                                 object_id=observable.pk,
+                                 **kwargs)
+
+
+class FakePostprocessor(object):
+    """
+    Stand-in for a Dingos postprocessor (see ``dingos.view_classes.POSTPROCESSOR_REGISTRY``)
+    that exports the results in ``results``; ``runs`` counts the exports.
+    """
+
+    results = []
+    runs = 0
+
+    def __init__(self, graph, query_mode, details_obj=None):
+        pass
+
+    def export(self, override_columns, format):
+        FakePostprocessor.runs += 1
+        return ('application/json', list(self.results))
+
+
+def miss_first_lookup(manager):
+    """
+    Patch the ``filter`` method of the given manager such that the first query yields
+    no objects. This simulates objects that are created concurrently between the
+    lookup of existing objects and the creation of the missing ones.
+    """
+    original_filter = manager.filter
+    calls = []
+
+    def filter(*args, **kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            return manager.none()
+        return original_filter(*args, **kwargs)
+
+    return patch.object(manager, 'filter', side_effect=filter)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for the bulk tagging of singleton observables in `django-mantis-actionables`.
+"""
+
+from mantis_actionables.models import ActionableTag, ActionableTaggingHistory, SingletonObservable, TaggedActionableItem
+
+from .helpers import ActionablesTestCase, create_singleton_observable
+
+
+class TestBulkAction(ActionablesTestCase):
+
+    def setUp(self):
+        super(TestBulkAction, self).setUp()
+        self.observables = [create_singleton_observable('127.0.0.1'),
+                            create_singleton_observable('127.0.0.2')]
+        self.pks = [observable.pk for observable in self.observables]
+
+    def bulk_action(self, action, context_name_pairs, pks=None, comment=''):
+        ActionableTag.bulk_action(action=action,
+                                  context_name_pairs=context_name_pairs,
+                                  thing_to_tag_pks=self.pks if pks is None else pks,
+                                  comment=comment,
+                                  supress_transfer_to_dingos=True)
+
+    def get_tag_names(self, pk):
+        return set(TaggedActionableItem.objects.filter(object_id=pk).values_list('tag__name', flat=True))
+
+    def get_history(self, action):
+        return sorted(ActionableTaggingHistory.objects.filter(action=action).values_list('object_id', 'tag__name', 'comment'))
+
+    def test_add_creates_links_and_history(self):
+        self.bulk_action('add', [('INVES-1', 'INVES-1'), ('INVES-1', 'phishing')], comment='added')
+
+        for pk in self.pks:
+            self.assertEqual(self.get_tag_names(pk), set(['INVES-1:INVES-1', 'INVES-1:phishing']))
+
+        self.assertEqual(self.get_history(ActionableTaggingHistory.ADD),
+                         sorted([(pk, name, 'added') for pk in self.pks
+                                 for name in ['INVES-1:INVES-1', 'INVES-1:phishing']]))
+
+    def test_add_writes_history_only_for_new_links(self):
+        self.bulk_action('add', [('INVES-1', 'INVES-1')], pks=self.pks[:1], comment='first')
+
+        self.bulk_action('add', [('INVES-1', 'INVES-1')], comment='second')
+
+        self.assertEqual(TaggedActionableItem.objects.count(), 2)
+        self.assertEqual(self.get_history(ActionableTaggingHistory.ADD),
+                         sorted([(self.pks[0], 'INVES-1:INVES-1', 'first'),
+                                 (self.pks[1], 'INVES-1:INVES-1', 'second')]))
+
+    def test_repeated_add_changes_nothing(self):
+        self.bulk_action('add', [('INVES-1', 'INVES-1')])
+
+        self.bulk_action('add', [('INVES-1', 'INVES-1')])
+
+        self.assertEqual(TaggedActionableItem.objects.count(), 2)
+        self.assertEqual(ActionableTaggingHistory.objects.count(), 2)
+
+    def test_add_with_string_pks_does_not_duplicate_links(self):
+        self.bulk_action('add', [('INVES-1', 'INVES-1')])
+
+        self.bulk_action('add', [('INVES-1', 'INVES-1')], pks=[str(pk) for pk in self.pks])
+
+        self.assertEqual(TaggedActionableItem.objects.count(), 2)
+        self.assertEqual(ActionableTaggingHistory.objects.count(), 2)
+
+    def test_actionable_tags_cache_is_updated(self):
+        self.bulk_action('add', [('INVES-1', 'INVES-1'), ('INVES-1', 'phishing')])
+
+        for pk in self.pks:
+            self.assertEqual(SingletonObservable.objects.get(pk=pk).actionable_tags_cache,
+                             'INVES-1:INVES-1,INVES-1:phishing')
+
+    def test_remove_deletes_links_and_writes_history(self):
+        self.bulk_action('add', [('INVES-1', 'INVES-1'), ('INVES-1', 'phishing'), ('INVES-2', 'INVES-2')])
+
+        self.bulk_action('remove', [('INVES-1', 'phishing')], pks=self.pks[:1], comment='removed')
+
+        self.assertEqual(self.get_tag_names(self.pks[0]), set(['INVES-1:INVES-1', 'INVES-2:INVES-2']))
+        self.assertEqual(self.get_tag_names(self.pks[1]), set(['INVES-1:INVES-1', 'INVES-1:phishing', 'INVES-2:INVES-2']))
+        self.assertEqual(self.get_history(ActionableTaggingHistory.REMOVE),
+                         [(self.pks[0], 'INVES-1:phishing', 'removed')])
+
+    def test_removing_context_tag_removes_whole_context(self):
+        self.bulk_action('add', [('INVES-1', 'INVES-1'), ('INVES-1', 'phishing'), ('INVES-2', 'INVES-2')])
+
+        self.bulk_action('remove', [('INVES-1', 'INVES-1')], comment='removed')
+
+        for pk in self.pks:
+            self.assertEqual(self.get_tag_names(pk), set(['INVES-2:INVES-2']))
+
+        self.assertEqual(self.get_history(ActionableTaggingHistory.REMOVE),
+                         sorted([(pk, name, 'removed') for pk in self.pks
+                                 for name in ['INVES-1:INVES-1', 'INVES-1:phishing']]))
+
+    def test_removing_missing_tag_writes_no_history(self):
+        self.bulk_action('add', [('INVES-1', 'INVES-1')], pks=self.pks[:1])
+
+        self.bulk_action('remove', [('INVES-1', 'phishing')])
+
+        self.assertEqual(TaggedActionableItem.objects.count(), 1)
+        self.assertEqual(self.get_history(ActionableTaggingHistory.REMOVE), [])
+
+
+class TestRefreshActionableTagsCache(ActionablesTestCase):
+
+    def setUp(self):
+        super(TestRefreshActionableTagsCache, self).setUp()
+        self.observables = [create_singleton_observable('127.0.0.1'),
+                            create_singleton_observable('127.0.0.2')]
+        self.pks = [observable.pk for observable in self.observables]
+        ActionableTag.bulk_action(action='add',
+                                  context_name_pairs=[('INVES-1', 'phishing'), ('INVES-1', 'INVES-1')],
+                                  thing_to_tag_pks=self.pks[:1],
+                                  supress_transfer_to_dingos=True)
+
+    def get_caches(self):
+        return dict(SingletonObservable.objects.filter(pk__in=self.pks).values_list('pk', 'actionable_tags_cache'))
+
+    def test_stale_caches_are_rebuilt(self):
+        SingletonObservable.objects.filter(pk__in=self.pks).update(actionable_tags_cache='stale')
+
+        SingletonObservable.refresh_actionable_tags_cache(map(str, self.pks))
+
+        self.assertEqual(self.get_caches(), {self.pks[0]: 'INVES-1:INVES-1,INVES-1:phishing',
+                                             self.pks[1]: ''})
+
+    def test_current_caches_are_not_written(self):
+        SingletonObservable.refresh_actionable_tags_cache(self.pks)
+
+        # Only the tag names and the current caches are read
+        with self.assertNumQueries(2):
+            SingletonObservable.refresh_actionable_tags_cache(self.pks)
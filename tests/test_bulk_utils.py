@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for `django-mantis-actionables` bulk_utils module.
+"""
+
+import unittest
+
+from mantis_actionables.bulk_utils import chunked, in_bulk_chunked, grouped_update
+
+
+class FakeQuerySet(object):
+    """
+    Records the calls made on it instead of querying the database.
+    """
+
+    def __init__(self):
+        self.in_bulk_calls = []
+        self.update_calls = []
+        self.filter_kwargs = None
+
+    def in_bulk(self, pks):
+        self.in_bulk_calls.append(list(pks))
+        return dict((pk, 'object %s' % pk) for pk in pks)
+
+    def filter(self, **kwargs):
+        queryset = FakeQuerySet()
+        queryset.update_calls = self.update_calls
+        queryset.filter_kwargs = kwargs
+        return queryset
+
+    def update(self, **kwargs):
+        self.update_calls.append((sorted(self.filter_kwargs['pk__in']), kwargs))
+        return len(self.filter_kwargs['pk__in'])
+
+
+class TestChunked(unittest.TestCase):
+
+    def test_splits_into_chunks_of_given_size(self):
+        self.assertEqual(list(chunked(range(7), size=3)),
+                         [[0, 1, 2], [3, 4, 5], [6]])
+
+    def test_exact_multiple_yields_no_empty_chunk(self):
+        self.assertEqual(list(chunked(range(6), size=3)),
+                         [[0, 1, 2], [3, 4, 5]])
+
+    def test_empty_iterable(self):
+        self.assertEqual(list(chunked([])), [])
+
+    def test_accepts_iterators(self):
+        self.assertEqual(list(chunked(iter('abcde'), size=2)),
+                         [['a', 'b'], ['c', 'd'], ['e']])
+
+
+class TestInBulkChunked(unittest.TestCase):
+
+    def test_queries_in_chunks_and_merges_results(self):
+        queryset = FakeQuerySet()
+        pks = range(1201)
+
+        result = in_bulk_chunked(queryset, pks + [5, 7])
+
+        self.assertEqual(sorted(result.keys()), pks)
+        self.assertEqual(map(len, queryset.in_bulk_calls), [500, 500, 201])
+
+
+class TestGroupedUpdate(unittest.TestCase):
+
+    def test_one_update_per_distinct_values(self):
+        queryset = FakeQuerySet()
+
+        grouped_update(queryset, {1: {'essence': 'a', 'entity_type_id': 3},
+                                  2: {'essence': 'b'},
+                                  3: {'entity_type_id': 3, 'essence': 'a'}})
+
+        self.assertEqual(sorted(queryset.update_calls),
+                         [([1, 3], {'essence': 'a', 'entity_type_id': 3}),
+                          ([2], {'essence': 'b'})])
+
+    def test_large_groups_are_updated_in_chunks(self):
+        queryset = FakeQuerySet()
+
+        grouped_update(queryset, dict((pk, {'active': False}) for pk in range(1001)))
+
+        self.assertEqual(sorted(map(lambda x: len(x[0]), queryset.update_calls)), [1, 500, 500])
+        self.assertEqual(sorted(sum(map(lambda x: x[0], queryset.update_calls), [])), range(1001))
+
+    def test_nothing_to_update(self):
+        queryset = FakeQuerySet()
+
+        grouped_update(queryset, {})
+
+        self.assertEqual(queryset.update_calls, [])
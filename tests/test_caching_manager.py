@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for the CachingManager in `django-mantis-actionables` models module.
+"""
+
+from mock import patch
+
+from mantis_actionables import tasks
+from mantis_actionables.models import CachingManager, Context, TagInfo
+
+from .helpers import ActionablesTestCase
+
+
+class TestCachingManager(ActionablesTestCase):
+
+    def test_prewarmed_cache_answers_queries(self):
+        tag_info = TagInfo.objects.create(name='OUTDATED')
+
+        CachingManager.prewarm()
+
+        with self.assertNumQueries(0):
+            (cached_tag_info, created) = TagInfo.cached_objects.get_or_create(name='OUTDATED')
+
+        self.assertEqual(cached_tag_info.pk, tag_info.pk)
+        self.assertFalse(created)
+
+    def test_created_object_is_written_to_cache(self):
+        (tag_info, created) = TagInfo.cached_objects.get_or_create(name='OUTDATED')
+
+        self.assertTrue(created)
+        self.assertEqual(CachingManager.cache.get('TagInfo')[('OUTDATED',)].pk, tag_info.pk)
+
+        with self.assertNumQueries(0):
+            TagInfo.cached_objects.get_or_create(name='OUTDATED')
+
+    def test_non_cachable_query_returns_result(self):
+        (context, created) = Context.cached_objects.get_or_create(name='INVES-1', type=Context.TYPE_INVESTIGATION)
+
+        self.assertTrue(created)
+        self.assertEqual(Context.cached_objects.get_or_create(name='INVES-1', type=Context.TYPE_INVESTIGATION),
+                         (context, False))
+
+    def test_failing_prewarm_does_not_stop_worker(self):
+        with patch.object(CachingManager, 'prewarm', side_effect=Exception):
+            tasks.prewarm_caches()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for the cache of exporter results in `django-mantis-actionables`.
+"""
+
+from mock import Mock, patch
+
+from mantis_actionables import mantis_import
+from mantis_actionables.models import ExportResultCache
+from mantis_actionables.mantis_import import LazyGraph, iter_export_results
+
+from .helpers import ActionablesTestCase, FakePostprocessor, create_iobject
+
+
+class TestExportResultCache(ActionablesTestCase):
+
+    def setUp(self):
+        super(TestExportResultCache, self).setUp()
+        self.report = create_iobject()
+        self.referenced_object = create_iobject(iobject_type='Indicator')
+        self.graph = Mock(**{'nodes.return_value': [self.report.pk, self.referenced_object.pk],
+                             'node': {self.report.pk: {'identifier_pk': self.report.identifier_id},
+                                      self.referenced_object.pk: {'identifier_pk': self.referenced_object.identifier_id}}})
+
+        FakePostprocessor.results = [{'actionable_type': 'IP',
+                                      'actionable_subtype': 'v4',
+                                      'actionable_info': '127.0.0.1',
+                                      '_fact_pk': 1,
+                                      '_value_pk': 1,
+                                      '_identifier_pk': self.referenced_object.identifier_id,
+                                      '_iobject_pk': self.referenced_object.pk}]
+        FakePostprocessor.runs = 0
+
+        patchers = [patch.object(mantis_import, 'MANTIS_ACTIONABLES_ACTIVE_EXPORTERS', ['fake']),
+                    patch.dict(mantis_import.POSTPROCESSOR_REGISTRY, {'fake': [FakePostprocessor]}),
+                    patch.object(mantis_import, 'follow_references', return_value=self.graph)]
+
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def export(self, graph=None):
+        return list(iter_export_results(self.report.pk, graph or LazyGraph(self.report.pk), {}))
+
+    def test_cached_results_are_used_without_running_exporter(self):
+        results = self.export()
+        cached_results = self.export()
+
+        self.assertEqual(cached_results, results)
+        self.assertEqual(FakePostprocessor.runs, 1)
+        # The graph is not generated for cached results
+        self.assertEqual(mantis_import.follow_references.call_count, 1)
+
+    def test_exporter_is_run_for_new_exporter_version(self):
+        self.export()
+
+        with patch.object(FakePostprocessor, 'version', '2', create=True):
+            self.export()
+
+        self.assertEqual(FakePostprocessor.runs, 2)
+        self.assertEqual(ExportResultCache.objects.filter(iobject=self.report).count(), 2)
+
+    def test_entry_is_current_until_referenced_object_is_revised(self):
+        self.export()
+        cache_entry = ExportResultCache.objects.get(iobject=self.report)
+
+        self.assertTrue(cache_entry.is_current())
+
+        create_iobject(identifier=self.referenced_object.identifier, iobject_type='Indicator')
+
+        self.assertFalse(cache_entry.is_current())
+
+    def test_exporter_is_run_again_after_revision(self):
+        self.export()
+        revision = create_iobject(identifier=self.referenced_object.identifier, iobject_type='Indicator')
+        self.graph.node[revision.pk] = {'identifier_pk': revision.identifier_id}
+        self.graph.nodes.return_value = [self.report.pk, revision.pk]
+
+        self.export()
+
+        self.assertEqual(FakePostprocessor.runs, 2)
+        # The outdated entry has been replaced
+        cache_entry = ExportResultCache.objects.get(iobject=self.report)
+        self.assertTrue(cache_entry.is_current())
+
+    def test_entry_without_graph_revisions_is_not_current(self):
+        self.export()
+        ExportResultCache.objects.update(graph_revisions=None)
+
+        self.assertFalse(ExportResultCache.objects.get(iobject=self.report).is_current())
+
+        self.export()
+
+        self.assertEqual(FakePostprocessor.runs, 2)
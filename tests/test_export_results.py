@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for the normalization of export results and the export payloads in `django-mantis-actionables` mantis_import module.
+"""
+
+import json
+import unittest
+
+from mock import Mock, patch
+
+from mantis_actionables import mantis_import, tasks
+from mantis_actionables.models import SingletonObservable, Source
+from mantis_actionables.mantis_import import normalize_export_result, make_export_payload, read_export_payload
+
+from .helpers import ActionablesTestCase, create_fact, create_iobject
+
+
+def make_fact(term, value, attribute=''):
+    return Mock(term=term, value=value, attribute=attribute)
+
+
+class TestNormalizeExportResult(unittest.TestCase):
+
+    def setUp(self):
+        self.result = {'actionable_type': 'IP',
+                       'actionable_subtype': 'v4',
+                       'actionable_info': '127.0.0.1',
+                       '_fact_pk': 1,
+                       '_value_pk': 2,
+                       '_identifier_pk': 3,
+                       '_iobject_pk': 4,
+                       '_io2fv': Mock(),
+                       '_relationship_info': [{'identifier_pk': 10,
+                                               'iobject_type': 'Campaign',
+                                               'facts': [make_fact('Names/Name', 'Bravo'),
+                                                         make_fact('Names/Name', 'Alpha'),
+                                                         make_fact('Names/Name', 'ignored', attribute='type')]},
+                                              {'identifier_pk': 11,
+                                               'iobject_type': 'Indicator'},
+                                              {'identifier_pk': 12,
+                                               'iobject_type': 'Indicator'}]}
+
+        # Cached essences are used without looking at the node (or the graph)
+        self.essence_cache = {11: None,
+                              12: json.dumps({'confidence': 'High'})}
+
+    def test_keeps_only_normalized_keys(self):
+        normalized = normalize_export_result(self.result, None, self.essence_cache)
+
+        self.assertEqual(sorted(normalized.keys()),
+                         ['_fact_pk', '_identifier_pk', '_iobject_pk', '_related_entities', '_value_pk',
+                          'actionable_info', 'actionable_subtype', 'actionable_type'])
+
+    def test_related_entities(self):
+        normalized = normalize_export_result(self.result, None, self.essence_cache)
+
+        self.assertEqual(normalized['_related_entities'],
+                         [[10, 'Campaign', json.dumps({'names': 'Alpha;Bravo'})],
+                          [12, 'Indicator', json.dumps({'confidence': 'High'})]])
+
+    def test_essences_are_memoized(self):
+        normalize_export_result(self.result, None, self.essence_cache)
+
+        self.assertEqual(self.essence_cache[10], json.dumps({'names': 'Alpha;Bravo'}))
+
+    def test_result_is_json_serializable(self):
+        normalized = normalize_export_result(self.result, None, self.essence_cache)
+
+        self.assertEqual(json.loads(json.dumps(normalized)), normalized)
+
+    def test_result_without_relationship_info(self):
+        del self.result['_relationship_info']
+
+        normalized = normalize_export_result(self.result, None, self.essence_cache)
+
+        self.assertEqual(normalized['_related_entities'], [])
+
+
+class TestExportPayload(unittest.TestCase):
+
+    def setUp(self):
+        self.graph = Mock()
+        self.raw_result = {'actionable_type': 'IP',
+                           'actionable_subtype': 'v4',
+                           'actionable_info': '127.0.0.1',
+                           '_fact_pk': 1,
+                           '_value_pk': 2,
+                           '_identifier_pk': 3,
+                           '_iobject_pk': 4,
+                           '_io2fv': Mock(),
+                           '_relationship_info': [{'identifier_pk': 10,
+                                                   'iobject_type': 'Campaign'}]}
+
+        patchers = [patch.object(mantis_import, 'follow_references', return_value=self.graph),
+                    patch.object(mantis_import, 'annotate_graph'),
+                    patch.object(mantis_import, 'extract_essence', return_value={'names': 'Alpha'})]
+
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_raw_result_is_normalized_with_generated_graph(self):
+        payload = make_export_payload(5, [self.raw_result])
+
+        mantis_import.follow_references.assert_called_once_with([5], skip_terms=[], direction='down')
+        mantis_import.annotate_graph.assert_called_once_with(self.graph)
+        mantis_import.extract_essence.assert_called_once_with(self.raw_result['_relationship_info'][0], self.graph)
+
+        # The payload is passed through the broker
+        results = read_export_payload(json.loads(json.dumps(payload)))
+
+        self.assertEqual(results, [normalize_export_result(self.raw_result, None, {10: json.dumps({'names': 'Alpha'})})])
+
+    def test_normalized_result_does_not_require_graph(self):
+        normalized = normalize_export_result(self.raw_result, None, {10: None})
+
+        payload = make_export_payload(5, [normalized])
+
+        self.assertFalse(mantis_import.follow_references.called)
+        self.assertEqual(read_export_payload(payload), [normalized])
+
+    def test_unsupported_payload_version(self):
+        payload = make_export_payload(5, [])
+        payload['payload_version'] += 1
+
+        self.assertRaises(ValueError, read_export_payload, payload)
+
+
+class TestAsyncExportToActionables(ActionablesTestCase):
+
+    def test_payload_is_imported(self):
+        report = create_iobject()
+        address_object = create_iobject(iobject_type='AddressObjectType')
+        (fact, fact_value) = create_fact('Properties/Address_Value', '127.0.0.1')
+        raw_result = {'actionable_type': 'IP',
+                      'actionable_subtype': 'v4',
+                      'actionable_info': '127.0.0.1',
+                      '_fact_pk': fact.pk,
+                      '_value_pk': fact_value.pk,
+                      '_identifier_pk': address_object.identifier_id,
+                      '_iobject_pk': address_object.pk,
+                      '_io2fv': Mock(),
+                      '_relationship_info': []}
+
+        with patch.object(mantis_import, 'follow_references') as follow_references, \
+                patch.object(mantis_import, 'annotate_graph'):
+            payload = make_export_payload(report.pk, [raw_result])
+            tasks.async_export_to_actionables(report.identifier_id, report.pk, json.loads(json.dumps(payload)))
+
+        observable = SingletonObservable.objects.get()
+        source = Source.objects.get()
+
+        self.assertEqual(observable.value, '127.0.0.1')
+        self.assertEqual(source.object_id, observable.pk)
+        self.assertEqual(source.iobject_fact_id, fact.pk)
+        self.assertEqual(source.top_level_iobject_id, report.pk)
+        # Only the raw result required the graph
+        self.assertEqual(follow_references.call_count, 1)
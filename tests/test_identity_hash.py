@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for the identity hash of singleton observables in `django-mantis-actionables`.
+"""
+
+import hashlib
+import importlib
+import unittest
+
+from django.apps import apps
+
+from mantis_actionables.models import SingletonObservable
+
+from .helpers import ActionablesTestCase, create_singleton_observable
+
+identity_hash_migration = importlib.import_module('mantis_actionables.migrations.0036_singletonobservable_identity_hash')
+
+
+class TestComputeIdentityHash(unittest.TestCase):
+
+    def test_ascii_value(self):
+        self.assertEqual(SingletonObservable.compute_identity_hash(1, 2, u'127.0.0.1'),
+                         hashlib.sha256('1:2:127.0.0.1').hexdigest())
+
+    def test_unicode_and_utf8_values_yield_same_hash(self):
+        self.assertEqual(SingletonObservable.compute_identity_hash(1, 2, u'b\xfccher.example.com'),
+                         SingletonObservable.compute_identity_hash(1, 2, 'b\xc3\xbccher.example.com'))
+
+    def test_migration_yields_same_hash_as_model(self):
+        for value in [u'127.0.0.1', u'b\xfccher.example.com', 'b\xc3\xbccher.example.com', u'例え.jp']:
+            self.assertEqual(identity_hash_migration.compute_identity_hash(1, 2, value),
+                             SingletonObservable.compute_identity_hash(1, 2, value))
+
+
+class TestIdentityHashLookup(ActionablesTestCase):
+
+    def test_non_ascii_observable_is_found_again(self):
+        (triple2pk_map, created_triples) = SingletonObservable.bulk_get_or_create([('FQDN', '', u'b\xfccher.example.com')])
+        observable = SingletonObservable.objects.get(pk=triple2pk_map[('FQDN', '', u'b\xfccher.example.com')])
+
+        self.assertEqual(observable.identity_hash,
+                         SingletonObservable.compute_identity_hash(observable.type_id, observable.subtype_id,
+                                                                   u'b\xfccher.example.com'))
+
+        (found_map, created_triples) = SingletonObservable.bulk_get_or_create([('FQDN', '', u'b\xfccher.example.com')])
+
+        self.assertEqual(found_map, triple2pk_map)
+        self.assertEqual(created_triples, set())
+
+    def test_migration_fills_hash_of_non_ascii_value(self):
+        observable = create_singleton_observable(u'b\xfccher.example.com', type_name='FQDN', subtype_name='')
+        SingletonObservable.objects.filter(pk=observable.pk).update(identity_hash=None)
+
+        identity_hash_migration.fill_identity_hash(apps, None)
+
+        self.assertEqual(SingletonObservable.objects.get(pk=observable.pk).identity_hash, observable.identity_hash)
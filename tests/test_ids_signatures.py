@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for the handling of IDS signatures in `django-mantis-actionables` models module.
+"""
+
+from mantis_actionables.models import IDSSignature, IDSSignatureRevision, SingletonObservable
+
+from .helpers import ActionablesTestCase, create_singleton_observable, miss_first_lookup
+
+RULE_1 = u'alert tcp any any -> 127.0.0.1 any (msg:"r\xe9gle 1"; sid:1;)'
+RULE_2 = u'alert tcp any any -> 127.0.0.1 any (msg:"r\xe9gle 2"; sid:2;)'
+
+
+class TestIDSSignatureLookup(ActionablesTestCase):
+
+    def test_save_sets_content_hash(self):
+        signature = IDSSignature.objects.create(content=RULE_1)
+
+        self.assertEqual(signature.content_hash, IDSSignature.compute_content_hash(RULE_1))
+        self.assertEqual(IDSSignature.get_or_create_by_content(RULE_1), (signature, False))
+
+    def test_bulk_get_or_create(self):
+        existing_signature = IDSSignature.objects.create(content=RULE_1)
+
+        content2pk_map = IDSSignature.bulk_get_or_create([RULE_1, RULE_2, RULE_2])
+
+        self.assertEqual(content2pk_map[RULE_1], existing_signature.pk)
+        self.assertEqual(IDSSignature.objects.get(pk=content2pk_map[RULE_2]).content, RULE_2)
+        self.assertEqual(IDSSignature.objects.count(), 2)
+
+    def test_bulk_get_or_create_concurrently_created_signatures(self):
+        existing_signature = IDSSignature.objects.create(content=RULE_1)
+
+        # The existing signature is not found by the lookup, so that its bulk creation fails
+        with miss_first_lookup(IDSSignature.objects):
+            content2pk_map = IDSSignature.bulk_get_or_create([RULE_1, RULE_2])
+
+        self.assertEqual(content2pk_map[RULE_1], existing_signature.pk)
+        self.assertEqual(IDSSignature.objects.count(), 2)
+
+
+class TestBulkAddIDSSignatures(ActionablesTestCase):
+
+    def setUp(self):
+        super(TestBulkAddIDSSignatures, self).setUp()
+        self.observables = [create_singleton_observable('127.0.0.%s' % x) for x in range(2)]
+
+    def test_signatures_are_assigned(self):
+        changed_map = SingletonObservable.bulk_add_ids_signatures({self.observables[0].pk: RULE_1,
+                                                                   self.observables[1].pk: RULE_1})
+
+        signature = IDSSignature.objects.get()
+
+        self.assertEqual(changed_map, {self.observables[0].pk: signature.pk,
+                                       self.observables[1].pk: signature.pk})
+        self.assertEqual(set(SingletonObservable.objects.values_list('ids_signature_id', flat=True)),
+                         set([signature.pk]))
+        self.assertEqual(set(IDSSignatureRevision.objects.values_list('singleton_id', 'ids_signature_id')),
+                         set([(self.observables[0].pk, signature.pk),
+                              (self.observables[1].pk, signature.pk)]))
+
+    def test_only_changed_signatures_are_written(self):
+        SingletonObservable.bulk_add_ids_signatures({self.observables[0].pk: RULE_1,
+                                                     self.observables[1].pk: RULE_1})
+
+        changed_map = SingletonObservable.bulk_add_ids_signatures({self.observables[0].pk: RULE_1,
+                                                                   self.observables[1].pk: RULE_2})
+
+        self.assertEqual(changed_map.keys(), [self.observables[1].pk])
+        self.assertEqual(IDSSignatureRevision.objects.count(), 3)
+        self.assertEqual(SingletonObservable.objects.get(pk=self.observables[1].pk).ids_signature.content, RULE_2)
+
+    def test_add_ids_signature_writes_revision_only_for_changes(self):
+        self.observables[0].add_ids_signature(RULE_1)
+        self.observables[0].add_ids_signature(RULE_1)
+
+        self.assertEqual(IDSSignatureRevision.objects.count(), 1)
+        self.assertEqual(SingletonObservable.objects.get(pk=self.observables[0].pk).ids_signature.content, RULE_1)
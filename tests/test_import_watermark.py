@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for the watermark-based incremental import of STIX reports in `django-mantis-actionables`.
+"""
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from mock import patch
+
+from mantis_actionables import mantis_import, tasks
+from mantis_actionables.models import ImportWatermark
+from mantis_actionables.mantis_import import process_STIX_Reports
+
+from .helpers import ActionablesTestCase, create_iobject
+
+
+class TestImportWatermark(ActionablesTestCase):
+
+    def setUp(self):
+        super(TestImportWatermark, self).setUp()
+        self.now = timezone.now()
+        self.imported_pks = []
+
+        patcher = patch.object(mantis_import, 'import_singleton_observables_from_STIX_iobjects',
+                               side_effect=self.fake_import)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def fake_import(self, top_level_iobjs, *args, **kwargs):
+        self.imported_pks.extend(map(lambda x: x.pk, top_level_iobjs))
+        return []
+
+    def create_report(self, age):
+        return create_iobject(timestamp=self.now - age)
+
+    def import_since_last(self):
+        self.imported_pks = []
+        process_STIX_Reports(since_last=True)
+        return self.imported_pks
+
+    def get_watermark(self):
+        return ImportWatermark.objects.get(report_family='stix.mitre.org', report_type='STIX_Package')
+
+    def test_reports_are_imported_in_order_of_creation(self):
+        later_report = self.create_report(timedelta(hours=1))
+        earlier_report = self.create_report(timedelta(days=3))
+
+        self.assertEqual(self.import_since_last(), [earlier_report.pk, later_report.pk])
+
+        watermark = self.get_watermark()
+        self.assertEqual(watermark.last_create_timestamp, later_report.create_timestamp)
+        self.assertEqual(watermark.last_iobject_pk, later_report.pk)
+
+    def test_reports_before_watermark_are_not_imported_again(self):
+        earlier_report = self.create_report(timedelta(days=3))
+        later_report = self.create_report(timedelta(hours=1))
+        self.import_since_last()
+
+        new_report = self.create_report(timedelta(minutes=1))
+
+        imported_pks = self.import_since_last()
+
+        self.assertNotIn(earlier_report.pk, imported_pks)
+        self.assertEqual(imported_pks[-1], new_report.pk)
+        self.assertEqual(self.get_watermark().last_iobject_pk, new_report.pk)
+
+    def test_late_reports_within_lookback_are_imported(self):
+        report = self.create_report(timedelta(hours=1))
+        self.import_since_last()
+
+        # Reports whose Dingos import commits late appear before the watermark
+        late_report = self.create_report(timedelta(hours=1, minutes=10))
+        too_late_report = self.create_report(timedelta(hours=3))
+
+        imported_pks = self.import_since_last()
+
+        self.assertIn(late_report.pk, imported_pks)
+        self.assertNotIn(too_late_report.pk, imported_pks)
+        # The watermark is not moved back
+        self.assertEqual(self.get_watermark().last_iobject_pk, report.pk)
+
+    def test_watermark_is_advanced_by_chord_callback(self):
+        reports = [self.create_report(timedelta(hours=2)), self.create_report(timedelta(hours=1))]
+
+        with patch.object(mantis_import, 'chord') as chord:
+            process_STIX_Reports(since_last=True, parallel=True)
+
+        callback = chord.return_value.call_args[0][0]
+        watermark = self.get_watermark()
+
+        self.assertEqual(callback.kwargs['watermark_updates'], [(watermark.pk, reports[1].pk)])
+        self.assertEqual(watermark.last_iobject_pk, 0)
+
+        with patch.object(mantis_import, 'post_process_imported_reports'):
+            tasks.async_post_process_import([report.pk for report in reports],
+                                            watermark_updates=callback.kwargs['watermark_updates'])
+
+        self.assertEqual(self.get_watermark().last_iobject_pk, reports[1].pk)
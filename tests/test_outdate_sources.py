@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for the treatment of outdated sources in `django-mantis-actionables` mantis_import module.
+"""
+
+from mock import patch
+
+from mantis_actionables import mantis_import
+from mantis_actionables.models import ActionableTag, Source, TaggedActionableItem
+from mantis_actionables.mantis_import import outdate_sources, post_process_import
+
+from .helpers import ActionablesTestCase, create_iobject, create_singleton_observable, create_source
+
+
+class TestOutdateSources(ActionablesTestCase):
+
+    def setUp(self):
+        super(TestOutdateSources, self).setUp()
+        self.observable = create_singleton_observable('127.0.0.1')
+
+        # The observable is only referenced by the first revision of the report
+        self.report_revision = create_iobject()
+        self.outdated_source = create_source(self.observable, self.report_revision)
+        self.latest_revision = create_iobject(identifier=self.report_revision.identifier)
+        self.current_source = create_source(create_singleton_observable('127.0.0.2'), self.latest_revision)
+
+        other_report_revision = create_iobject()
+        self.other_outdated_source = create_source(self.observable, other_report_revision)
+        create_iobject(identifier=other_report_revision.identifier)
+
+    def get_outdated_source_pks(self):
+        return set(Source.objects.filter(outdated=True).values_list('pk', flat=True))
+
+    def test_sources_of_given_report_are_outdated(self):
+        outdate_sources(simulate=False, top_level_iobject_identifier_pk=self.report_revision.identifier_id)
+
+        self.assertEqual(self.get_outdated_source_pks(), set([self.outdated_source.pk]))
+
+    def test_all_sources_are_outdated_without_report(self):
+        outdate_sources(simulate=False)
+
+        self.assertEqual(self.get_outdated_source_pks(), set([self.outdated_source.pk,
+                                                              self.other_outdated_source.pk]))
+
+    def test_simulation_does_not_mark_sources(self):
+        outdate_sources(simulate=True, top_level_iobject_identifier_pk=self.report_revision.identifier_id)
+
+        self.assertEqual(self.get_outdated_source_pks(), set())
+
+    def get_tag_names(self, observable):
+        return set(TaggedActionableItem.objects.filter(object_id=observable.pk).values_list('tag__name', flat=True))
+
+    def test_tags_only_due_to_outdated_source_are_marked(self):
+        self.report_revision.identifier.tags.add('INVES-1')
+        ActionableTag.bulk_action('add', [('INVES-1', 'INVES-1')], [self.observable.pk],
+                                  supress_transfer_to_dingos=True)
+
+        outdate_sources(simulate=False, top_level_iobject_identifier_pk=self.report_revision.identifier_id)
+
+        self.assertEqual(self.get_tag_names(self.observable), set(['INVES-1:INVES-1', 'INVES-1:OUTDATED']))
+
+    def test_tags_also_due_to_other_source_are_not_marked(self):
+        self.report_revision.identifier.tags.add('INVES-1')
+        self.other_outdated_source.top_level_iobject_identifier.tags.add('INVES-1')
+        ActionableTag.bulk_action('add', [('INVES-1', 'INVES-1')], [self.observable.pk],
+                                  supress_transfer_to_dingos=True)
+
+        outdate_sources(simulate=False, top_level_iobject_identifier_pk=self.report_revision.identifier_id)
+
+        self.assertEqual(self.get_tag_names(self.observable), set(['INVES-1:INVES-1']))
+
+    def test_import_marks_sources_only_if_configured(self):
+        post_process_import([self.report_revision.identifier_id], [])
+
+        self.assertEqual(self.get_outdated_source_pks(), set())
+
+        with patch.object(mantis_import, 'MANTIS_ACTIONABLES_MARK_OUTDATED_SOURCES', True):
+            post_process_import([self.report_revision.identifier_id], [])
+
+        self.assertEqual(self.get_outdated_source_pks(), set([self.outdated_source.pk]))
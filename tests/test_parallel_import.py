@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for the parallel import of STIX reports in `django-mantis-actionables` mantis_import module.
+"""
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from mock import patch
+
+from mantis_actionables import mantis_import
+from mantis_actionables.mantis_import import import_STIX_reports_parallel, post_process_imported_reports, \
+    process_STIX_Reports
+
+from .helpers import ActionablesTestCase, create_fact, create_iobject, create_singleton_observable, create_source
+
+
+class TestParallelImport(ActionablesTestCase):
+
+    def setUp(self):
+        super(TestParallelImport, self).setUp()
+        self.start_time = timezone.now() - timedelta(hours=1)
+        self.reports = [create_iobject(timestamp=self.start_time + timedelta(minutes=x)) for x in range(2)]
+
+        patcher = patch.object(mantis_import, 'chord')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_each_report_is_imported_by_task_of_its_own(self):
+        process_STIX_Reports(imported_since=self.start_time, parallel=True)
+
+        header = list(mantis_import.chord.call_args[0][0])
+        callback = mantis_import.chord.return_value.call_args[0][0]
+
+        self.assertEqual(sorted(signature.args for signature in header),
+                         sorted((report.pk,) for report in self.reports))
+        self.assertEqual(set(signature.task for signature in header), set(['mantis_actionables.tasks.async_import_STIX_report']))
+        self.assertEqual(callback.task, 'mantis_actionables.tasks.async_post_process_import')
+
+    def test_no_reports_are_dispatched_without_reports(self):
+        self.assertIsNone(import_STIX_reports_parallel([]))
+        self.assertFalse(mantis_import.chord.called)
+
+    def test_imported_reports_are_post_processed(self):
+        (fact, fact_value) = create_fact('Properties/Address_Value', '127.0.0.1')
+        create_source(create_singleton_observable('127.0.0.1'), self.reports[0], iobject_fact=fact)
+        create_source(create_singleton_observable('127.0.0.2'), self.reports[1])
+
+        with patch.object(mantis_import, 'post_process_import') as post_process_import:
+            post_process_imported_reports([report.pk for report in self.reports])
+
+        post_process_import.assert_called_once_with(set(report.identifier_id for report in self.reports),
+                                                    set([fact.pk]),
+                                                    user=None)
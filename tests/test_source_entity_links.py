@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for the synchronization of links between sources and STIX entities in
+`django-mantis-actionables` mantis_import module.
+"""
+
+from mantis_actionables.models import EntityType, Source, STIX_Entity
+from mantis_actionables.mantis_import import reconcile_source_entity_links
+
+from .helpers import ActionablesTestCase, create_identifier, create_iobject, create_singleton_observable, \
+    create_source
+
+
+class TestReconcileSourceEntityLinks(ActionablesTestCase):
+
+    def setUp(self):
+        super(TestReconcileSourceEntityLinks, self).setUp()
+        report = create_iobject()
+        self.sources = [create_source(create_singleton_observable('127.0.0.%s' % x), report) for x in range(2)]
+        entity_type = EntityType.objects.create(name='Campaign')
+        self.entities = [STIX_Entity.objects.create(iobject_identifier=create_identifier(),
+                                                    entity_type=entity_type) for x in range(3)]
+        self.through_model = Source.related_stix_entities.through
+
+    def get_links(self):
+        return dict(((source_pk, entity_pk), link_pk) for (link_pk, source_pk, entity_pk)
+                    in self.through_model.objects.values_list('id', 'source_id', 'stix_entity_id'))
+
+    def test_links_are_created(self):
+        reconcile_source_entity_links({self.sources[0].pk: set([self.entities[0].pk, self.entities[1].pk]),
+                                       self.sources[1].pk: set([self.entities[0].pk])})
+
+        self.assertEqual(set(self.get_links().keys()),
+                         set([(self.sources[0].pk, self.entities[0].pk),
+                              (self.sources[0].pk, self.entities[1].pk),
+                              (self.sources[1].pk, self.entities[0].pk)]))
+
+    def test_links_are_synchronized(self):
+        reconcile_source_entity_links({self.sources[0].pk: set([self.entities[0].pk, self.entities[1].pk]),
+                                       self.sources[1].pk: set([self.entities[0].pk])})
+        links = self.get_links()
+
+        reconcile_source_entity_links({self.sources[0].pk: set([self.entities[1].pk, self.entities[2].pk])})
+        synchronized_links = self.get_links()
+
+        self.assertEqual(set(synchronized_links.keys()),
+                         set([(self.sources[0].pk, self.entities[1].pk),
+                              (self.sources[0].pk, self.entities[2].pk),
+                              (self.sources[1].pk, self.entities[0].pk)]))
+        # Existing links are kept rather than recreated
+        self.assertEqual(synchronized_links[(self.sources[0].pk, self.entities[1].pk)],
+                         links[(self.sources[0].pk, self.entities[1].pk)])
+
+    def test_unchanged_links_are_not_written(self):
+        source_pk2entity_pks_map = {self.sources[0].pk: set([self.entities[0].pk])}
+        reconcile_source_entity_links(source_pk2entity_pks_map)
+
+        # Only the existing links are loaded
+        with self.assertNumQueries(1):
+            reconcile_source_entity_links(source_pk2entity_pks_map)
+
+    def test_links_of_source_without_entities_are_deleted(self):
+        reconcile_source_entity_links({self.sources[0].pk: set([self.entities[0].pk])})
+        reconcile_source_entity_links({self.sources[0].pk: set()})
+
+        self.assertEqual(self.get_links(), {})
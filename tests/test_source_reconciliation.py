@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for the reconciliation of source objects in `django-mantis-actionables` mantis_import module.
+"""
+
+from django.contrib.contenttypes.models import ContentType
+
+from mantis_actionables.models import SingletonObservable, Source
+from mantis_actionables.mantis_import import reconcile_sources
+
+from .helpers import ActionablesTestCase, create_iobject, create_singleton_observable
+
+
+class TestReconcileSources(ActionablesTestCase):
+
+    def setUp(self):
+        super(TestReconcileSources, self).setUp()
+        self.report = create_iobject()
+        self.indicator = create_iobject(iobject_type='Indicator')
+        self.observables = [create_singleton_observable('127.0.0.1'),
+                            create_singleton_observable('127.0.0.2')]
+
+    def make_key(self, observable, report=None):
+        report = report or self.report
+        return (self.indicator.identifier_id, None, None, report.identifier_id, None,
+                ContentType.objects.get_for_model(SingletonObservable).pk, observable.pk)
+
+    def make_values(self, tlp=Source.TLP_UNKOWN, report=None):
+        report = report or self.report
+        return {'iobject_id': self.indicator.pk,
+                'top_level_iobject_id': report.pk,
+                'processing': Source.PROCESSED_AUTOMATICALLY,
+                'origin': Source.ORIGIN_UNKNOWN,
+                'tlp': tlp}
+
+    def reconcile(self, key2values_map):
+        return reconcile_sources(self.report.identifier_id, key2values_map)
+
+    def test_missing_sources_are_created(self):
+        key2values_map = dict((self.make_key(observable), self.make_values()) for observable in self.observables)
+
+        key2source_map = self.reconcile(key2values_map)
+
+        self.assertEqual(set(key2source_map.keys()), set(key2values_map.keys()))
+        self.assertEqual(Source.objects.count(), 2)
+        for observable in self.observables:
+            source = key2source_map[self.make_key(observable)]
+            self.assertIsNotNone(source.pk)
+            self.assertEqual(source.object_id, observable.pk)
+            self.assertEqual(source.processing, Source.PROCESSED_AUTOMATICALLY)
+
+    def test_unchanged_sources_are_not_written(self):
+        key2values_map = dict((self.make_key(observable), self.make_values()) for observable in self.observables)
+        first_map = self.reconcile(key2values_map)
+
+        # Only the existing sources are loaded
+        with self.assertNumQueries(1):
+            second_map = self.reconcile(key2values_map)
+
+        self.assertEqual(dict((key, source.pk) for (key, source) in second_map.items()),
+                         dict((key, source.pk) for (key, source) in first_map.items()))
+
+    def test_changed_sources_are_updated(self):
+        key2values_map = dict((self.make_key(observable), self.make_values()) for observable in self.observables)
+        first_map = self.reconcile(key2values_map)
+
+        key2values_map[self.make_key(self.observables[0])] = self.make_values(tlp=Source.TLP_RED)
+        second_map = self.reconcile(key2values_map)
+
+        changed_source = Source.objects.get(pk=first_map[self.make_key(self.observables[0])].pk)
+        unchanged_source = Source.objects.get(pk=first_map[self.make_key(self.observables[1])].pk)
+
+        self.assertEqual(changed_source.tlp, Source.TLP_RED)
+        self.assertEqual(second_map[self.make_key(self.observables[0])].tlp, Source.TLP_RED)
+        self.assertEqual(unchanged_source.tlp, Source.TLP_UNKOWN)
+        self.assertEqual(Source.objects.count(), 2)
+
+    def test_sources_of_other_reports_are_left_alone(self):
+        other_report = create_iobject()
+        other_map = reconcile_sources(other_report.identifier_id,
+                                      {self.make_key(self.observables[0], report=other_report):
+                                           self.make_values(tlp=Source.TLP_GREEN, report=other_report)})
+
+        key2source_map = self.reconcile({self.make_key(self.observables[0]): self.make_values(tlp=Source.TLP_RED)})
+
+        other_source = Source.objects.get(pk=other_map.values()[0].pk)
+
+        self.assertNotEqual(key2source_map.values()[0].pk, other_source.pk)
+        self.assertEqual(other_source.tlp, Source.TLP_GREEN)
+        self.assertEqual(other_source.top_level_iobject_id, other_report.pk)
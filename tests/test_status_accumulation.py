@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for the accumulation of status updates in `django-mantis-actionables` status_management module.
+"""
+
+import json
+
+from django.contrib.contenttypes.models import ContentType
+
+from mock import Mock
+
+from mantis_actionables.models import EntityType, SingletonObservable, Source, Status, Status2X, STIX_Entity
+from mantis_actionables.status_management import StatusUpdateAccumulator, updateStatus
+
+from .helpers import ActionablesTestCase, create_identifier, create_iobject, create_singleton_observable, \
+    create_source
+
+
+class TestStatusUpdateAccumulator(ActionablesTestCase):
+
+    def setUp(self):
+        super(TestStatusUpdateAccumulator, self).setUp()
+        self.report = create_iobject()
+        self.observables = [create_singleton_observable('127.0.0.%s' % x) for x in range(2)]
+        self.accumulator = StatusUpdateAccumulator()
+        self.update_function = Mock(wraps=updateStatus)
+
+    def get_status2x_objects(self, observable):
+        return Status2X.objects.filter(content_type=ContentType.objects.get_for_model(SingletonObservable),
+                                       object_id=observable.pk)
+
+    def test_status_is_updated_once_per_observable(self):
+        self.accumulator.add(self.observables[0], create_source(self.observables[0], self.report, tlp=Source.TLP_RED))
+        self.accumulator.add(self.observables[0], create_source(self.observables[0], create_iobject(), tlp=Source.TLP_GREEN))
+        self.accumulator.add(self.observables[1], create_source(self.observables[1], self.report, tlp=Source.TLP_AMBER))
+
+        self.assertEqual(len(self.accumulator), 2)
+
+        self.accumulator.flush(update_function=self.update_function)
+
+        self.assertEqual(self.update_function.call_count, 2)
+        self.assertEqual(len(self.accumulator), 0)
+
+        status2x_objects = self.get_status2x_objects(self.observables[0])
+        self.assertEqual(len(status2x_objects), 1)
+        self.assertEqual(status2x_objects[0].status.most_permissive_tlp, Status.TLP_GREEN)
+        self.assertEqual(status2x_objects[0].status.most_restrictive_tlp, Status.TLP_RED)
+
+        self.assertEqual(self.get_status2x_objects(self.observables[1])[0].status.most_permissive_tlp, Status.TLP_AMBER)
+
+    def test_related_entities_are_taken_into_account(self):
+        indicator = STIX_Entity.objects.create(iobject_identifier=create_identifier(),
+                                               entity_type=EntityType.objects.create(name='Indicator'),
+                                               essence=json.dumps({'kill_chain_phases': 'Delivery',
+                                                                   'confidence': 'High'}))
+
+        self.accumulator.add(self.observables[0], create_source(self.observables[0], self.report))
+        self.accumulator.add(self.observables[0], related_entities=[indicator])
+        self.accumulator.flush(update_function=self.update_function)
+
+        status = self.get_status2x_objects(self.observables[0]).get(active=True).status
+
+        self.assertEqual(status.kill_chain_phases, 'Delivery')
+        self.assertEqual(status.max_confidence, Status.CONFIDENCE_HIGH)
+
+    def test_single_source_is_passed_as_source_obj(self):
+        single_source = create_source(self.observables[0], self.report)
+        self.accumulator.add(self.observables[0], single_source)
+        self.accumulator.add(self.observables[1], create_source(self.observables[1], self.report))
+        self.accumulator.add(self.observables[1], create_source(self.observables[1], create_iobject()))
+
+        self.accumulator.flush(update_function=self.update_function)
+
+        kwargs_map = dict((len(call_kwargs['source_objs']), call_kwargs)
+                          for (call_args, call_kwargs) in self.update_function.call_args_list)
+
+        self.assertEqual(kwargs_map[1]['source_obj'], single_source)
+        self.assertNotIn('source_obj', kwargs_map[2])
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for the interning of status objects in `django-mantis-actionables`.
+"""
+
+import unittest
+
+from datetime import datetime
+
+from django.db import transaction
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from mock import patch
+
+from mantis_actionables.models import Status
+from mantis_actionables import status_management
+
+
+class TestStatusNormalization(unittest.TestCase):
+
+    def test_missing_fields_receive_defaults(self):
+        normalized = Status.normalize_values({})
+
+        self.assertEqual(len(normalized), len(Status.INTERNED_FIELDS))
+        self.assertEqual(normalized, Status.normalize_values({'tags': None,
+                                                              'kill_chain_phases': ''}))
+
+    def test_kill_chain_phases_are_sorted_and_deduplicated(self):
+        normalized = Status.normalize_values({'kill_chain_phases': 'Delivery;;Actions;Delivery'})
+
+        self.assertEqual(normalized[Status.INTERNED_FIELDS.index('kill_chain_phases')], 'Actions;Delivery')
+        self.assertEqual(normalized, Status.normalize_values({'kill_chain_phases': ['Actions', 'Delivery']}))
+
+    def test_hash_distinguishes_values(self):
+        self.assertEqual(Status.compute_status_hash(Status.normalize_values({'priority': 1})),
+                         Status.compute_status_hash(Status.normalize_values({'priority': 1})))
+        self.assertNotEqual(Status.compute_status_hash(Status.normalize_values({'priority': 1})),
+                            Status.compute_status_hash(Status.normalize_values({'priority': 2})))
+
+    def test_hash_ignores_time_zone_of_timestamps(self):
+        utc_time = datetime(2015, 6, 1, 12, 0, tzinfo=timezone.utc)
+        local_time = utc_time.astimezone(timezone.get_fixed_timezone(120))
+
+        self.assertEqual(Status.compute_status_hash(Status.normalize_values({'active_from': utc_time})),
+                         Status.compute_status_hash(Status.normalize_values({'active_from': local_time})))
+
+    def test_save_sets_status_hash(self):
+        status = Status(kill_chain_phases='Delivery;Actions', priority=1)
+
+        with patch('django.db.models.Model.save'):
+            status.save()
+
+        self.assertEqual(status.kill_chain_phases, 'Actions;Delivery')
+        self.assertEqual(status.status_hash,
+                         Status.compute_status_hash(Status.normalize_values({'kill_chain_phases': 'Actions;Delivery',
+                                                                             'priority': 1})))
+
+
+class TestInternStatus(TransactionTestCase):
+
+    def setUp(self):
+        patchers = [patch.object(status_management, 'MANTIS_ACTIONABLES_STATUS_INTERN_CACHE_SIZE', 2),
+                    patch.dict(status_management._status_intern_cache, clear=True)]
+
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        status_management._uncommitted_status_pks.clear()
+
+    def intern(self, priority):
+        return status_management.intern_status({'priority': priority})
+
+    def test_cache_hit_does_not_query(self):
+        (status, created) = self.intern(1)
+
+        with self.assertNumQueries(0):
+            (cached_status, cached_created) = self.intern(1)
+
+        self.assertTrue(created)
+        self.assertFalse(cached_created)
+        self.assertEqual(cached_status.pk, status.pk)
+        self.assertEqual(cached_status.status_hash, status.status_hash)
+        self.assertEqual(cached_status.priority, 1)
+
+    def test_least_recently_used_status_is_evicted(self):
+        self.intern(1)
+        self.intern(2)
+        # Using status 1 again makes status 2 the least recently used one
+        self.intern(1)
+        self.intern(3)
+
+        self.assertEqual(len(status_management._status_intern_cache), 2)
+
+        with self.assertNumQueries(0):
+            self.intern(1)
+
+        with self.assertNumQueries(1):
+            self.intern(2)
+
+    def test_status_of_rolled_back_transaction_is_not_cached(self):
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                (status, created) = self.intern(1)
+                # The status is looked up again before the transaction ends
+                (found_status, found_created) = self.intern(1)
+                raise ValueError
+
+        self.assertTrue(created)
+        self.assertFalse(found_created)
+        self.assertEqual(found_status.pk, status.pk)
+        self.assertEqual(len(status_management._status_intern_cache), 0)
+
+        (status, created) = self.intern(1)
+
+        self.assertTrue(created)
+        self.assertTrue(Status.objects.filter(pk=status.pk).exists())
+
+    def test_status_of_committed_transaction_is_cached(self):
+        with transaction.atomic():
+            (status, created) = self.intern(1)
+            self.intern(1)
+
+        self.assertEqual(len(status_management._status_intern_cache), 0)
+
+        self.intern(1)
+
+        with self.assertNumQueries(0):
+            (cached_status, cached_created) = self.intern(1)
+
+        self.assertEqual(cached_status.pk, status.pk)
+
+    def test_existing_status_is_cached_within_transaction(self):
+        (status, created) = self.intern(1)
+        status_management._status_intern_cache.clear()
+
+        with transaction.atomic():
+            self.intern(1)
+
+            with self.assertNumQueries(0):
+                (cached_status, cached_created) = self.intern(1)
+
+        self.assertEqual(cached_status.pk, status.pk)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for the reconciliation of STIX entities in `django-mantis-actionables` mantis_import module.
+"""
+
+import json
+
+from mantis_actionables.models import STIX_Entity
+from mantis_actionables.mantis_import import reconcile_stix_entities
+
+from .helpers import ActionablesTestCase, create_identifier, miss_first_lookup
+
+
+class TestReconcileSTIXEntities(ActionablesTestCase):
+
+    def setUp(self):
+        super(TestReconcileSTIXEntities, self).setUp()
+        self.campaign = create_identifier()
+        self.indicator = create_identifier()
+        self.entity_info_map = {self.campaign.pk: ('Campaign', json.dumps({'names': 'Alpha'})),
+                                self.indicator.pk: ('Indicator', json.dumps({'confidence': 'High'}))}
+
+    def test_missing_entities_are_created(self):
+        entity_map = reconcile_stix_entities(self.entity_info_map)
+
+        self.assertEqual(set(entity_map.keys()), set([self.campaign.pk, self.indicator.pk]))
+        self.assertEqual(STIX_Entity.objects.count(), 2)
+        self.assertEqual(entity_map[self.campaign.pk].entity_type.name, 'Campaign')
+        self.assertEqual(entity_map[self.campaign.pk].essence, json.dumps({'names': 'Alpha'}))
+
+    def test_unchanged_entities_are_not_written(self):
+        first_map = reconcile_stix_entities(self.entity_info_map)
+
+        # Only the existing entities are loaded
+        with self.assertNumQueries(1):
+            second_map = reconcile_stix_entities(self.entity_info_map)
+
+        self.assertEqual(dict((pk, entity.pk) for (pk, entity) in second_map.items()),
+                         dict((pk, entity.pk) for (pk, entity) in first_map.items()))
+
+    def test_changed_entities_are_updated(self):
+        first_map = reconcile_stix_entities(self.entity_info_map)
+
+        self.entity_info_map[self.campaign.pk] = ('Campaign', json.dumps({'names': 'Alpha;Bravo'}))
+        reconcile_stix_entities(self.entity_info_map)
+
+        self.assertEqual(STIX_Entity.objects.get(pk=first_map[self.campaign.pk].pk).essence,
+                         json.dumps({'names': 'Alpha;Bravo'}))
+        self.assertEqual(STIX_Entity.objects.count(), 2)
+
+    def test_concurrently_created_entities(self):
+        first_map = reconcile_stix_entities({self.campaign.pk: ('Campaign', json.dumps({'names': 'Alpha'}))})
+
+        self.entity_info_map[self.campaign.pk] = ('Campaign', json.dumps({'names': 'Alpha;Bravo'}))
+
+        # The campaign entity is not found by the lookup, so that its bulk creation fails
+        with miss_first_lookup(STIX_Entity.objects):
+            entity_map = reconcile_stix_entities(self.entity_info_map)
+
+        self.assertEqual(STIX_Entity.objects.count(), 2)
+        self.assertEqual(entity_map[self.campaign.pk].pk, first_map[self.campaign.pk].pk)
+        self.assertEqual(entity_map[self.campaign.pk].essence, json.dumps({'names': 'Alpha;Bravo'}))
+        self.assertEqual(entity_map[self.indicator.pk].entity_type.name, 'Indicator')
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for the chunked import of exporter results in `django-mantis-actionables` mantis_import module.
+"""
+
+from django.contrib.contenttypes.models import ContentType
+
+from mock import Mock, patch
+
+from mantis_actionables import mantis_import
+from mantis_actionables.models import ExportResultCache, SingletonObservable, Source, Status2X
+from mantis_actionables.mantis_import import import_singleton_observables_from_STIX_iobjects, iter_export_results
+
+from .helpers import ActionablesTestCase, FakePostprocessor, create_fact, create_iobject
+
+
+class TestChunkedImport(ActionablesTestCase):
+
+    def setUp(self):
+        super(TestChunkedImport, self).setUp()
+        self.report = create_iobject()
+        self.address_object = create_iobject(iobject_type='AddressObjectType')
+
+        # Five results for three singleton observables
+        self.results = []
+        for value in ['127.0.0.1', '127.0.0.2', '127.0.0.3', '127.0.0.1', '127.0.0.2']:
+            (fact, fact_value) = create_fact('Properties/Address_Value', value)
+            self.results.append({'actionable_type': 'IP',
+                                 'actionable_subtype': 'v4',
+                                 'actionable_info': value,
+                                 '_fact_pk': fact.pk,
+                                 '_value_pk': fact_value.pk,
+                                 '_identifier_pk': self.address_object.identifier_id,
+                                 '_iobject_pk': self.address_object.pk,
+                                 '_related_entities': []})
+
+        patchers = [patch.object(mantis_import, 'iter_export_results', return_value=iter(self.results)),
+                    patch.object(mantis_import, 'import_singleton_observables_from_export_result',
+                                 Mock(wraps=mantis_import.import_singleton_observables_from_export_result))]
+
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_results_are_imported_in_chunks(self):
+        import_infos = import_singleton_observables_from_STIX_iobjects([self.report], chunk_size=2, post_process=False)
+
+        chunks = map(lambda x: x[0][2], mantis_import.import_singleton_observables_from_export_result.call_args_list)
+
+        self.assertEqual(map(len, chunks), [2, 2, 1])
+        self.assertEqual(import_infos[0]['top_level_iobj_identifier_pk'], self.report.identifier_id)
+        self.assertEqual(sorted(import_infos[0]['fact_pks']), sorted(map(lambda x: x['_fact_pk'], self.results)))
+
+        self.assertEqual(SingletonObservable.objects.count(), 3)
+        self.assertEqual(Source.objects.filter(top_level_iobject=self.report).count(), 5)
+
+    def test_status_is_updated_once_per_observable(self):
+        import_singleton_observables_from_STIX_iobjects([self.report], chunk_size=2, post_process=False)
+
+        content_type = ContentType.objects.get_for_model(SingletonObservable)
+        for observable in SingletonObservable.objects.all():
+            self.assertEqual(Status2X.objects.filter(content_type=content_type, object_id=observable.pk).count(), 1)
+
+
+class TestIterExportResults(ActionablesTestCase):
+
+    def setUp(self):
+        super(TestIterExportResults, self).setUp()
+        self.report = create_iobject()
+        self.graph = Mock(**{'nodes.return_value': [self.report.pk],
+                             'node': {self.report.pk: {'identifier_pk': self.report.identifier_id}}})
+
+        FakePostprocessor.results = [{'actionable_type': 'IP',
+                                      'actionable_subtype': 'v4',
+                                      'actionable_info': '127.0.0.%s' % x,
+                                      '_fact_pk': x,
+                                      '_value_pk': x,
+                                      '_identifier_pk': 1,
+                                      '_iobject_pk': 1} for x in range(3)]
+
+        patchers = [patch.object(mantis_import, 'MANTIS_ACTIONABLES_ACTIVE_EXPORTERS', ['fake']),
+                    patch.dict(mantis_import.POSTPROCESSOR_REGISTRY, {'fake': [FakePostprocessor]})]
+
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_results_are_cached(self):
+        results = list(iter_export_results(self.report.pk, self.graph, {}))
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(ExportResultCache.objects.get(iobject=self.report).get_results(), results)
+
+    def test_too_many_results_are_not_cached(self):
+        with patch.object(mantis_import, 'MANTIS_ACTIONABLES_EXPORT_CACHE_MAX_RESULTS', 2):
+            results = list(iter_export_results(self.report.pk, self.graph, {}))
+
+        self.assertEqual(len(results), 3)
+        self.assertFalse(ExportResultCache.objects.exists())
+
+    def test_results_are_not_cached_without_cache(self):
+        results = list(iter_export_results(self.report.pk, self.graph, {}, use_cache=False))
+
+        self.assertEqual(len(results), 3)
+        self.assertFalse(ExportResultCache.objects.exists())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for the resolution of Dingos tag history entries in `django-mantis-actionables` mantis_import module.
+"""
+
+import unittest
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from dingos.models import TaggingHistory
+
+from mantis_actionables.mantis_import import DingosTagHistoryResolver
+
+ADD = TaggingHistory.ADD
+REMOVE = TaggingHistory.REMOVE
+
+
+def make_resolver(user, entry_map, user_map):
+    """
+    Create a resolver from the given history entries without querying the database.
+    """
+    resolver = DingosTagHistoryResolver.__new__(DingosTagHistoryResolver)
+    resolver.user = user
+    resolver.entry_map = entry_map
+    resolver.user_map = user_map
+    return resolver
+
+
+class TestDingosTagHistoryResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.user = object()
+        self.other_user = object()
+        now = timezone.now()
+        self.recent = now
+        self.old = now - timedelta(days=1)
+        self.older = now - timedelta(days=2)
+
+    def test_no_matching_entry(self):
+        resolver = make_resolver(None, {(ADD, 'tag', 1): (self.old, 5, 7, 'comment')}, {7: self.other_user})
+
+        self.assertEqual(resolver.resolve(ADD, 'other tag', [1]), (None, ''))
+        self.assertEqual(resolver.resolve(REMOVE, 'tag', [1]), (None, ''))
+        self.assertEqual(resolver.resolve(ADD, 'tag', [2]), (None, ''))
+
+    def test_most_recent_entry_over_all_facts_is_used(self):
+        resolver = make_resolver(None,
+                                 {(ADD, 'tag', 1): (self.older, 5, 7, 'older comment'),
+                                  (ADD, 'tag', 2): (self.old, 6, 8, 'newer comment'),
+                                  (REMOVE, 'tag', 3): (self.recent, 9, 7, 'removal')},
+                                 {7: self.user, 8: self.other_user})
+
+        self.assertEqual(resolver.resolve(ADD, 'tag', [1, 2, 3]),
+                         (self.other_user, 'newer comment (Comment and user derived automatically from DINGOS tag)'))
+
+    def test_recent_entry_of_current_user(self):
+        resolver = make_resolver(self.user, {(ADD, 'tag', 1): (self.recent, 5, 7, 'comment')}, {7: self.user})
+
+        self.assertEqual(resolver.resolve(ADD, 'tag', [1]), (self.user, 'comment'))
+
+    def test_entry_of_other_user_without_comment(self):
+        resolver = make_resolver(self.user, {(ADD, 'tag', 1): (self.old, 5, 7, '')}, {7: self.other_user})
+
+        self.assertEqual(resolver.resolve(ADD, 'tag', [1]),
+                         (self.other_user, '(User derived automatically from DINGOS tag history)'))
+
+    def test_entry_without_user(self):
+        resolver = make_resolver(self.user, {(ADD, 'tag', 1): (self.old, 5, None, '')}, {})
+
+        self.assertEqual(resolver.resolve(ADD, 'tag', [1]), (self.user, ''))
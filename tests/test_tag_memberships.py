@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for the tag memberships of singleton observables in `django-mantis-actionables`.
+"""
+
+import importlib
+
+from django.apps import apps
+
+from mantis_actionables.models import ActionableTag, SingletonObservable, SingletonObservableTagMembership
+
+from .helpers import ActionablesTestCase, create_singleton_observable, miss_first_lookup
+
+tag_membership_migration = importlib.import_module('mantis_actionables.migrations.0038_singletonobservabletagmembership')
+search_name_migration = importlib.import_module('mantis_actionables.migrations.0042_singletonobservabletagmembership_search_name')
+
+KIND_ACTIONABLE_TAG = SingletonObservableTagMembership.KIND_ACTIONABLE_TAG
+KIND_TAG_INFO = SingletonObservableTagMembership.KIND_TAG_INFO
+KIND_DINGOS_TAG = SingletonObservableTagMembership.KIND_DINGOS_TAG
+
+
+class TagMembershipTestCase(ActionablesTestCase):
+
+    def setUp(self):
+        super(TagMembershipTestCase, self).setUp()
+        self.observables = [create_singleton_observable('127.0.0.1'),
+                            create_singleton_observable('127.0.0.2')]
+        self.pks = [observable.pk for observable in self.observables]
+
+    def get_memberships(self, kind=None):
+        memberships = SingletonObservableTagMembership.objects.all()
+        if kind is not None:
+            memberships = memberships.filter(kind=kind)
+        return set(memberships.values_list('observable_id', 'kind', 'tag_name'))
+
+
+class TestSync(TagMembershipTestCase):
+
+    def test_memberships_are_added_and_removed(self):
+        SingletonObservableTagMembership.sync(KIND_DINGOS_TAG, {self.pks[0]: set(['INVES-1', 'phishing']),
+                                                                self.pks[1]: set(['INVES-1'])})
+
+        SingletonObservableTagMembership.sync(KIND_DINGOS_TAG, {self.pks[0]: set(['phishing', 'malware']),
+                                                                self.pks[1]: set([])})
+
+        self.assertEqual(self.get_memberships(), set([(self.pks[0], KIND_DINGOS_TAG, 'phishing'),
+                                                      (self.pks[0], KIND_DINGOS_TAG, 'malware')]))
+
+    def test_other_kinds_and_observables_are_left_alone(self):
+        SingletonObservableTagMembership.sync(KIND_TAG_INFO, {self.pks[0]: set(['phishing'])})
+        SingletonObservableTagMembership.sync(KIND_DINGOS_TAG, {self.pks[1]: set(['phishing'])})
+
+        SingletonObservableTagMembership.sync(KIND_DINGOS_TAG, {self.pks[0]: set([])})
+
+        self.assertEqual(self.get_memberships(), set([(self.pks[0], KIND_TAG_INFO, 'phishing'),
+                                                      (self.pks[1], KIND_DINGOS_TAG, 'phishing')]))
+
+    def test_concurrently_created_memberships(self):
+        SingletonObservableTagMembership.sync(KIND_DINGOS_TAG, {self.pks[0]: set(['INVES-1'])})
+
+        # The existing membership is not found by the lookup, so that its bulk creation fails
+        with miss_first_lookup(SingletonObservableTagMembership.objects):
+            SingletonObservableTagMembership.sync(KIND_DINGOS_TAG, {self.pks[0]: set(['INVES-1', 'phishing'])})
+
+        self.assertEqual(self.get_memberships(), set([(self.pks[0], KIND_DINGOS_TAG, 'INVES-1'),
+                                                      (self.pks[0], KIND_DINGOS_TAG, 'phishing')]))
+
+
+class TestMembershipMaintenance(TagMembershipTestCase):
+
+    def test_actionable_tags_are_tracked(self):
+        ActionableTag.bulk_action(action='add',
+                                  context_name_pairs=[('INVES-1', 'INVES-1'), ('INVES-1', 'phishing')],
+                                  thing_to_tag_pks=self.pks[:1],
+                                  supress_transfer_to_dingos=True)
+
+        self.assertEqual(self.get_memberships(), set([(self.pks[0], KIND_ACTIONABLE_TAG, 'INVES-1:INVES-1'),
+                                                      (self.pks[0], KIND_ACTIONABLE_TAG, 'INVES-1:phishing'),
+                                                      (self.pks[0], KIND_TAG_INFO, 'INVES-1'),
+                                                      (self.pks[0], KIND_TAG_INFO, 'phishing')]))
+
+        ActionableTag.bulk_action(action='remove',
+                                  context_name_pairs=[('INVES-1', 'INVES-1')],
+                                  thing_to_tag_pks=self.pks[:1],
+                                  supress_transfer_to_dingos=True)
+
+        self.assertEqual(self.get_memberships(), set())
+
+    def test_dingos_tags_are_tracked(self):
+        SingletonObservable.update_mantis_tags({self.pks[0]: 'INVES-1,phishing',
+                                                self.pks[1]: ''})
+
+        self.assertEqual(dict(SingletonObservable.objects.filter(pk__in=self.pks).values_list('pk', 'mantis_tags')),
+                         {self.pks[0]: 'INVES-1,phishing',
+                          self.pks[1]: ''})
+        self.assertEqual(self.get_memberships(), set([(self.pks[0], KIND_DINGOS_TAG, 'INVES-1'),
+                                                      (self.pks[0], KIND_DINGOS_TAG, 'phishing')]))
+
+
+class TestObservableQuery(TagMembershipTestCase):
+
+    def test_observables_are_selected_by_tag_prefix(self):
+        SingletonObservableTagMembership.sync(KIND_TAG_INFO, {self.pks[0]: set(['phishing'])})
+        SingletonObservableTagMembership.sync(KIND_DINGOS_TAG, {self.pks[1]: set(['phishing'])})
+
+        query = SingletonObservableTagMembership.observable_query([KIND_TAG_INFO], 'phish')
+
+        self.assertEqual(list(SingletonObservable.objects.filter(query).values_list('pk', flat=True)),
+                         [self.pks[0]])
+
+    def test_observables_are_selected_ignoring_case(self):
+        SingletonObservableTagMembership.sync(KIND_DINGOS_TAG, {self.pks[0]: set(['INVES-1'])})
+
+        query = SingletonObservableTagMembership.observable_query([KIND_DINGOS_TAG], 'inves')
+
+        self.assertEqual(list(SingletonObservable.objects.filter(query).values_list('pk', flat=True)),
+                         [self.pks[0]])
+
+
+class TestFillTagMemberships(TagMembershipTestCase):
+
+    def test_memberships_are_filled_from_caches(self):
+        ActionableTag.bulk_action(action='add',
+                                  context_name_pairs=[('INVES-1', 'phishing')],
+                                  thing_to_tag_pks=self.pks[:1],
+                                  supress_transfer_to_dingos=True)
+        SingletonObservable.objects.filter(pk=self.pks[1]).update(mantis_tags='INVES-1,malware')
+        SingletonObservableTagMembership.objects.all().delete()
+
+        tag_membership_migration.fill_tag_memberships(apps, None)
+
+        self.assertEqual(self.get_memberships(), set([(self.pks[0], KIND_ACTIONABLE_TAG, 'INVES-1:phishing'),
+                                                      (self.pks[0], KIND_TAG_INFO, 'phishing'),
+                                                      (self.pks[1], KIND_DINGOS_TAG, 'INVES-1'),
+                                                      (self.pks[1], KIND_DINGOS_TAG, 'malware')]))
+
+
+class TestFillSearchName(TagMembershipTestCase):
+
+    def test_search_names_are_filled(self):
+        SingletonObservableTagMembership.sync(KIND_DINGOS_TAG, {self.pks[0]: set(['INVES-1', 'Phishing'])})
+        SingletonObservableTagMembership.objects.update(search_name='')
+
+        search_name_migration.fill_search_name(apps, None)
+
+        self.assertEqual(set(SingletonObservableTagMembership.objects.values_list('tag_name', 'search_name')),
+                         set([('INVES-1', 'inves-1'), ('Phishing', 'phishing')]))
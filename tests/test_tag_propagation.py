@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for the queued propagation of actionable tag changes into dingos in `django-mantis-actionables`.
+"""
+
+from mock import patch
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from mantis_actionables import mantis_import, models, tasks
+from mantis_actionables.models import ActionableTag, ActionableTaggingHistory, TagPropagationItem
+from mantis_actionables.mantis_import import propagate_tag_changes
+
+from .helpers import ActionablesTestCase, create_singleton_observable
+
+
+class TestEnqueueTagChanges(ActionablesTestCase):
+
+    def setUp(self):
+        super(TestEnqueueTagChanges, self).setUp()
+        self.user = User.objects.create_user('tester')
+        self.pks = [create_singleton_observable('127.0.0.1').pk,
+                    create_singleton_observable('127.0.0.2').pk]
+
+    @patch.object(models, 'MANTIS_ACTIONABLES_ASYNC_TAG_PROPAGATION', True)
+    def test_bulk_action_queues_changes(self):
+        with patch.object(mantis_import, 'update_and_transfer_tag_action_to_dingos') as transfer, \
+                patch.object(tasks, 'delay_after_commit') as delay_after_commit:
+            ActionableTag.bulk_action(action='add',
+                                      context_name_pairs=[('INVES-1', 'INVES-1')],
+                                      thing_to_tag_pks=self.pks,
+                                      user=self.user,
+                                      comment='tagged')
+
+        self.assertFalse(transfer.called)
+        delay_after_commit.assert_called_once_with(tasks.async_propagate_tag_changes)
+        self.assertEqual(sorted(TagPropagationItem.objects.values_list('object_id', 'context_name', 'action',
+                                                                       'user_id', 'comment')),
+                         sorted([(pk, 'INVES-1', TagPropagationItem.ADD, self.user.pk, 'tagged')
+                                 for pk in self.pks]))
+
+    @patch.object(models, 'MANTIS_ACTIONABLES_ASYNC_TAG_PROPAGATION', False)
+    def test_bulk_action_transfers_changes_synchronously(self):
+        with patch.object(mantis_import, 'update_and_transfer_tag_action_to_dingos') as transfer:
+            ActionableTag.bulk_action(action='add',
+                                      context_name_pairs=[('INVES-1', 'INVES-1')],
+                                      thing_to_tag_pks=self.pks,
+                                      user=self.user,
+                                      comment='tagged')
+
+        self.assertTrue(transfer.called)
+        self.assertFalse(TagPropagationItem.objects.exists())
+
+
+class TestDelayAfterCommit(ActionablesTestCase):
+
+    def test_task_is_delayed_within_transaction(self):
+        if hasattr(transaction, 'on_commit'):
+            self.skipTest("transaction.on_commit is available")
+
+        with patch.object(tasks.async_propagate_tag_changes, 'apply_async') as apply_async, \
+                patch.object(tasks.async_propagate_tag_changes, 'delay') as delay:
+            tasks.delay_after_commit(tasks.async_propagate_tag_changes)
+
+        apply_async.assert_called_once_with(args=(), kwargs={}, countdown=tasks.DELAY_AFTER_COMMIT_COUNTDOWN)
+        self.assertFalse(delay.called)
+
+
+class TestPropagateTagChanges(ActionablesTestCase):
+
+    def setUp(self):
+        super(TestPropagateTagChanges, self).setUp()
+        self.user = User.objects.create_user('tester')
+        self.pks = [create_singleton_observable('127.0.0.1').pk,
+                    create_singleton_observable('127.0.0.2').pk]
+
+    def propagate(self, **kwargs):
+        with patch.object(mantis_import, 'update_and_transfer_tag_action_to_dingos') as transfer:
+            processed_count = propagate_tag_changes(**kwargs)
+        calls = sorted((args[0], sorted(args[1]), sorted(args[2]), call_kwargs['user'], call_kwargs['comment'])
+                       for (args, call_kwargs) in transfer.call_args_list)
+        return (processed_count, calls)
+
+    def test_latest_change_per_singleton_and_context_wins(self):
+        TagPropagationItem.enqueue(ActionableTaggingHistory.ADD, ['INVES-1'], self.pks, user=self.user, comment='added')
+        TagPropagationItem.enqueue(ActionableTaggingHistory.REMOVE, ['INVES-1'], self.pks[:1], user=self.user, comment='removed')
+
+        (processed_count, calls) = self.propagate()
+
+        self.assertEqual(processed_count, 3)
+        self.assertEqual(calls, sorted([('add', ['INVES-1'], [self.pks[1]], self.user, 'added'),
+                                        ('remove', ['INVES-1'], [self.pks[0]], self.user, 'removed')]))
+        self.assertFalse(TagPropagationItem.objects.exists())
+
+    def test_changes_are_grouped_per_context(self):
+        TagPropagationItem.enqueue(ActionableTaggingHistory.ADD, ['INVES-1', 'INVES-2'], self.pks, user=self.user)
+
+        (processed_count, calls) = self.propagate()
+
+        self.assertEqual(processed_count, 4)
+        self.assertEqual(calls, [('add', ['INVES-1'], self.pks, self.user, ''),
+                                 ('add', ['INVES-2'], self.pks, self.user, '')])
+
+    def test_queue_is_drained_in_batches(self):
+        TagPropagationItem.enqueue(ActionableTaggingHistory.ADD, ['INVES-1'], self.pks, user=self.user)
+
+        (processed_count, calls) = self.propagate(batch_size=1)
+
+        self.assertEqual(processed_count, 2)
+        self.assertEqual(calls, sorted([('add', ['INVES-1'], [pk], self.user, '') for pk in self.pks]))
+        self.assertFalse(TagPropagationItem.objects.exists())
+
+    def test_empty_queue(self):
+        self.assertEqual(self.propagate(), (0, []))
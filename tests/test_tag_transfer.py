@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for the transfer of dingos tags into `django-mantis-actionables`.
+"""
+
+import re
+
+from mock import patch
+
+from django.contrib.auth.models import User
+
+from dingos.models import TaggingHistory
+
+from mantis_actionables import mantis_import
+from mantis_actionables.models import SingletonObservable, TaggedActionableItem
+from mantis_actionables.mantis_import import update_and_transfer_tags, update_and_transfer_tag_action_to_dingos
+
+from .helpers import ActionablesTestCase, create_fact, create_iobject, create_singleton_observable, create_source
+
+
+class TestUpdateAndTransferTags(ActionablesTestCase):
+
+    def setUp(self):
+        super(TestUpdateAndTransferTags, self).setUp()
+        report = create_iobject()
+        self.facts = []
+        self.observables = []
+        for value in ['127.0.0.1', '127.0.0.2']:
+            (fact, fact_value) = create_fact('Properties/Address_Value', value)
+            observable = create_singleton_observable(value)
+            create_source(observable, report, iobject_fact=fact, iobject_factvalue=fact_value)
+            self.facts.append(fact)
+            self.observables.append(observable)
+
+        patcher = patch.object(mantis_import, 'MANTIS_ACTIONABLES_CONTEXT_TAG_REGEX', [re.compile(r'^INVES-[0-9]+$')])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def transfer_tags(self):
+        update_and_transfer_tags([fact.pk for fact in self.facts])
+
+    def get_mantis_tags(self, observable):
+        return SingletonObservable.objects.get(pk=observable.pk).mantis_tags
+
+    def get_actionable_tag_names(self, observable):
+        return set(TaggedActionableItem.objects.filter(object_id=observable.pk).values_list('tag__name', flat=True))
+
+    def test_added_tags_are_transferred(self):
+        self.facts[0].tags.add('INVES-1', 'phishing')
+        self.facts[1].tags.add('INVES-1')
+
+        self.transfer_tags()
+
+        self.assertEqual(self.get_mantis_tags(self.observables[0]), 'INVES-1,phishing')
+        self.assertEqual(self.get_mantis_tags(self.observables[1]), 'INVES-1')
+        self.assertEqual(self.get_actionable_tag_names(self.observables[0]), set(['INVES-1:INVES-1']))
+        self.assertEqual(self.get_actionable_tag_names(self.observables[1]), set(['INVES-1:INVES-1']))
+
+    def test_removed_tags_are_transferred(self):
+        self.facts[0].tags.add('INVES-1', 'phishing')
+        self.transfer_tags()
+
+        self.facts[0].tags.remove('INVES-1')
+        self.transfer_tags()
+
+        self.assertEqual(self.get_mantis_tags(self.observables[0]), 'phishing')
+        self.assertEqual(self.get_actionable_tag_names(self.observables[0]), set())
+
+    def test_unchanged_tags_are_not_written(self):
+        self.facts[0].tags.add('INVES-1')
+        self.transfer_tags()
+
+        with patch.object(SingletonObservable, 'update_status') as update_status, \
+                patch.object(mantis_import.ActionableTag, 'bulk_action') as bulk_action:
+            self.transfer_tags()
+
+        self.assertFalse(update_status.called)
+        self.assertFalse(bulk_action.called)
+
+
+class TestUpdateAndTransferTagActionToDingos(ActionablesTestCase):
+
+    def setUp(self):
+        super(TestUpdateAndTransferTagActionToDingos, self).setUp()
+        self.user = User.objects.create_user('tester')
+        report = create_iobject()
+        self.facts = []
+        self.observables = []
+        for value in ['127.0.0.1', '127.0.0.2']:
+            (fact, fact_value) = create_fact('Properties/Address_Value', value)
+            observable = create_singleton_observable(value)
+            create_source(observable, report, iobject_fact=fact, iobject_factvalue=fact_value)
+            self.facts.append(fact)
+            self.observables.append(observable)
+
+    def transfer(self, action, user=None):
+        update_and_transfer_tag_action_to_dingos(action, set(['INVES-1']),
+                                                 [observable.pk for observable in self.observables],
+                                                 user=user or self.user,
+                                                 comment=action)
+
+    def get_fact_tag_names(self, fact):
+        return set(fact.tags.names())
+
+    def get_history_fact_pks(self, action_flag, comment):
+        return sorted(TaggingHistory.objects.filter(action=action_flag, tag__name='INVES-1', comment=comment)
+                                            .values_list('object_id', flat=True))
+
+    def test_added_tags_are_transferred(self):
+        self.facts[0].tags.add('INVES-1')
+        SingletonObservable.objects.filter(pk=self.observables[1].pk).update(mantis_tags='phishing')
+
+        self.transfer('add')
+
+        for fact in self.facts:
+            self.assertEqual(self.get_fact_tag_names(fact), set(['INVES-1']))
+
+        # History is written only for the newly tagged fact
+        self.assertEqual(self.get_history_fact_pks(TaggingHistory.ADD, 'add'), [self.facts[1].pk])
+
+        self.assertEqual(SingletonObservable.objects.get(pk=self.observables[0].pk).mantis_tags, 'INVES-1')
+        self.assertEqual(SingletonObservable.objects.get(pk=self.observables[1].pk).mantis_tags, 'INVES-1,phishing')
+
+    def test_removed_tags_are_transferred(self):
+        self.facts[0].tags.add('INVES-1', 'phishing')
+        SingletonObservable.objects.filter(pk=self.observables[0].pk).update(mantis_tags='INVES-1,phishing')
+
+        self.transfer('remove')
+
+        self.assertEqual(self.get_fact_tag_names(self.facts[0]), set(['phishing']))
+        self.assertEqual(self.get_fact_tag_names(self.facts[1]), set())
+
+        # History is written only for the fact that carried the tag
+        self.assertEqual(self.get_history_fact_pks(TaggingHistory.REMOVE, 'remove'), [self.facts[0].pk])
+
+        self.assertEqual(SingletonObservable.objects.get(pk=self.observables[0].pk).mantis_tags, 'phishing')
+        self.assertEqual(SingletonObservable.objects.get(pk=self.observables[1].pk).mantis_tags, '')
+
+    def test_nothing_is_transferred_without_user(self):
+        update_and_transfer_tag_action_to_dingos('add', set(['INVES-1']),
+                                                 [observable.pk for observable in self.observables])
+
+        for fact in self.facts:
+            self.assertEqual(self.get_fact_tag_names(fact), set())
+        self.assertFalse(TaggingHistory.objects.exists())
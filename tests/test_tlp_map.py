@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_django-mantis-actionables
+------------
+
+Tests for the lookup table of TLP colors in `django-mantis-actionables`.
+"""
+
+from django.contrib.contenttypes.models import ContentType
+
+from dingos.models import InfoObject, InfoObject2Fact, Marking2X, NodeID
+
+from mantis_actionables.models import InfoObjectTLP
+
+from .helpers import ActionablesTestCase, create_fact, create_iobject
+
+
+def mark_with_tlp(iobject, color):
+    """
+    Mark the given InfoObject with a new marking that carries the given TLP color.
+    """
+    marking = create_iobject(iobject_type='Marking')
+    (fact, fact_value) = create_fact('Marking_Structure', color, attribute='color')
+    node_id, _ = NodeID.objects.get_or_create(name='N001')
+
+    InfoObject2Fact.objects.create(iobject=marking, fact=fact, node_id=node_id)
+    Marking2X.objects.create(marking=marking,
+                             content_type=ContentType.objects.get_for_model(InfoObject),
+                             object_id=iobject.pk)
+
+
+class TestGetTLPMap(ActionablesTestCase):
+
+    def setUp(self):
+        super(TestGetTLPMap, self).setUp()
+        self.marked = create_iobject()
+        self.unmarked = create_iobject()
+        mark_with_tlp(self.marked, 'AMBER')
+
+    def test_colors_are_recorded(self):
+        self.assertEqual(InfoObjectTLP.get_tlp_map([self.marked.pk, self.unmarked.pk]),
+                         {self.marked.pk: 'AMBER'})
+        self.assertEqual(dict(InfoObjectTLP.objects.values_list('iobject_id', 'color')),
+                         {self.marked.pk: 'AMBER'})
+
+        # Only the lookup table is queried for recorded objects
+        with self.assertNumQueries(1):
+            self.assertEqual(InfoObjectTLP.get_tlp_map([self.marked.pk]),
+                             {self.marked.pk: 'AMBER'})
+
+    def test_unmarked_objects_are_looked_up_again(self):
+        InfoObjectTLP.get_tlp_map([self.unmarked.pk])
+
+        mark_with_tlp(self.unmarked, 'RED')
+
+        self.assertEqual(InfoObjectTLP.get_tlp_map([self.unmarked.pk]),
+                         {self.unmarked.pk: 'RED'})
+
+    def test_unmarked_objects_are_recorded_if_requested(self):
+        self.assertEqual(InfoObjectTLP.get_tlp_map([self.marked.pk, self.unmarked.pk], record_missing=True),
+                         {self.marked.pk: 'AMBER'})
+        self.assertEqual(dict(InfoObjectTLP.objects.values_list('iobject_id', 'color')),
+                         {self.marked.pk: 'AMBER',
+                          self.unmarked.pk: ''})
+
+        with self.assertNumQueries(1):
+            self.assertEqual(InfoObjectTLP.get_tlp_map([self.marked.pk, self.unmarked.pk]),
+                             {self.marked.pk: 'AMBER'})
+
+    def test_only_unresolved_objects_are_looked_up(self):
+        InfoObjectTLP.get_tlp_map([self.unmarked.pk], record_missing=True)
+        other = create_iobject()
+        mark_with_tlp(other, 'GREEN')
+
+        self.assertEqual(InfoObjectTLP.get_tlp_map([self.unmarked.pk, other.pk]),
+                         {other.pk: 'GREEN'})